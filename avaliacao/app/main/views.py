@@ -1,6 +1,7 @@
 from flask import render_template, redirect, url_for, flash
 from .. import db
-from ..models import User, Role
+from ..models import User, Role, role_cache
+from ..snapshot import restore_snapshot
 from . import main
 from .forms import CadastrarProfessor
 from datetime import datetime
@@ -50,20 +51,23 @@ def cadastrar_professores():
         # Verificar se o professor já está registrado
         user = User.query.filter_by(username=form.name.data).first()
         if user is None:
-            role = Role.query.filter_by(name=form.role.data).first()
-            if role:
+            # Id da disciplina vindo do cache (preenchido pelo /reset-db)
+            role_id = role_cache.get_id(form.role.data)
+            if role_id is not None:
                 # Criar e salvar o novo professor
-                user = User(username=form.name.data, role=role)
+                user = User(username=form.name.data, role_id=role_id)
                 db.session.add(user)
                 db.session.commit()
-                flash(f"Professor {form.name.data} cadastrado com sucesso na disciplina {role.name}!")
+                flash(f"Professor {form.name.data} cadastrado com sucesso na disciplina {form.role.data}!")
             else:
                 flash("Disciplina selecionada não encontrada no banco de dados.", "error")
         else:
             flash(f"O professor {form.name.data} já está registrado.", "warning")
         return redirect(url_for('main.cadastrar_professores'))
-    # Obter todos os professores para exibição na tabela
-    users = User.query.all()
+    # Obter todos os professores, já com a disciplina, em uma única consulta
+    users = db.session.scalars(
+        db.select(User).options(db.joinedload(User.role)).order_by(User.id)
+    ).all()
     return render_template(
         'cadastro_de_professores.html',
         form=form,
@@ -73,17 +77,14 @@ def cadastrar_professores():
 # Rota para Reinicializar o Banco de Dados
 @main.route('/reset-db')
 def reset_db():
-    db.drop_all()
-    db.create_all()
-    dsw=Role(name='DSWA5')
-    gps=Role(name='GPSA5')
-    ihc=Role(name='IHCA5')
-    sod=Role(name='SODA5')
-    pji=Role(name='PJIA5')
-    tco=Role(name='TCOA5')
-    db.session.add_all([dsw, gps, ihc, sod, pji, tco])
-    db.session.commit()
+    role_cache.clear()
+    # Restaura a imagem do banco com as disciplinas (montada uma vez) em vez de refazer o DDL
+    restore_snapshot(db, seed_roles)
+    role_cache.seed(dict(db.session.execute(db.select(Role.name, Role.id)).all()))
     return redirect(url_for('main.index'))
 
+def seed_roles():
+    db.session.add_all([Role(name=name) for name in ['DSWA5', 'GPSA5', 'IHCA5', 'SODA5', 'PJIA5', 'TCOA5']])
+
 
 
@@ -1,3 +1,4 @@
+import threading
 from . import db
 
 # Modelo para cargos ou papéis no sistema
@@ -23,3 +24,45 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+class RoleCache:
+    """
+    Cache, por processo, do id de cada papel (disciplina) pelo nome.
+
+    As disciplinas são fixas e criadas pelo /reset-db, que já preenche o
+    cache. Qualquer inserção, alteração ou remoção de papel limpa o cache.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._lock = threading.Lock()
+
+    def seed(self, ids):
+        """
+        Preenche o cache com um dicionário nome -> id dos papéis já gravados.
+        """
+        with self._lock:
+            self._ids = dict(ids)
+
+    def get_id(self, name):
+        """
+        Retorna o id do papel ou None se ele não existir.
+        """
+        role_id = self._ids.get(name)
+        if role_id is None:
+            role_id = db.session.scalar(db.select(Role.id).filter_by(name=name))
+            if role_id is not None:
+                with self._lock:
+                    self._ids[name] = role_id
+        return role_id
+
+    def clear(self):
+        with self._lock:
+            self._ids = {}
+
+role_cache = RoleCache()
+
+@db.event.listens_for(Role, 'after_insert')
+@db.event.listens_for(Role, 'after_update')
+@db.event.listens_for(Role, 'after_delete')
+def _role_changed(mapper, connection, target):
+    role_cache.clear()
@@ -0,0 +1,54 @@
+import sqlite3
+import threading
+
+# Imagem do banco recém-criado (tabelas e disciplinas), montada uma vez por processo
+_template = None
+_lock = threading.Lock()
+
+
+def restore_snapshot(db, seed):
+    """
+    Restaura o banco a partir da imagem com a API de backup do SQLite, em vez
+    de refazer drop_all() + create_all() e a carga inicial a cada /reset-db.
+
+    Na primeira chamada o banco é recriado com DDL, a carga inicial é gravada
+    e o resultado é copiado para a imagem em memória. Bancos que não são
+    SQLite são sempre recriados com DDL. A versão das migrações
+    (alembic_version) é mantida.
+
+    :param db: Instância do Flask-SQLAlchemy.
+    :param seed: Função que grava a carga inicial (o commit é feito aqui).
+    """
+    global _template
+    db.session.remove()
+    engine = db.engine
+    if engine.dialect.name != 'sqlite':
+        _rebuild(db, seed)
+        return
+    with _lock:
+        raw = engine.raw_connection()
+        try:
+            connection = raw.driver_connection
+            versions = []
+            if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'alembic_version'").fetchone():
+                versions = connection.execute('SELECT version_num FROM alembic_version').fetchall()
+            if _template is None:
+                _rebuild(db, seed)
+                _template = sqlite3.connect(':memory:', check_same_thread=False)
+                connection.backup(_template)
+            else:
+                _template.backup(connection)
+            if versions and not connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'alembic_version'").fetchone():
+                connection.execute('CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL, '
+                                   'CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))')
+                connection.executemany('INSERT INTO alembic_version (version_num) VALUES (?)', versions)
+                connection.commit()
+        finally:
+            raw.close()
+
+
+def _rebuild(db, seed):
+    db.drop_all()
+    db.create_all()
+    seed()
+    db.session.commit()
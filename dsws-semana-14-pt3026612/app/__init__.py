@@ -1,14 +1,16 @@
+import weakref
 from flask import Flask
 from flask_bootstrap import Bootstrap
 from flask_moment import Moment
 from flask_sqlalchemy import SQLAlchemy
 from config import config
 from flask_login import LoginManager
+from .replica import RoutingSession
 
 # Instâncias das extensões do Flask
 bootstrap = Bootstrap()
 moment = Moment()
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # Leituras podem ir para a réplica
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 
@@ -26,12 +28,70 @@ def create_app(config_name='default'):
     # Carrega as configurações específicas para o ambiente
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
+    # Bytecode dos modelos compartilhado pelas aplicações do processo
+    from .template_cache import bytecode_cache
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=bytecode_cache)
+    # Opções do pool incompatíveis com o SQLite em memória são descartadas
+    from .pool_metrics import adjust_engine_options
+    adjust_engine_options(app.config)
 
     # Inicializa as extensões do Flask
     bootstrap.init_app(app)
     moment.init_app(app)
     db.init_app(app)
     login_manager.init_app(app)
+    # Leituras de quem acabou de gravar ficam no primário por alguns segundos
+    from . import replica
+    replica.init_app(app)
+
+    # PRAGMAs do SQLite (WAL, synchronous, cache...) aplicados a cada nova conexão,
+    # e BEGIN IMMEDIATE antes dos SAVEPOINTs, para que eles funcionem
+    from .sqlite_tuning import install_sqlite_pragmas, install_sqlite_transactions
+    with app.app_context():
+        for engine in db.engines.values():
+            install_sqlite_pragmas(engine, app.config['SQLITE_PRAGMAS'])
+            install_sqlite_transactions(engine)
+        # Métricas do pool de conexões (flask db-pool)
+        from .pool_metrics import PoolMetrics
+        app.extensions['pool_metrics'] = {
+            name: PoolMetrics(engine, app.config['DB_POOL_SLOW_WAIT'], app.config['DB_POOL_LOG_INTERVAL'])
+            for name, engine in db.engines.items()
+        }
+        # Quantidade e tempo das consultas de cada requisição, consultas lentas e N+1
+        from . import sql_stats
+        sql_stats.init_app(app, db.engines.values())
+
+    # Imagem do banco recém-criado, restaurada pelo /reset-db e pelos testes
+    from .snapshot import SchemaSnapshot
+    app.extensions['schema_snapshot'] = SchemaSnapshot(db, directory=app.config['DB_SNAPSHOT_DIR'])
+
+    # Serviço de tokens (serializers e chaves derivados uma única vez)
+    from .tokens import TokenService
+    app.extensions['tokens'] = TokenService(app.config)
+
+    # Pool limitado para o cálculo dos hashes de senha
+    from .hashing import PasswordHasher
+    hasher = PasswordHasher(app.config)
+    app.extensions['password_hasher'] = hasher
+    weakref.finalize(app, hasher.close)
+
+    # Cache dos usuários carregados pelo login_manager
+    from .identity import IdentityCache
+    app.extensions['identity_cache'] = IdentityCache(app.config['IDENTITY_CACHE_SIZE'], app.config['IDENTITY_CACHE_TTL'])
+
+    # Contadores do limite de requisições da autenticação
+    from .ratelimit import RateLimiter
+    # Atrás do proxy, request.remote_addr seria o endereço do proxy para todos os clientes
+    if app.config['PROXY_FIX_X_FOR']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+    app.extensions['rate_limiter'] = RateLimiter(app.config)
+
+    # Cliente HTTP do Mailgun compartilhado por todos os envios da aplicação
+    from .email import MailgunClient
+    mailgun = MailgunClient(app.config)
+    app.extensions['mailgun'] = mailgun
+    weakref.finalize(app, mailgun.close)  # Fecha as conexões ao descartar a aplicação
 
     # Registra o blueprint da seção principal
     from .main import main as main_blueprint
@@ -40,4 +100,19 @@ def create_app(config_name='default'):
     from .auth import auth as auth_blueprint
     app.register_blueprint(auth_blueprint, url_prefix='/auth')
 
+    from .api import api as api_blueprint
+    app.register_blueprint(api_blueprint, url_prefix='/api')
+
+    # Modelos de e-mail compilados uma única vez por aplicação
+    from .email_render import EmailRenderer
+    app.extensions['email_renderer'] = EmailRenderer(app)
+
+    # Remoção periódica dos cadastros não confirmados no próprio processo (opcional)
+    if app.config['PRUNE_UNCONFIRMED_INTERVAL']:
+        from .pruning import PruneScheduler
+        scheduler = PruneScheduler(app, app.config['PRUNE_UNCONFIRMED_INTERVAL'])
+        app.extensions['prune_scheduler'] = scheduler
+        weakref.finalize(app, scheduler.stop)
+        scheduler.start()
+
     return app
\ No newline at end of file
@@ -0,0 +1,11 @@
+from flask import Blueprint
+
+api = Blueprint('api', __name__)
+
+@api.before_request
+def before_request():
+    # A API só tem listagens: as leituras vão para a réplica, se houver
+    from ..replica import route_reads_to_replica
+    route_reads_to_replica()
+
+from . import errors, users
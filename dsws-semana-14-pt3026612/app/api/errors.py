@@ -0,0 +1,19 @@
+from flask import jsonify
+
+
+def bad_request(message):
+    """
+    Resposta JSON para parâmetros inválidos (400).
+    """
+    response = jsonify({'error': 'bad request', 'message': message})
+    response.status_code = 400
+    return response
+
+
+def forbidden(message):
+    """
+    Resposta JSON para acesso não permitido (403).
+    """
+    response = jsonify({'error': 'forbidden', 'message': message})
+    response.status_code = 403
+    return response
@@ -0,0 +1,140 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app, jsonify, request, url_for
+from flask_login import login_required
+from . import api
+from .errors import bad_request, forbidden
+from .. import db
+from ..decorators import is_admin
+from ..models import User, Role
+
+# Campos que podem ser pedidos em ?fields= (a senha nunca é exposta)
+USER_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'prontuario': User.prontuario,
+    'email': User.email,
+    'role': Role.name,
+    'confirmed': User.confirmed,
+    'created_at': User.created_at,
+}
+DEFAULT_FIELDS = ['id', 'username', 'role', 'confirmed', 'created_at']
+# Dados pessoais: apenas o administrador pode pedi-los (como na exportação)
+ADMIN_FIELDS = {'email', 'prontuario'}
+
+# Ordenações aceitas: colunas da chave, da mais para a menos significativa
+ORDERINGS = {
+    'id': [User.id],
+    'created_at': [User.created_at, User.id],
+}
+
+
+def encode_cursor(values):
+    """
+    Codifica os valores da chave da última linha em um cursor opaco.
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """
+    Decodifica um cursor gerado por encode_cursor.
+
+    :raise ValueError: Se o cursor for inválido para a ordenação.
+    """
+    values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise ValueError('cursor inválido')
+    return [datetime.fromisoformat(value) if column is User.created_at else int(value)
+            for column, value in zip(columns, values)]
+
+
+def _after(columns, values):
+    """
+    Condição "depois da chave" (seek): (a > x) OR (a = x AND b > y) ...
+    """
+    conditions = []
+    for index, column in enumerate(columns):
+        equal = [columns[i] == values[i] for i in range(index)]
+        conditions.append(db.and_(*equal, column > values[index]))
+    return db.or_(*conditions)
+
+
+def _parse_bool(value):
+    if value.lower() in ('1', 'true', 'sim'):
+        return True
+    if value.lower() in ('0', 'false', 'nao', 'não'):
+        return False
+    raise ValueError(value)
+
+
+@api.route('/users')
+@login_required
+def get_users():
+    """
+    Lista usuários com paginação por chave (keyset).
+
+    Parâmetros: limit, order (id ou created_at), cursor, role (nome do papel),
+    confirmed (true/false) e fields (lista separada por vírgulas).
+    A próxima página vem no cabeçalho Link (rel="next") e em X-Next-Cursor.
+    """
+    args = request.args
+    order = args.get('order', 'id')
+    if order not in ORDERINGS:
+        return bad_request(f'order deve ser um de: {", ".join(ORDERINGS)}.')
+    columns = ORDERINGS[order]
+
+    fields = [field.strip() for field in args.get('fields', ','.join(DEFAULT_FIELDS)).split(',') if field.strip()]
+    unknown = [field for field in fields if field not in USER_FIELDS]
+    if unknown or not fields:
+        return bad_request(f'Campos desconhecidos: {", ".join(unknown) or "(nenhum)"}.')
+    restricted = sorted(ADMIN_FIELDS.intersection(fields))
+    if restricted and not is_admin():
+        return forbidden(f'Apenas o administrador pode pedir os campos: {", ".join(restricted)}.')
+
+    try:
+        limit = min(max(int(args.get('limit', current_app.config['API_USERS_PER_PAGE'])), 1),
+                    current_app.config['API_USERS_MAX_PER_PAGE'])
+    except ValueError:
+        return bad_request('limit deve ser um número inteiro.')
+
+    # Colunas da chave entram na consulta mesmo que não tenham sido pedidas
+    keys = [f'_key{index}' for index in range(len(columns))]
+    query = db.select(*(USER_FIELDS[field].label(field) for field in fields),
+                      *(column.label(key) for column, key in zip(columns, keys)))
+    query = query.select_from(User).outerjoin(Role, User.role_id == Role.id)
+
+    if 'role' in args:
+        query = query.where(Role.name == args['role'])
+    if 'confirmed' in args:
+        try:
+            query = query.where(User.confirmed == _parse_bool(args['confirmed']))
+        except ValueError:
+            return bad_request('confirmed deve ser true ou false.')
+    if args.get('cursor'):
+        try:
+            query = query.where(_after(columns, decode_cursor(args['cursor'], columns)))
+        except (ValueError, TypeError):
+            return bad_request('cursor inválido.')
+
+    # Uma linha a mais indica se existe próxima página
+    rows = db.session.execute(query.order_by(*columns).limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    users = []
+    for row in rows:
+        mapping = row._mapping
+        users.append({field: (mapping[field].isoformat() if isinstance(mapping[field], datetime) else mapping[field])
+                      for field in fields})
+    next_cursor = encode_cursor([rows[-1]._mapping[key] for key in keys]) if has_more else None
+
+    response = jsonify({'users': users, 'next_cursor': next_cursor, 'count': len(users)})
+    if next_cursor:
+        params = dict(args.items(), cursor=next_cursor, limit=limit)
+        next_url = url_for('api.get_users', **params)
+        response.headers['Link'] = f'<{next_url}>; rel="next"'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
@@ -1,7 +1,9 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, BooleanField, SubmitField, ValidationError
+from wtforms import Form, StringField, PasswordField, BooleanField, SubmitField, ValidationError
 from wtforms.validators import DataRequired, Length, Email, Regexp, EqualTo
+from .. import db
 from ..models import User
+from ..replica import use_replica
 
 # Validação customizada para verificar domínio de e-mail def ZohoEmail(message=None):
 def ZohoEmail(message=None):
@@ -10,25 +12,67 @@ def ZohoEmail(message=None):
             raise ValidationError(message or 'Por favor, use um e-mail @zohomail.com.')
     return _validate_email
 
-# Validação customizada para verificar e-mail único
+# Validação customizada para verificar e-mail único (e-mails são gravados em minúsculas na troca)
 def UniqueEmail(message=None):
     def _validate_email(form, field):
-        if User.query.filter_by(email=field.data).first():
+        with use_replica():
+            taken = User.query.filter_by(email=field.data.lower()).first()
+        if taken:
             raise ValidationError(message or 'Este e-mail já está registrado.')
     return _validate_email
 
-# Validação customizada para verificar prontuário único
-def UniqueProntuario(message=None):
-    def _validate_prontuario(form, field):
-        if User.query.filter_by(prontuario=field.data).first():
-            raise ValidationError(message or 'Este prontuário já está registrado.')
-    return _validate_prontuario
-
-def UniqueUsername(message=None):
-    def _validate_username(form, field):
-        if User.query.filter_by(username=field.data).first():
-            raise ValidationError(message or 'Este nome já está em uso.')
-    return _validate_username
+class UniqueFields:
+    """
+    Verifica a unicidade de vários campos de um modelo em uma única consulta.
+
+    Recebe um dicionário campo -> mensagem de erro. Apenas os campos que já
+    passaram nas demais validações são consultados.
+    """
+
+    def __init__(self, model, messages):
+        """
+        :param model: Modelo consultado (ex.: User).
+        :param messages: Mensagem de erro de cada campo único.
+        """
+        self.model = model
+        self.messages = messages
+
+    def conflicts(self, values):
+        """
+        Retorna os campos cujos valores já estão em uso.
+
+        :param values: Dicionário campo -> valor.
+        :return: Dicionário campo -> mensagem de erro.
+        """
+        values = {name: value for name, value in values.items() if value}
+        if not values:
+            return {}
+        columns = [getattr(self.model, name) for name in values]
+        # Cada valor único aparece em no máximo uma linha
+        with use_replica():
+            rows = db.session.execute(
+                db.select(*columns)
+                .where(db.or_(*(column == value for column, value in zip(columns, values.values()))))
+                .limit(len(values))
+            ).all()
+        errors = {}
+        for row in rows:
+            for (name, value), found in zip(values.items(), row):
+                if found == value:
+                    errors[name] = self.messages[name]
+        return errors
+
+    def validate(self, form):
+        """
+        Adiciona aos campos do formulário os erros de unicidade.
+
+        :return: True se nenhum valor estiver em uso.
+        """
+        fields = [getattr(form, name) for name in self.messages]
+        errors = self.conflicts({field.name: field.data for field in fields if not field.errors})
+        for name, message in errors.items():
+            getattr(form, name).errors.append(message)
+        return not errors
 
 class LoginForm(FlaskForm):
     email = StringField('Digite seu email', validators=[
@@ -45,13 +89,13 @@ class LoginForm(FlaskForm):
     remember_me = BooleanField('Mantenha-me conectado')
     submit = SubmitField("Entrar")
 
-class RegistrationForm(FlaskForm):
+# Campos de identificação do usuário, compartilhados pelo cadastro e pela importação em lote
+class UserFields(Form):
     email = StringField(
         'Digite seu email',
         validators=[DataRequired(message="O campo de email é obrigatório."),
         Length(1, 64),
         Email(message="Insira um e-mail válido."),
-        UniqueEmail(message="Este e-mail já está registrado."),
         ZohoEmail(message="Por favor, use um e-mail @zohomail.com.")
         ], render_kw={"placeholder": "Digite seu email"})
 
@@ -63,8 +107,7 @@ class RegistrationForm(FlaskForm):
             Regexp(
                 '^[a-zA-Z][a-zA-Z0-9_. ]*$', 0,
                 message='O nome de usuário deve ter apenas letras, números, pontos ou sublinhados'
-            ),
-            UniqueUsername(message="Este nome já está em uso.")],
+            )],
             render_kw={"placeholder": "Digite seu nome completo"}
     )
         # Campo para o prontuário com validação de formato
@@ -75,13 +118,12 @@ class RegistrationForm(FlaskForm):
             Regexp(
                 r'^[a-zA-Z]{3}\d{7}$',
                 message='O prontuário deve ter 3 letras seguidas de 7 números. Exemplo: ABC1234567'
-            ),
-            UniqueProntuario(message="Este prontuário já está registrado.")  # Validação para prontuário único
+            )
         ],
         render_kw={"placeholder": "Exemplo: ABC1234567"}
     )
 
-
+class RegistrationForm(FlaskForm, UserFields):
     password = PasswordField(
             'Digite sua senha',
             validators=[DataRequired(message="O campo de senha é obrigatório."),
@@ -95,6 +137,17 @@ class RegistrationForm(FlaskForm):
     )
     submit = SubmitField("Registrar")
 
+    # E-mail, nome e prontuário únicos, verificados em uma única consulta
+    unique = UniqueFields(User, {
+        'email': "Este e-mail já está registrado.",
+        'username': "Este nome já está em uso.",
+        'prontuario': "Este prontuário já está registrado.",
+    })
+
+    def validate(self, extra_validators=None):
+        valid = super().validate(extra_validators)
+        return self.unique.validate(self) and valid
+
 class ChangePasswordForm(FlaskForm):
     old_password = PasswordField('Senha antiga', validators=[DataRequired()])
     password = PasswordField('Nova senha', validators=[
@@ -127,7 +180,3 @@ class ChangeEmailForm(FlaskForm):
                                                   ], render_kw={"placeholder": "Digite seu novo email"})
     password = PasswordField('Senha', validators=[DataRequired()])
     submit = SubmitField('Update Email Address')
-
-    def validate_email(self, field):
-        if User.query.filter_by(email=field.data.lower()).first():
-            raise ValidationError('Email already registered.')
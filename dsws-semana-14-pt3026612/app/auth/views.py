@@ -1,10 +1,14 @@
-from flask import render_template, redirect, request, url_for, flash, current_app
+from flask import render_template, redirect, request, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.exc import IntegrityError
 from . import auth
 from ..models import User
 from .forms import LoginForm, RegistrationForm, ChangePasswordForm, PasswordResetRequestForm, PasswordResetForm, ChangeEmailForm
 from .. import db
-from ..email import send_verification_email, send_simple_message, send_email_with_gif
+from ..outbox import queue_email
+from ..notifications import notify_admins
+from ..email_render import render_email
+from ..ratelimit import rate_limit
 
 @auth.before_app_request
 def before_request():
@@ -23,11 +27,14 @@ def unconfirmed():
     return render_template('auth/unconfirmed.html')
 
 @auth.route('/login', methods=['GET', 'POST'])
+@rate_limit('login')
 def login():
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(email=form.email.data).first()
         if user is not None and user.verify_password(form.password.data):
+            if db.session.is_modified(user):
+                db.session.commit()  # Grava o hash refeito com os parâmetros atuais
             login_user(user, form.remember_me.data)
             next = request.args.get('next')
             if next is None or not next.startswith('/'):
@@ -44,6 +51,7 @@ def logout():
     return redirect(url_for('main.index'))
 
 @auth.route('/register', methods=['GET', 'POST'])
+@rate_limit('register')
 def register():
     form = RegistrationForm()
     if form.validate_on_submit():
@@ -51,14 +59,21 @@ def register():
                     username=form.username.data,
                     prontuario=form.prontuario.data,
                     password=form.password.data)
-        db.session.add(user)
-        db.session.commit()
-        token = user.generate_confirmation_token()
         try:
-            send_verification_email(to=user.email, subject='Confirme seu cadastro', body=render_template('auth/email/verify_email.html', username=user.username, token=token))
-            flash('Um email de confirmação foi enviado para o seu email.', 'info')
-        except Exception as e:
-            flash('Não foi possível enviar o email de confirmação. Por favor, tente novamente mais tarde ou contate o email na tela de login', 'danger')
+            db.session.add(user)
+            db.session.flush()  # Gera o id do usuário, necessário para o token
+            token = user.generate_confirmation_token()
+            # O e-mail entra na fila no mesmo commit do novo usuário
+            html, text = render_email('auth/email/verify_email', username=user.username, token=token)
+            queue_email(to=user.email, subject='Confirme seu cadastro', html=html, text=text)
+            db.session.commit()
+        except IntegrityError:
+            # Cadastro simultâneo com os mesmos dados: os erros voltam para o formulário
+            db.session.rollback()
+            if form.unique.validate(form):
+                form.email.errors.append('Não foi possível concluir o cadastro. Tente novamente.')
+            return render_template('auth/register.html', form=form)
+        flash('Um email de confirmação foi enviado para o seu email.', 'info')
         return redirect(url_for('main.index'))
     return render_template('auth/register.html', form=form)
 
@@ -69,27 +84,27 @@ def confirm(token):
     if current_user.confirmed:
         return redirect(url_for('main.index'))
     if current_user.confirm(token):
-        db.session.commit()
-        flash('Você confirmou sua conta. Obrigado!', 'info')
-        # Envia notificações para o administrador e o e-mail da escola
-        email_admin = current_app.config['FLASKY_ADMIN']
-        recipient_list = ['flaskaulasweb@zohomail.com', email_admin]
-        user_message = "Bem-vindo, {}! Seu cadastro foi confirmado.".format(current_user.username)
-        send_simple_message(to=recipient_list[0], subject="Novo Cadastro", new_user=current_user.username)
-        send_simple_message(to=recipient_list[1], subject="Notificação de Cadastro", new_user=current_user.username)
+        # O administrador e o e-mail da escola recebem o cadastro no próximo resumo
+        notify_admins('Novo Cadastro', current_user.username)
         # Envia e-mail com GIF de boas-vindas para o usuário
+        user_message = "Bem-vindo, {}! Seu cadastro foi confirmado.".format(current_user.username)
         url = 'https://nicolassf.pythonanywhere.com/static/images/welcome.gif'
-        send_email_with_gif(to=current_user.email, subject="Cadastro confirmado", body=user_message, gif_url=url)
+        html, text = render_email('auth/email/welcome', message=user_message, gif_url=url)
+        queue_email(to=current_user.email, subject="Cadastro confirmado", html=html, text=text)
+        db.session.commit()
+        flash('Você confirmou sua conta. Obrigado!', 'info')
     else:
         flash('O link de confirmação é inválido ou expirou.', 'danger')
     return redirect(url_for('main.index'))
 
 @auth.route('/confirm')
 @login_required
+@rate_limit('resend_confirmation', methods=('GET',))
 def resend_confirmation():
     token = current_user.generate_confirmation_token()
-    send_verification_email(to=current_user.email, subject='Confirme seu cadastro',
-                            body=render_template('auth/email/verify_email.html', username=current_user.username, token=token))
+    html, text = render_email('auth/email/verify_email', username=current_user.username, token=token)
+    queue_email(to=current_user.email, subject='Confirme seu cadastro', html=html, text=text)
+    db.session.commit()
     flash('Um novo email de confirmação foi enviado para o seu email.', 'info')
     return redirect(url_for('main.index'))
 
@@ -110,6 +125,7 @@ def change_password():
     return render_template("auth/change_password.html", form=form)
 
 @auth.route('/reset', methods=['GET', 'POST'])
+@rate_limit('password_reset_request')
 def password_reset_request():
     if not current_user.is_anonymous:
         return redirect(url_for('main.index'))
@@ -118,8 +134,9 @@ def password_reset_request():
         user = User.query.filter_by(email=form.email.data.lower()).first()
         if user:
             token = user.generate_reset_token()
-            send_verification_email(to=user.email, subject='Redefinir senha',
-                                    body=render_template('auth/email/reset_password.html', username=user.username, token=token))
+            html, text = render_email('auth/email/reset_password', username=user.username, token=token)
+            queue_email(to=user.email, subject='Redefinir senha', html=html, text=text)
+            db.session.commit()
         flash('Um email com instrução para a criação de uma nova senha foi enviado para você.', 'info')
         return redirect(url_for('auth.login'))
     return render_template('auth/reset_password.html', form=form)
@@ -147,8 +164,9 @@ def change_email_request():
         if current_user.verify_password(form.password.data):
             new_email = form.email.data.lower()
             token = current_user.generate_email_change_token(new_email)
-            send_verification_email(to=new_email, subject='Confirmar endereço de email',
-                                    body=render_template('auth/email/change_email.html', user=current_user, token=token))
+            html, text = render_email('auth/email/change_email', user=current_user, token=token)
+            queue_email(to=new_email, subject='Confirmar endereço de email', html=html, text=text)
+            db.session.commit()
             flash('Um email com instruções para cadastrar seu novo email foi enviado para você.', 'info')
             return redirect(url_for('main.index'))
         else:
@@ -0,0 +1,23 @@
+from functools import wraps
+from flask import abort, current_app
+from flask_login import current_user
+
+
+def is_admin():
+    """
+    Indica se o usuário atual é o administrador (FLASKY_ADMIN).
+    """
+    admin = current_app.config['FLASKY_ADMIN']
+    return bool(current_user.is_authenticated and admin and current_user.email == admin)
+
+
+def admin_required(f):
+    """
+    Restringe a view ao administrador (FLASKY_ADMIN).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not is_admin():
+            abort(403)
+        return f(*args, **kwargs)
+    return decorated_function
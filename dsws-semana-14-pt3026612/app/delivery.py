@@ -0,0 +1,152 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Respostas do provedor que indicam falha temporária e podem ser repetidas
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+class MailgunUnavailable(Exception):
+    """
+    Lançada sem contatar o Mailgun quando o circuit breaker está aberto.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Mailgun indisponível; novas tentativas em {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+class RetryPolicy:
+    """
+    Política de novas tentativas com espera exponencial e jitter.
+    """
+
+    def __init__(self, attempts=3, backoff=0.5, max_backoff=4.0):
+        """
+        :param attempts: Quantidade total de tentativas (incluindo a primeira).
+        :param backoff: Espera base, em segundos, antes da segunda tentativa.
+        :param max_backoff: Limite superior da espera entre tentativas.
+        """
+        self.attempts = max(1, attempts)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    def delay(self, attempt, response=None):
+        """
+        Calcula a espera antes da próxima tentativa ("full jitter").
+
+        :param attempt: Número da tentativa que acabou de falhar (a partir de 1).
+        :param response: Resposta HTTP da tentativa, usada para respeitar Retry-After.
+        :return: Segundos de espera.
+        """
+        limit = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(self.max_backoff, float(retry_after))
+        return random.uniform(0, limit)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker baseado na taxa de erro de uma janela de tempo.
+
+    - closed: as chamadas passam normalmente;
+    - open: as chamadas falham imediatamente até o fim do cooldown;
+    - half_open: uma única chamada de teste decide se o circuito fecha ou reabre.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_rate=0.5, min_requests=5, window=60.0, cooldown=30.0, clock=time.monotonic):
+        """
+        :param failure_rate: Taxa de falhas (0 a 1) que abre o circuito.
+        :param min_requests: Quantidade mínima de chamadas na janela para avaliar a taxa.
+        :param window: Duração, em segundos, da janela de observação.
+        :param cooldown: Tempo, em segundos, com o circuito aberto.
+        :param clock: Função que retorna o tempo atual (substituível em testes).
+        """
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = self.CLOSED
+        self._opened_at = None
+        self._trial_in_progress = False
+        self._results = deque()  # Tuplas (instante, sucesso)
+        self._lock = threading.Lock()
+        self.counters = {'successes': 0, 'failures': 0, 'rejected': 0,
+                         'opened': 0, 'half_opened': 0, 'closed': 0}
+
+    def before_call(self):
+        """
+        Verifica se a chamada pode ser feita.
+
+        :raises MailgunUnavailable: Se o circuito estiver aberto.
+        """
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.cooldown - self.clock()
+                if remaining > 0:
+                    self.counters['rejected'] += 1
+                    raise MailgunUnavailable(remaining)
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                # Apenas uma chamada de teste por vez enquanto meio aberto
+                if self._trial_in_progress:
+                    self.counters['rejected'] += 1
+                    raise MailgunUnavailable(self.cooldown)
+                self._trial_in_progress = True
+
+    def record(self, success):
+        """
+        Registra o resultado de uma chamada e atualiza o estado do circuito.
+
+        :param success: True se o provedor respondeu normalmente.
+        """
+        with self._lock:
+            now = self.clock()
+            self.counters['successes' if success else 'failures'] += 1
+            if self.state == self.HALF_OPEN:
+                self._trial_in_progress = False
+                self._results.clear()
+                if success:
+                    self._set_state(self.CLOSED)
+                else:
+                    self._open(now)
+                return
+
+            self._results.append((now, success))
+            while self._results and self._results[0][0] < now - self.window:
+                self._results.popleft()
+            failures = sum(1 for _, ok in self._results if not ok)
+            if (self.state == self.CLOSED and len(self._results) >= self.min_requests
+                    and failures / len(self._results) >= self.failure_rate):
+                self._open(now)
+
+    def stats(self):
+        """
+        Retorna o estado atual e os contadores do circuito.
+        """
+        with self._lock:
+            return dict(self.counters, state=self.state)
+
+    def _open(self, now):
+        self._opened_at = now
+        self._results.clear()
+        self._set_state(self.OPEN)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        self.state = state
+        self.counters[{self.OPEN: 'opened', self.HALF_OPEN: 'half_opened', self.CLOSED: 'closed'}[state]] += 1
+        log = logger.warning if state == self.OPEN else logger.info
+        log("Circuit breaker do Mailgun: %s", state)
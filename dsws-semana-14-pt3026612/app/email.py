@@ -1,120 +1,185 @@
+import json
+import time
 import requests
 import logging
+from collections import namedtuple
+from requests.adapters import HTTPAdapter
 from flask import current_app
+from .delivery import CircuitBreaker, RetryPolicy, RETRYABLE_STATUS
 
 # Configuração do logger
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-def send_verification_email(to, subject, body):
-    data = {
-        'from': f"Flasky <noreply@{current_app.config['MAILGUN_DOMAIN']}>",
-        'to': to,
-        'subject': f"{current_app.config['FLASKY_MAIL_SUBJECT_PREFIX']} {subject}",
-        'html': body
-    }
-    try:
-        logger.info("Enviando mensagem para %s", to)
-        response = requests.post(
-            current_app.config['MAILGUN_API_URL'],
-            auth=('api', current_app.config['MAILGUN_API_KEY']),
-            data=data
+
+class MailgunClient:
+    """
+    Cliente HTTP do Mailgun com pool de conexões persistentes (keep-alive).
+
+    Uma instância é criada por aplicação em create_app e guardada em
+    app.extensions['mailgun'], de modo que todos os envios reutilizem as
+    mesmas conexões TCP/TLS em vez de abrir uma nova a cada e-mail.
+
+    Falhas temporárias (429/5xx e erros de conexão) são repetidas segundo a
+    RetryPolicy, e o CircuitBreaker interrompe os envios por um tempo quando
+    a taxa de erro do provedor passa do limite configurado.
+    """
+
+    def __init__(self, config):
+        """
+        :param config: Configuração da aplicação (app.config).
+        """
+        # Tempo máximo para conectar e para aguardar a resposta do Mailgun
+        self.timeout = (config['MAILGUN_CONNECT_TIMEOUT'], config['MAILGUN_READ_TIMEOUT'])
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=config['MAILGUN_POOL_CONNECTIONS'],  # Quantidade de hosts com pool próprio
+            pool_maxsize=config['MAILGUN_POOL_MAXSIZE'],  # Conexões mantidas abertas por host
+            pool_block=config['MAILGUN_POOL_BLOCK']  # Espera por uma conexão livre em vez de abrir outra
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.retry = RetryPolicy(
+            attempts=config['MAILGUN_RETRY_ATTEMPTS'],
+            backoff=config['MAILGUN_RETRY_BACKOFF'],
+            max_backoff=config['MAILGUN_RETRY_MAX_BACKOFF']
+        )
+        self.breaker = CircuitBreaker(
+            failure_rate=config['MAILGUN_BREAKER_FAILURE_RATE'],
+            min_requests=config['MAILGUN_BREAKER_MIN_REQUESTS'],
+            window=config['MAILGUN_BREAKER_WINDOW'],
+            cooldown=config['MAILGUN_BREAKER_COOLDOWN']
         )
-        _handle_mailgun_response(response)
 
-        # Se a resposta não for bem-sucedida, lançar uma exceção
-        if response.status_code != 200:
-            raise Exception(f"Falha ao enviar email: {response.text}")
-        
-    except requests.exceptions.RequestException as e:
-        logger.exception("Erro ao tentar enviar mensagem devido a uma falha de solicitação HTTP.", exc_info=e)
-        raise  # Levanta a exceção novamente após registrar
-    except Exception as e:
-        logger.exception("Erro inesperado ao enviar mensagem.", exc_info=e)
-        raise  # Levanta a exceção novamente após registrar
+    def post(self, data):
+        """
+        Envia uma mensagem ao endpoint de mensagens do Mailgun.
 
+        :param data: Dicionário com os campos da mensagem.
+        :return: Objeto de resposta HTTP do Mailgun (a última, se todas as tentativas falharem).
+        :raises MailgunUnavailable: Se o circuit breaker estiver aberto.
+        :raises requests.exceptions.RequestException: Se a última tentativa falhar na conexão.
+        """
+        for attempt in range(1, self.retry.attempts + 1):
+            self.breaker.before_call()
+            try:
+                response = self.session.post(
+                    current_app.config['MAILGUN_API_URL'],
+                    auth=('api', current_app.config['MAILGUN_API_KEY']),
+                    data=data,
+                    timeout=self.timeout
+                )
+            except requests.exceptions.RequestException:
+                self.breaker.record(False)
+                if attempt == self.retry.attempts:
+                    raise
+                response = None
+            else:
+                retryable = response.status_code in RETRYABLE_STATUS
+                self.breaker.record(not retryable)
+                if not retryable or attempt == self.retry.attempts:
+                    return response
+            delay = self.retry.delay(attempt, response)
+            logger.warning("Falha temporária no Mailgun (tentativa %s de %s); nova tentativa em %.2fs.",
+                           attempt, self.retry.attempts, delay)
+            time.sleep(delay)
+
+    def stats(self):
+        """
+        Retorna os contadores do circuit breaker deste cliente.
+        """
+        return self.breaker.stats()
 
-def send_simple_message(to, subject, new_user):
+    def close(self):
+        """
+        Fecha as conexões mantidas pelo pool.
+        """
+        self.session.close()
+
+
+def get_client():
     """
-    Envia uma mensagem simples usando o serviço Mailgun.
+    Retorna o cliente do Mailgun da aplicação atual.
+    """
+    return current_app.extensions['mailgun']
+
 
-    :param to: Endereço de e-mail do destinatário.
-    :param subject: Assunto do e-mail.
-    :param new_user: Nome ou detalhes do novo usuário a serem incluídos na mensagem.
+def build_message(to, subject, html=None, text=None):
+    """
+    Monta o dicionário de dados aceito pelo endpoint de mensagens do Mailgun.
+
+    :param to: Endereço (ou lista de endereços) do destinatário.
+    :param subject: Assunto do e-mail, sem o prefixo configurado.
+    :param html: Corpo do e-mail em HTML.
+    :param text: Corpo do e-mail em texto simples.
+    :return: Dicionário pronto para ser enviado ao Mailgun.
     """
-    # Dados do e-mail
     data = {
         'from': f"Flasky <noreply@{current_app.config['MAILGUN_DOMAIN']}>",
-        'to': to,
+        'to': ', '.join(to) if isinstance(to, (list, tuple)) else to,
         'subject': f"{current_app.config['FLASKY_MAIL_SUBJECT_PREFIX']} {subject}",
-        'text': f"Novo usuário cadastrado: {new_user}",
     }
-    try:
-        logger.info("Enviando mensagem para %s", to)
-        response = requests.post(
-            current_app.config['MAILGUN_API_URL'],
-            auth=('api', current_app.config['MAILGUN_API_KEY']),
-            data=data
-        )
-
-        _handle_mailgun_response(response)
+    if html is not None:
+        data['html'] = html
+    if text is not None:
+        data['text'] = text
+    return data
 
-    except requests.exceptions.RequestException as e:
-        logger.exception("Erro ao tentar enviar mensagem devido a uma falha de solicitação HTTP.", exc_info=e)
-        raise  # Levanta a exceção novamente após registrar
-    except Exception as e:
-        logger.exception("Erro inesperado ao enviar mensagem.", exc_info=e)
-        raise  # Levanta a exceção novamente após registrar
 
-
-def send_email_with_gif(to, subject, body, gif_url):
+def send_message(data):
     """
-    Envia um e-mail com um GIF hospedado usando o serviço Mailgun.
+    Envia ao Mailgun uma mensagem já montada por build_message.
 
-    :param to: Endereço de e-mail do destinatário.
-    :param subject: Assunto do e-mail.
-    :param body: Texto do corpo do e-mail.
-    :param gif_url: URL do GIF a ser incluído no e-mail.
+    :param data: Dicionário com os campos da mensagem.
+    :raises Exception: Se o Mailgun não aceitar a mensagem.
     """
-    try:
-        logger.info("Enviando mensagem com GIF para %s", to)
-
-        # Cria o HTML do e-mail com o GIF hospedado
-        html_body = f"""
-        <!DOCTYPE html>
-        <html>
-            <head>
-                <title>Bem-vindo!</title>
-            </head>
-            <body>
-                <p>{body}</p>
-                <p>
-                    <img src="{gif_url}" alt="Welcome GIF" />
-                </p>
-            </body>
-        </html>
-        """
+    logger.info("Enviando mensagem para %s", data['to'])
+    response = get_client().post(data)
+    _handle_mailgun_response(response)
+    if response.status_code != 200:
+        raise Exception(f"Falha ao enviar email: {response.text}")
 
-        # Envia a solicitação POST ao Mailgun
-        response = requests.post(
-            current_app.config['MAILGUN_API_URL'],
-            auth=('api', current_app.config['MAILGUN_API_KEY']),
-            data={
-                'from': f"Flasky <noreply@{current_app.config['MAILGUN_DOMAIN']}>",
-                'to': to,
-                'subject': f"{current_app.config['FLASKY_MAIL_SUBJECT_PREFIX']} {subject}",
-                'html': html_body  # Define o corpo do e-mail como HTML
-            }
-        )
 
-        _handle_mailgun_response(response)
+# Limite de destinatários do Mailgun por requisição em modo batch
+BATCH_LIMIT = 1000
+
+# Modelo de mensagem para envio em lote (outbox.queue_batch). Os campos já vêm
+# renderizados por render_email e podem usar variáveis por destinatário no
+# formato do Mailgun: %recipient.nome_da_variavel%
+BatchTemplate = namedtuple('BatchTemplate', ['subject', 'html', 'text'])
+
 
-    except requests.exceptions.RequestException as e:
-        logger.exception("Erro ao tentar enviar mensagem devido a uma falha de solicitação HTTP.", exc_info=e)
-        raise  # Levanta a exceção novamente após registrar
-    except Exception as e:
-        logger.exception("Erro inesperado ao enviar mensagem.", exc_info=e)
-        raise  # Levanta a exceção novamente após registrar
+def build_batches(messages, batch_size=BATCH_LIMIT):
+    """
+    Agrupa mensagens individuais em requisições no formato batch do Mailgun.
+
+    Mensagens com o mesmo modelo são enviadas em uma única requisição, com
+    todos os destinatários no campo 'to' e as variáveis de cada um em
+    'recipient-variables' (cada destinatário vê apenas o próprio endereço).
+
+    :param messages: Iterável de tuplas (destinatário, BatchTemplate, variáveis).
+    :param batch_size: Quantidade máxima de destinatários por requisição.
+    :return: Lista de dicionários prontos para queue_message.
+    """
+    groups = {}
+    for recipient, template, variables in messages:
+        if not recipient:
+            logger.warning("Mensagem em lote sem destinatário ignorada (modelo %s).", template)
+            continue
+        chunks = groups.setdefault(template, [{}])
+        # Um destinatário só pode aparecer uma vez por requisição
+        if len(chunks[-1]) >= batch_size or recipient in chunks[-1]:
+            chunks.append({})
+        chunks[-1][recipient] = variables or {}
+
+    batches = []
+    for template, chunks in groups.items():
+        for recipient_variables in chunks:
+            data = build_message(list(recipient_variables), template.subject,
+                                 html=template.html, text=template.text)
+            data['recipient-variables'] = json.dumps(recipient_variables)
+            batches.append(data)
+    return batches
 
 
 def _handle_mailgun_response(response):
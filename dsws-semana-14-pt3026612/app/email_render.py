@@ -0,0 +1,116 @@
+from flask import current_app, has_request_context, url_for as flask_url_for
+from jinja2 import Environment, TemplateNotFound, select_autoescape
+from .template_cache import bytecode_cache
+
+# Pasta (dentro de app/templates) com os modelos de e-mail
+EMAIL_TEMPLATE_FOLDER = 'auth/email/'
+
+
+class EmailRenderer:
+    """
+    Renderizador dos e-mails da aplicação.
+
+    Usa um ambiente Jinja próprio, sem recarga automática, no qual todos os
+    modelos de e-mail são compilados uma única vez na criação da aplicação.
+    A renderização não passa por render_template (sinais, context processors
+    e contexto de requisição), o que permite gerar e-mails em massa fora de
+    uma requisição. Os links são montados com um URL adapter próprio,
+    configurado por EMAIL_SERVER_NAME e PREFERRED_URL_SCHEME.
+    """
+
+    def __init__(self, app):
+        """
+        :param app: Aplicação Flask cujos modelos e rotas serão usados.
+        """
+        self.app = app
+        self.env = Environment(
+            loader=app.jinja_loader,
+            autoescape=select_autoescape(['html']),
+            auto_reload=False,
+            cache_size=-1,  # Nunca descarta modelos compilados
+            bytecode_cache=bytecode_cache  # Aplicações seguintes do processo não recompilam
+        )
+        self.env.globals['url_for'] = self.url_for
+        self._adapter = None
+        self._templates = {}
+        self.preload()
+
+    def preload(self):
+        """
+        Compila e guarda todos os modelos da pasta de e-mails (inclusive os layouts).
+        """
+        names = self.env.list_templates(filter_func=lambda name: name.startswith(EMAIL_TEMPLATE_FOLDER))
+        for name in names:
+            self._templates[name] = self.env.get_template(name)
+
+    def get_template(self, name):
+        """
+        Retorna o modelo compilado, carregando-o se ainda não estiver no cache.
+        """
+        template = self._templates.get(name)
+        if template is None:
+            template = self._templates[name] = self.env.get_template(name)
+        return template
+
+    def url_for(self, endpoint, **values):
+        """
+        Gera URLs para os modelos, com ou sem contexto de requisição.
+        """
+        if has_request_context():
+            return flask_url_for(endpoint, **values)
+        external = values.pop('_external', False)
+        if self._adapter is None:
+            config = self.app.config
+            self._adapter = self.app.url_map.bind(
+                config['SERVER_NAME'] or config['EMAIL_SERVER_NAME'],
+                script_name=config['APPLICATION_ROOT'],
+                url_scheme=config['PREFERRED_URL_SCHEME']
+            )
+        return self._adapter.build(endpoint, values, force_external=external)
+
+    def render(self, name, **context):
+        """
+        Renderiza as versões HTML e texto simples de um e-mail.
+
+        :param name: Nome do modelo, sem extensão (ex.: 'auth/email/verify_email').
+        :param context: Variáveis do modelo.
+        :return: Tupla (html, texto). O texto é None se não houver modelo .txt.
+        """
+        html = self.get_template(f'{name}.html').render(context)
+        try:
+            text = self.get_template(f'{name}.txt').render(context).strip()
+        except TemplateNotFound:
+            text = None
+        return html, text
+
+    def render_many(self, name, users, context=None, **common):
+        """
+        Renderiza o mesmo e-mail para vários usuários.
+
+        :param name: Nome do modelo, sem extensão.
+        :param users: Iterável de usuários.
+        :param context: Função opcional que recebe o usuário e retorna variáveis
+                        específicas dele (por exemplo, um token).
+        :param common: Variáveis comuns a todos os e-mails.
+        :return: Gerador de tuplas (usuário, html, texto).
+        """
+        html_template = self.get_template(f'{name}.html')
+        try:
+            text_template = self.get_template(f'{name}.txt')
+        except TemplateNotFound:
+            text_template = None
+        for user in users:
+            variables = dict(common, user=user, username=user.username)
+            if context is not None:
+                variables.update(context(user))
+            text = text_template.render(variables).strip() if text_template else None
+            yield user, html_template.render(variables), text
+
+
+def render_email(name, **context):
+    """
+    Renderiza um e-mail com o renderizador da aplicação atual.
+
+    :return: Tupla (html, texto).
+    """
+    return current_app.extensions['email_renderer'].render(name, **context)
@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+from datetime import datetime
+from . import db
+from .models import User, Role
+
+# Tabelas exportáveis: colunas (nome no arquivo, coluna) e junções necessárias.
+# A senha (password_hash) nunca é exportada.
+EXPORTS = {
+    'users': {
+        'columns': [('id', User.id), ('username', User.username), ('prontuario', User.prontuario),
+                    ('email', User.email), ('role', Role.name), ('confirmed', User.confirmed),
+                    ('created_at', User.created_at)],
+        'joins': [(Role, User.role_id == Role.id)],
+        'order_by': User.id,
+    },
+    'roles': {
+        'columns': [('id', Role.id), ('name', Role.name)],
+        'joins': [],
+        'order_by': Role.id,
+    },
+}
+
+FORMATS = {'csv': 'text/csv', 'jsonl': 'application/x-ndjson'}
+
+
+def export_query(table):
+    """
+    Consulta das colunas exportadas (linhas simples, sem instâncias do ORM).
+    """
+    spec = EXPORTS[table]
+    query = db.select(*(column.label(name) for name, column in spec['columns']))
+    query = query.select_from(spec['columns'][0][1].class_)
+    for target, condition in spec['joins']:
+        query = query.outerjoin(target, condition)
+    return query.order_by(spec['order_by'])
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def export_rows(table, fmt='csv', chunk_size=1000):
+    """
+    Gera o conteúdo da exportação em pedaços, com memória constante.
+
+    As linhas são lidas do cursor em lotes de chunk_size (yield_per) e cada
+    lote é convertido em um único pedaço de texto.
+
+    :param table: 'users' ou 'roles'.
+    :param fmt: 'csv' ou 'jsonl'.
+    :param chunk_size: Linhas lidas do banco por vez.
+    :return: Gerador de strings.
+    """
+    if table not in EXPORTS:
+        raise ValueError(f"Tabela não exportável: {table}.")
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato não suportado: {fmt}.")
+    names = [name for name, _ in EXPORTS[table]['columns']]
+    result = db.session.execute(export_query(table).execution_options(yield_per=chunk_size))
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writerow(names)
+    try:
+        for rows in result.partitions():
+            for row in rows:
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(names, map(_json_value, row))), ensure_ascii=False))
+                    buffer.write('\n')
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        result.close()
@@ -0,0 +1,173 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from flask import current_app, has_app_context
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class HashingBusy(Exception):
+    """
+    Lançada quando a fila de cálculos de senha está cheia ou demorou demais.
+    """
+
+    def __init__(self, retry_after=1):
+        super().__init__("Serviço de senhas sobrecarregado; tente novamente em instantes.")
+        self.retry_after = retry_after
+
+
+def hash_parameters(method):
+    """
+    Método e parâmetros efetivos de um método de hash do Werkzeug.
+
+    Completa os valores omitidos como em werkzeug.security._hash_internal:
+    'scrypt' equivale a 'scrypt:32768:8:1' e 'pbkdf2:sha256', a
+    'pbkdf2:sha256:<iterações padrão>'.
+
+    :param method: Método da configuração ou do início de um hash (antes do primeiro '$').
+    :return: Tupla comparável (ex.: ('pbkdf2', 'sha256', 600000)).
+    :raise ValueError: Se o método não for reconhecido.
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        if not args:
+            return ('scrypt', 2 ** 15, 8, 1)
+        if len(args) != 3:
+            raise ValueError("'scrypt' recebe 3 parâmetros.")
+        return ('scrypt', *map(int, args))
+    if name == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' recebe 2 parâmetros.")
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return ('pbkdf2', hash_name, iterations)
+    raise ValueError(f"Método de hash inválido: '{method}'.")
+
+
+class PasswordHasher:
+    """
+    Cálculo de hashes de senha fora da thread da requisição.
+
+    O PBKDF2/scrypt do Werkzeug é caro de propósito. Em vez de rodar na
+    thread de cada requisição, o cálculo é feito por um pool limitado a
+    PASSWORD_HASH_WORKERS threads (o hashlib libera o GIL durante o cálculo).
+    No máximo PASSWORD_HASH_MAX_QUEUE cálculos ficam aguardando; além disso,
+    a chamada falha imediatamente com HashingBusy, de modo que uma rajada de
+    logins não ocupa todas as threads do servidor.
+    """
+
+    def __init__(self, config):
+        """
+        :param config: Configuração da aplicação (app.config).
+        """
+        self.method = config['PASSWORD_HASH_METHOD']
+        self._parameters = hash_parameters(self.method)
+        self.workers = config['PASSWORD_HASH_WORKERS']
+        self.timeout = config['PASSWORD_HASH_TIMEOUT']
+        # Cálculos em execução mais os que aguardam uma thread livre
+        self._slots = threading.BoundedSemaphore(self.workers + config['PASSWORD_HASH_MAX_QUEUE'])
+        self._executor = None
+        self._lock = threading.Lock()
+        self.counters = {'completed': 0, 'rejected': 0, 'timeouts': 0, 'rehashed': 0}
+        self._pending = 0
+        self._max_pending = 0
+        self._busy_seconds = 0.0
+
+    def _submit(self, fn, *args):
+        """
+        Executa fn no pool e aguarda o resultado.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.counters['rejected'] += 1
+            logger.warning("Fila de hashes cheia (%s pendentes); requisição recusada.", self._pending)
+            raise HashingBusy()
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+            self._pending += 1
+            self._max_pending = max(self._max_pending, self._pending)
+        future = self._executor.submit(self._run, fn, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.counters['timeouts'] += 1
+            raise HashingBusy()
+
+    def _run(self, fn, *args):
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.counters['completed'] += 1
+                self._busy_seconds += time.perf_counter() - start
+            self._slots.release()
+
+    def hash(self, password):
+        """
+        Gera o hash da senha com o método configurado.
+        """
+        return self._submit(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """
+        Compara a senha com o hash armazenado.
+        """
+        if not password_hash:
+            return False
+        return self._submit(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        Indica se o hash foi gerado com parâmetros diferentes dos atuais.
+
+        O Werkzeug guarda o método e o custo no início do hash
+        (ex.: 'pbkdf2:sha256:600000$sal$hash'), com os valores omitidos na
+        configuração já preenchidos; os dois lados são comparados assim.
+        """
+        if not password_hash:
+            return False
+        try:
+            return hash_parameters(password_hash.split('$', 1)[0]) != self._parameters
+        except ValueError:
+            return True  # Formato desconhecido: refeito com o método atual
+
+    def record_rehash(self):
+        with self._lock:
+            self.counters['rehashed'] += 1
+
+    def stats(self):
+        """
+        Métricas do pool: profundidade da fila, pico e contadores.
+        """
+        with self._lock:
+            completed = self.counters['completed']
+            return dict(self.counters,
+                        method=self.method,
+                        workers=self.workers,
+                        pending=self._pending,
+                        max_pending=self._max_pending,
+                        average_ms=self._busy_seconds / completed * 1000 if completed else 0.0)
+
+    def close(self):
+        """
+        Encerra as threads do pool.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+
+def get_password_hasher():
+    """
+    Retorna o serviço de senhas da aplicação atual, ou None fora de uma aplicação.
+    """
+    if has_app_context():
+        return current_app.extensions.get('password_hasher')
+    return None
@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app, has_app_context
+
+
+class IdentityCache:
+    """
+    Cache, por processo, dos dados dos usuários carregados pelo login_manager.
+
+    Guarda apenas os valores das colunas (nunca instâncias do ORM, que
+    pertencem à sessão de uma requisição), com tamanho máximo (LRU) e
+    validade (TTL). Dentro de uma mesma requisição o Flask-Login já guarda o
+    usuário em flask.g, então cada requisição consulta o cache uma vez.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        """
+        :param maxsize: Quantidade máxima de usuários guardados.
+        :param ttl: Validade, em segundos, de cada entrada (0 desativa o cache).
+        :param clock: Relógio usado para a validade (substituível nos testes).
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, user_id):
+        """
+        Retorna os dados guardados do usuário ou None.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] <= self.clock():
+                if entry is not None:
+                    del self._entries[user_id]
+                self.counters['misses'] += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.counters['hits'] += 1
+            return entry[1]
+
+    def set(self, user_id, data):
+        """
+        Guarda os dados do usuário, descartando o menos usado se o cache estiver cheio.
+        """
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (self.clock() + self.ttl, data)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.counters['evictions'] += 1
+
+    def invalidate(self, user_id):
+        """
+        Remove o usuário do cache (após alteração ou remoção).
+        """
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.counters['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, size=len(self._entries))
+
+
+def get_identity_cache():
+    """
+    Retorna o cache de identidades da aplicação atual, ou None fora de uma aplicação.
+    """
+    if has_app_context():
+        return current_app.extensions.get('identity_cache')
+    return None
@@ -0,0 +1,205 @@
+import csv
+import json
+import logging
+import os
+import secrets
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+from . import db
+from .auth.forms import UserFields, RegistrationForm
+from .models import User, Role
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Campos únicos de cada aluno, validados como no formulário de cadastro
+UNIQUE_FIELDS = ('email', 'username', 'prontuario')
+
+# Linha recusada: número da linha no arquivo, dados lidos e erros por campo
+RejectedRow = namedtuple('RejectedRow', ['line', 'row', 'errors'])
+
+# Resultado da importação: quantidade de usuários criados e linhas recusadas
+ImportReport = namedtuple('ImportReport', ['imported', 'rejected'])
+
+
+def read_rows(path, fmt=None):
+    """
+    Lê o arquivo de alunos linha a linha, sem carregá-lo inteiro na memória.
+
+    :param path: Caminho do arquivo CSV (com cabeçalho) ou JSONL.
+    :param fmt: 'csv' ou 'jsonl' (padrão: deduzido da extensão).
+    :return: Gerador de tuplas (número da linha, dicionário com os campos).
+    """
+    fmt = fmt or ('jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson') else 'csv')
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line, text in enumerate(f, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError as e:
+                yield line, {'_error': f'JSON inválido: {e}'}
+                continue
+            yield line, row if isinstance(row, dict) else {'_error': 'A linha não é um objeto JSON.'}
+
+
+def validate_row(row, roles):
+    """
+    Valida uma linha com as mesmas regras do formulário de cadastro.
+
+    :param row: Dicionário com username, prontuario, email e role (opcional).
+    :param roles: Dicionário nome do papel -> id.
+    :return: Tupla (valores normalizados, erros por campo).
+    """
+    if '_error' in row:
+        return None, {'linha': [row['_error']]}
+    values = {field: str(row.get(field) or '').strip() for field in UNIQUE_FIELDS}
+    form = UserFields(data=values)
+    errors = {} if form.validate() else dict(form.errors)
+    role = str(row.get('role') or '').strip()
+    if role and role not in roles:
+        errors['role'] = [f'Papel desconhecido: {role}.']
+    values['role_id'] = roles.get(role)
+    return values, errors
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _taken_values(rows):
+    """
+    Valores dos campos únicos já gravados no banco, em uma única consulta por lote.
+    """
+    columns = [getattr(User, field) for field in UNIQUE_FIELDS]
+    existing = db.session.execute(
+        db.select(*columns).where(db.or_(*(
+            column.in_([values[field] for _, _, values in rows])
+            for field, column in zip(UNIQUE_FIELDS, columns)
+        )))
+    ).all()
+    return {field: {row[index] for row in existing} for index, field in enumerate(UNIQUE_FIELDS)}
+
+
+def _hash_passwords(passwords, method, executor, processes):
+    if executor is None:
+        return [generate_password_hash(password, method) for password in passwords]
+    chunksize = max(1, len(passwords) // (processes * 4))
+    return list(executor.map(generate_password_hash, passwords, [method] * len(passwords), chunksize=chunksize))
+
+
+def _insert(records, rows, rejected):
+    """
+    Grava um lote com um único INSERT e um commit.
+
+    Se outro processo gravou algum dos valores depois da verificação, o lote
+    é refeito linha a linha para separar apenas as linhas em conflito.
+    """
+    try:
+        db.session.execute(db.insert(User), records)
+        db.session.commit()
+        return len(records)
+    except IntegrityError:
+        db.session.rollback()
+    imported = 0
+    for record, (line, row, _) in zip(records, rows):
+        try:
+            db.session.execute(db.insert(User), [record])
+            db.session.commit()
+            imported += 1
+        except IntegrityError as e:
+            db.session.rollback()
+            rejected.append(RejectedRow(line, row, {'linha': [f'Conflito ao gravar: {e.orig}']}))
+    return imported
+
+
+def import_users(path, fmt=None, batch_size=500, processes=None, hash_method=None, progress=None):
+    """
+    Importa alunos de um arquivo CSV ou JSONL.
+
+    Cada lote é validado, tem as senhas calculadas em um pool de processos e é
+    gravado com um INSERT em lote e um commit. Linhas com a coluna password
+    usam essa senha inicial; as demais recebem uma senha aleatória e devem
+    usar a redefinição de senha no primeiro acesso.
+
+    :param path: Caminho do arquivo.
+    :param fmt: 'csv' ou 'jsonl' (padrão: deduzido da extensão).
+    :param batch_size: Linhas gravadas por commit.
+    :param processes: Processos usados no cálculo dos hashes (padrão: CPUs disponíveis).
+    :param hash_method: Método de hash (padrão: PASSWORD_HASH_METHOD). Hashes mais baratos
+                        são refeitos automaticamente no primeiro login.
+    :param progress: Função opcional chamada após cada lote com (importados, recusados).
+    :return: ImportReport.
+    """
+    method = hash_method or current_app.config['PASSWORD_HASH_METHOD']
+    processes = processes or os.cpu_count() or 1
+    roles = dict(db.session.execute(db.select(Role.name, Role.id)).all())
+    seen = {field: set() for field in UNIQUE_FIELDS}
+    messages = RegistrationForm.unique.messages
+    rejected = []
+    imported = 0
+    executor = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+    try:
+        for chunk in _chunks(read_rows(path, fmt), batch_size):
+            rows = []
+            for line, row in chunk:
+                values, errors = validate_row(row, roles)
+                if not errors:
+                    errors = {field: ['Valor repetido no arquivo.'] for field in UNIQUE_FIELDS
+                              if values[field] in seen[field]}
+                if errors:
+                    rejected.append(RejectedRow(line, row, errors))
+                    continue
+                for field in UNIQUE_FIELDS:
+                    seen[field].add(values[field])
+                rows.append((line, row, values))
+            if rows:
+                taken = _taken_values(rows)
+                valid = []
+                for line, row, values in rows:
+                    errors = {field: [messages[field]] for field in UNIQUE_FIELDS if values[field] in taken[field]}
+                    if errors:
+                        rejected.append(RejectedRow(line, row, errors))
+                    else:
+                        valid.append((line, row, values))
+                passwords = [str(row.get('password') or '') or secrets.token_urlsafe(12) for _, row, _ in valid]
+                now = datetime.utcnow()
+                records = [dict(values, password_hash=password_hash, confirmed=False, created_at=now, updated_at=now)
+                           for (_, _, values), password_hash in zip(valid, _hash_passwords(passwords, method, executor, processes))]
+                if records:
+                    imported += _insert(records, valid, rejected)
+            logger.info("Importação: %s usuários criados, %s linhas recusadas.", imported, len(rejected))
+            if progress is not None:
+                progress(imported, len(rejected))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return ImportReport(imported, sorted(rejected, key=lambda item: item.line))
+
+
+def write_rejected(rejected, path):
+    """
+    Grava as linhas recusadas em um CSV (linha, erros, dados originais).
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['linha', 'erros', 'dados'])
+        for item in rejected:
+            errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in item.errors.items())
+            writer.writerow([item.line, errors, json.dumps(item.row, ensure_ascii=False)])
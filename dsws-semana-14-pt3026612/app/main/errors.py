@@ -1,5 +1,6 @@
 from flask import render_template
 from . import main
+from ..hashing import HashingBusy
 
 # Tratamento de erro 404 (página não encontrada)
 @main.app_errorhandler(404)
@@ -32,3 +33,20 @@ def forbidden(e):
     Tratador de erro para acesso proibido (403).
     """
     return render_template('403.html'), 403
+
+# Tratamento de erro 429 (limite de requisições excedido)
+@main.app_errorhandler(429)
+def too_many_requests(e):
+    """
+    Tratador para clientes que excederam o limite de requisições (429).
+    """
+    headers = {'Retry-After': str(e.retry_after)} if getattr(e, 'retry_after', None) else {}
+    return render_template('429.html'), 429, headers
+
+# Serviço de senhas sobrecarregado (fila de hashes cheia)
+@main.app_errorhandler(HashingBusy)
+def hashing_busy(e):
+    """
+    Tratador para quando o pool de hashes de senha não aceita mais pedidos (503).
+    """
+    return render_template('503.html'), 503, {'Retry-After': str(e.retry_after)}
@@ -1,6 +1,11 @@
-from flask import render_template, redirect, url_for
+from flask import render_template, redirect, url_for, abort, Response, stream_with_context
+from flask_login import login_required
 from . import main
-from .. import db
+from ..decorators import admin_required
+from ..exporter import EXPORTS, FORMATS, export_rows
+from ..identity import get_identity_cache
+from ..replica import replica_reads
+from ..snapshot import get_schema_snapshot
 
 
 @main.route('/')
@@ -9,7 +14,23 @@ def index():
 
 @main.route('/reset-db')
 def reset_db():
-    db.drop_all()
-    db.create_all()
-    db.session.commit()
+    # Restaura a imagem do banco vazio (montada uma vez) em vez de refazer o DDL
+    get_schema_snapshot().restore()
+    get_identity_cache().clear()
     return redirect(url_for('main.index'))
+
+@main.route('/export/<table>.<fmt>')
+@login_required
+@admin_required
+@replica_reads
+def export(table, fmt):
+    """
+    Exporta usuários ou papéis em CSV ou JSONL, como resposta em streaming.
+    """
+    if table not in EXPORTS or fmt not in FORMATS:
+        abort(404)
+    return Response(
+        stream_with_context(export_rows(table, fmt)),
+        mimetype=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={table}.{fmt}'}
+    )
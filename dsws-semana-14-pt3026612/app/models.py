@@ -1,12 +1,17 @@
-from itsdangerous import URLSafeTimedSerializer,BadSignature, SignatureExpired
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from . import db, login_manager
 from flask_login import UserMixin
-from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy.orm import make_transient_to_detached, object_session
+from .tokens import get_token_service
+from .hashing import get_password_hasher
+from .identity import get_identity_cache
+from .replica import use_primary
+from .persistence import BulkMixin, persist
 
 # Modelo para cargos ou papéis no sistema
-class Role(db.Model):
+class Role(BulkMixin, db.Model):
     __tablename__ = 'roles'  # Nome da tabela no banco de dados
     id = db.Column(db.Integer, primary_key=True)  # Chave primária
     name = db.Column(db.String(64), unique=True, nullable=False)  # Nome do papel, único e obrigatório
@@ -25,12 +30,11 @@ class Role(db.Model):
         Possíveis erros:
         - IntegrityError: Se houver tentativa de salvar um papel com o mesmo nome já existente (violação de unicidade).
         - SQLAlchemyError: Qualquer outro erro de banco de dados.
+        Dentro de unit_of_work(), o commit fica para o fim do bloco.
         """
         try:
-            db.session.add(self)
-            db.session.commit()
+            persist(self)
         except Exception as e:
-            db.session.rollback()  # Reverte alterações no caso de erro
             raise RuntimeError(f"Erro ao salvar o papel '{self.name}': {str(e)}")
 
     def delete(self):
@@ -41,14 +45,12 @@ class Role(db.Model):
         - SQLAlchemyError: Qualquer outro erro de banco de dados.
         """
         try:
-            db.session.delete(self)
-            db.session.commit()
+            persist(self, delete=True)
         except Exception as e:
-            db.session.rollback()  # Reverte alterações no caso de erro
             raise RuntimeError(f"Erro ao deletar o papel '{self.name}': {str(e)}")
 
 # Modelo para usuários
-class User(UserMixin, db.Model):
+class User(UserMixin, BulkMixin, db.Model):
     __tablename__ = 'users'  # Nome da tabela no banco de dados
     id = db.Column(db.Integer, primary_key=True)  # Chave primária
     username = db.Column(db.String(64), unique=True, index=True, nullable=False)  # Nome do usuário, único e indexado
@@ -60,6 +62,11 @@ class User(UserMixin, db.Model):
     password_hash = db.Column(db.String(128))
     confirmed = db.Column(db.Boolean, default=False)
 
+    # Paginação por chave em /api/users ordenada por data de criação
+    __table_args__ = (
+        db.Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+
     # Criação de uma propriedade somente para leitura chamada password
     # Tentativa de ler a propriedade password resultará em um erro
     @property
@@ -68,46 +75,86 @@ class User(UserMixin, db.Model):
 
     # Quando a propriedade password for definida, o método setter chamará a função generate_password_hash
     # e escreverá o resultado no campo password_hash
+    # O cálculo é feito pelo serviço de senhas da aplicação (app/hashing.py), fora da thread da requisição
     @password.setter
     def password(self, password):
-        self.password_hash = generate_password_hash(password)
+        hasher = get_password_hasher()
+        self.password_hash = hasher.hash(password) if hasher else generate_password_hash(password)
 
     # Compara senha fornecida pelo usuário com o hash armazenado
     # Se True, senha correta
     def verify_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        hasher = get_password_hasher()
+        if hasher is None:
+            return check_password_hash(self.password_hash, password)
+        if not hasher.verify(self.password_hash, password):
+            return False
+        # Hash gerado com método ou custo antigos: recalcula com os parâmetros atuais.
+        # O commit fica a cargo de quem chamou (ex.: auth.login)
+        if hasher.needs_rehash(self.password_hash):
+            self.password_hash = hasher.hash(password)
+            db.session.add(self)
+            hasher.record_rehash()
+        return True
 
     def generate_confirmation_token(self, expiration=3600):
-        secret_key = current_app.config['SECRET_KEY']
-        # Garantir que a chave secreta esteja no formato correto
-        if isinstance(secret_key, str):
-            secret_key = secret_key.encode('utf-8')
-        # Criando o Serializer
-        s = URLSafeTimedSerializer(secret_key)
         # Gerando o token com expiração
-        token = s.dumps({'confirm': self.id}, salt='confirmation')
-        return token
+        return get_token_service().generate({'confirm': self.id}, salt='confirmation', expiration=expiration)
 
     def confirm(self, token):
-        try:
-            # Obter a chave secreta do aplicativo
-            secret_key = current_app.config['SECRET_KEY']
-            if isinstance(secret_key, str):
-                secret_key = secret_key.encode('utf-8')
-            # Criando o Serializer
-            s = URLSafeTimedSerializer(secret_key)
-            # Decodificação do token com salt e expiration no método loads
-            data = s.loads(token, salt='confirmation')  # max_age define a expiração do token
-            # Comparação do IDs
-            if data.get('confirm') == self.id:
-                # Marcar o usuário como confirmado
-                self.confirmed = True
-                self.save()  # Salvar o usuário com a atualização do campo 'confirmed'
-                return True
+        # Decodificação do token; None se for inválido ou tiver expirado
+        data = get_token_service().verify(token, salt='confirmation')
+        # Comparação do IDs
+        if data is None or data.get('confirm') != self.id:
             return False
-        except (SignatureExpired, BadSignature):
-            return False  # Retorna False se o token expirou
+        # Marcar o usuário como confirmado
+        # O commit fica a cargo de quem chamou, para que as notificações
+        # da confirmação entrem na fila na mesma transação
+        self.confirmed = True
+        db.session.add(self)
+        return True
 
+    def generate_reset_token(self, expiration=3600):
+        return get_token_service().generate({'reset': self.id}, salt='reset', expiration=expiration)
+
+    @staticmethod
+    def reset_password(token, new_password):
+        """
+        Define uma nova senha a partir de um token de redefinição.
+        O commit fica a cargo de quem chamou.
+
+        :return: True se o token for válido e a senha tiver sido alterada.
+        """
+        data = get_token_service().verify(token, salt='reset')
+        if data is None:
+            return False
+        user = db.session.get(User, data.get('reset'))
+        if user is None:
+            return False
+        user.password = new_password
+        db.session.add(user)
+        return True
+
+    def generate_email_change_token(self, new_email, expiration=3600):
+        return get_token_service().generate({'change_email': self.id, 'new_email': new_email},
+                                            salt='change_email', expiration=expiration)
+
+    def change_email(self, token):
+        """
+        Altera o e-mail do usuário a partir de um token de troca de e-mail.
+        O commit fica a cargo de quem chamou.
+
+        :return: True se o token for válido e o novo e-mail estiver disponível.
+        """
+        data = get_token_service().verify(token, salt='change_email')
+        if data is None or data.get('change_email') != self.id:
+            return False
+        new_email = data.get('new_email')
+        if new_email is None or User.query.filter_by(email=new_email).first() is not None:
+            return False
+        self.email = new_email
+        db.session.add(self)
+        return True
 
     def __repr__(self):
         """
@@ -122,12 +169,11 @@ class User(UserMixin, db.Model):
         Possíveis erros:
         - IntegrityError: Se houver duplicidade nos campos 'username', 'prontuario' ou 'email'.
         - SQLAlchemyError: Qualquer outro erro de banco de dados.
+        Dentro de unit_of_work(), o commit fica para o fim do bloco.
         """
         try:
-            db.session.add(self)
-            db.session.commit()
+            persist(self)
         except Exception as e:
-            db.session.rollback()  # Reverte alterações no caso de erro
             raise RuntimeError(f"Erro ao salvar o usuário '{self.username}': {str(e)}")
 
     def delete(self):
@@ -137,12 +183,15 @@ class User(UserMixin, db.Model):
         - SQLAlchemyError: Qualquer erro de banco de dados durante a exclusão.
         """
         try:
-            db.session.delete(self)
-            db.session.commit()
+            persist(self, delete=True)
         except Exception as e:
-            db.session.rollback()  # Reverte alterações no caso de erro
             raise RuntimeError(f"Erro ao deletar o usuário '{self.username}': {str(e)}")
 
+    @classmethod
+    def _bulk_deleted(cls, ids):
+        # bulk_delete não dispara after_delete: o cache de identidades é limpo aqui
+        _invalidate_after_commit(db.session(), ids)
+
     @staticmethod
     def get_user_by_email(email):
         """
@@ -158,6 +207,121 @@ class User(UserMixin, db.Model):
         except Exception as e:
             raise RuntimeError(f"Erro ao buscar usuário com email '{email}': {str(e)}")
 
+# Fila persistente de e-mails a serem enviados pelo worker (flask mail-worker)
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    to = db.Column(db.Text, nullable=False)  # Destinatário(s), apenas para consulta/logs
+    subject = db.Column(db.String(255), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # Dados da mensagem do Mailgun em JSON
+    status = db.Column(db.String(16), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    last_error = db.Column(db.Text)
+    claimed_by = db.Column(db.String(32))  # Identificador do worker que reservou a mensagem
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Próxima tentativa ou fim da reserva
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_available_at', 'status', 'available_at'),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.status} - {self.to}>'
+
+# Eventos aguardando o próximo resumo (digest) enviado aos administradores
+class AdminNotification(db.Model):
+    __tablename__ = 'admin_notifications'
+    id = db.Column(db.Integer, primary_key=True)
+    event = db.Column(db.String(64), nullable=False)  # Tipo do evento (ex.: 'Novo Cadastro')
+    detail = db.Column(db.String(255), nullable=False)  # Descrição do evento (ex.: nome do usuário)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    digested_at = db.Column(db.DateTime, index=True)  # Preenchido quando o evento entra em um resumo
+
+    def __repr__(self):
+        return f'<AdminNotification {self.event} - {self.detail}>'
+
+# Cadastros nunca confirmados removidos por flask prune-unconfirmed (sem senha nem dados de sessão)
+class ArchivedUser(db.Model):
+    __tablename__ = 'archived_users'
+    id = db.Column(db.Integer, primary_key=True)
+    # Chave primária original do usuário; sem unicidade, pois o SQLite reutiliza o id do último usuário removido
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    username = db.Column(db.String(64), nullable=False)
+    prontuario = db.Column(db.String(10), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    role_id = db.Column(db.Integer)  # Sem chave estrangeira: o arquivo sobrevive à remoção do papel
+    created_at = db.Column(db.DateTime, nullable=False)  # Data do cadastro
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ArchivedUser {self.username}>'
+
+def _invalidate_identity(user_id):
+    """
+    Remove o usuário do cache de identidades usado por load_user.
+    """
+    cache = get_identity_cache()
+    if cache is not None and user_id is not None:
+        cache.invalidate(user_id)
+
+# Chave de session.info com os ids dos usuários alterados na transação em andamento
+IDENTITY_PENDING = 'identity_invalidate'
+
+def _invalidate_after_commit(session, user_ids):
+    """
+    Remove os usuários do cache quando a transação da sessão for confirmada.
+
+    Antes do commit, um load_user concorrente ainda lê a linha antiga e a
+    colocaria de volta no cache; fora de uma transação, remove na hora.
+    """
+    if session is None or not session.in_transaction():
+        for user_id in user_ids:
+            _invalidate_identity(user_id)
+        return
+    session.info.setdefault(IDENTITY_PENDING, set()).update(user_ids)
+
+# Qualquer UPDATE/DELETE de um usuário (troca de senha, e-mail, confirmação...) invalida o cache
+@db.event.listens_for(User, 'after_update')
+@db.event.listens_for(User, 'after_delete')
+def _user_changed(mapper, connection, target):
+    _invalidate_after_commit(object_session(target), [target.id])
+
+@db.event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    for user_id in session.info.pop(IDENTITY_PENDING, ()):
+        _invalidate_identity(user_id)
+
+@db.event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    if previous_transaction.parent is None:  # Rollback de um begin_nested() mantém os ids da transação
+        session.info.pop(IDENTITY_PENDING, None)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """
+    Carrega o usuário da sessão do Flask-Login.
+
+    Os dados vêm do cache de identidades quando possível; a instância é então
+    anexada à sessão com merge(load=False), sem consulta ao banco, e continua
+    podendo ser alterada e gravada normalmente pelas views. Sem cache, a
+    leitura é feita no primário, mesmo em views que usam a réplica: uma linha
+    atrasada da réplica ficaria no cache por IDENTITY_CACHE_TTL segundos.
+    """
+    user_id = int(user_id)
+    cache = get_identity_cache()
+    data = cache.get(user_id) if cache is not None else None
+    if data is not None:
+        user = User(**data)
+        make_transient_to_detached(user)  # Instância "já gravada", com os dados do cache
+        return db.session.merge(user, load=False)
+    with use_primary():
+        user = db.session.get(User, user_id)
+    if user is not None and cache is not None:
+        cache.set(user_id, {attr.key: getattr(user, attr.key) for attr in db.inspect(User).column_attrs})
+    return user
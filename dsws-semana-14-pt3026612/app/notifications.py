@@ -0,0 +1,89 @@
+import logging
+from datetime import datetime, timedelta
+from flask import current_app
+from . import db
+from .email import BatchTemplate
+from .email_render import render_email
+from .models import AdminNotification
+from .outbox import queue_batch
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def notify_admins(event, detail):
+    """
+    Registra um evento para o próximo resumo enviado aos administradores.
+
+    Assim como queue_email, o evento é apenas adicionado à sessão atual e é
+    gravado no commit de quem o registrou.
+
+    :param event: Tipo do evento (ex.: 'Novo Cadastro').
+    :param detail: Descrição do evento (ex.: nome do usuário).
+    :return: Instância de AdminNotification adicionada à sessão.
+    """
+    notification = AdminNotification(event=event, detail=detail)
+    db.session.add(notification)
+    return notification
+
+
+def admin_recipients():
+    """
+    Endereços que recebem o resumo: o e-mail da escola e o administrador.
+    """
+    config = current_app.config
+    return [email for email in (config['FLASKY_SCHOOL_EMAIL'], config['FLASKY_ADMIN']) if email]
+
+
+def flush_admin_digest(force=False):
+    """
+    Agrupa os eventos pendentes em resumos e os coloca na fila de e-mails.
+
+    Um resumo é gerado quando o evento mais antigo já esperou
+    ADMIN_DIGEST_WINDOW segundos ou quando há ADMIN_DIGEST_MAX_BATCH eventos
+    pendentes. Cada resumo contém no máximo ADMIN_DIGEST_MAX_BATCH eventos e é
+    enviado a todos os administradores em uma única requisição ao Mailgun.
+
+    :param force: Se True, gera o resumo mesmo antes do fim da janela.
+    :return: Quantidade de resumos colocados na fila.
+    """
+    config = current_app.config
+    max_batch = config['ADMIN_DIGEST_MAX_BATCH']
+    window = timedelta(seconds=config['ADMIN_DIGEST_WINDOW'])
+    digests = 0
+    while True:
+        events = db.session.scalars(
+            db.select(AdminNotification)
+            .where(AdminNotification.digested_at.is_(None))
+            .order_by(AdminNotification.id)
+            .limit(max_batch)
+        ).all()
+        now = datetime.utcnow()
+        if not events:
+            break
+        if not force and len(events) < max_batch and events[0].created_at > now - window:
+            break
+
+        # Reserva os eventos; outro worker pode ter gerado o mesmo resumo antes
+        ids = [event.id for event in events]
+        result = db.session.execute(
+            db.update(AdminNotification)
+            .where(AdminNotification.id.in_(ids), AdminNotification.digested_at.is_(None))
+            .values(digested_at=now)
+        )
+        if result.rowcount != len(ids):
+            db.session.rollback()
+            break
+
+        grouped = {}
+        for event in events:
+            grouped.setdefault(event.event, []).append(event.detail)
+        html, text = render_email('auth/email/admin_digest', events=list(grouped.items()),
+                                  start=events[0].created_at, end=events[-1].created_at)
+        template = BatchTemplate(subject=f'Resumo de notificações ({len(events)})', html=html, text=text)
+        queue_batch([(recipient, template, {}) for recipient in admin_recipients()])
+        db.session.commit()
+        digests += 1
+        logger.info("Resumo com %s eventos colocado na fila.", len(events))
+    return digests
@@ -0,0 +1,186 @@
+import json
+import logging
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from . import db
+from .delivery import MailgunUnavailable
+from .email import build_message, build_batches, send_message
+from .models import EmailOutbox
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def queue_email(to, subject, html=None, text=None):
+    """
+    Coloca um e-mail na fila persistente (tabela email_outbox).
+
+    A mensagem é apenas adicionada à sessão atual: ela é gravada no mesmo
+    commit da alteração do usuário que a originou e enviada depois pelo
+    worker (flask mail-worker).
+
+    :param to: Endereço (ou lista de endereços) do destinatário.
+    :param subject: Assunto do e-mail, sem o prefixo configurado.
+    :param html: Corpo do e-mail em HTML.
+    :param text: Corpo do e-mail em texto simples.
+    :return: Instância de EmailOutbox adicionada à sessão.
+    """
+    return queue_message(build_message(to, subject, html=html, text=text))
+
+
+def queue_message(data):
+    """
+    Coloca na fila uma mensagem já montada por build_message.
+
+    :param data: Dicionário com os campos da mensagem do Mailgun.
+    :return: Instância de EmailOutbox adicionada à sessão.
+    """
+    message = EmailOutbox(to=data['to'], subject=data['subject'], payload=json.dumps(data))
+    db.session.add(message)
+    return message
+
+
+def queue_batch(messages):
+    """
+    Coloca na fila mensagens agrupadas no formato batch do Mailgun.
+
+    :param messages: Iterável de tuplas (destinatário, BatchTemplate, variáveis).
+    :return: Lista de instâncias de EmailOutbox adicionadas à sessão.
+    """
+    return [queue_message(data) for data in build_batches(messages)]
+
+
+def _claim_batch(batch_size):
+    """
+    Reserva um lote de mensagens prontas para envio.
+
+    Mensagens em 'sending' cuja reserva expirou (worker interrompido) voltam
+    a ser elegíveis. A reserva é feita com um UPDATE condicional, de modo que
+    dois workers nunca enviem a mesma mensagem.
+
+    :return: Lista de mensagens reservadas por este worker.
+    """
+    now = datetime.utcnow()
+    ready = db.and_(
+        EmailOutbox.status.in_([EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING]),
+        EmailOutbox.available_at <= now
+    )
+    ids = db.session.scalars(
+        db.select(EmailOutbox.id).where(ready).order_by(EmailOutbox.id).limit(batch_size)
+    ).all()
+    if not ids:
+        return []
+
+    token = uuid.uuid4().hex
+    lease = timedelta(seconds=current_app.config['MAIL_OUTBOX_LEASE'])
+    db.session.execute(
+        db.update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), ready)
+        .values(status=EmailOutbox.STATUS_SENDING, claimed_by=token, available_at=now + lease)
+    )
+    db.session.commit()
+    return db.session.scalars(
+        db.select(EmailOutbox).where(EmailOutbox.claimed_by == token,
+                                     EmailOutbox.status == EmailOutbox.STATUS_SENDING)
+    ).all()
+
+
+def _deliver(app, data):
+    """
+    Envia uma mensagem dentro de uma thread do pool.
+
+    :return: None em caso de sucesso ou a exceção lançada.
+    """
+    with app.app_context():
+        try:
+            send_message(data)
+            return None
+        except Exception as e:
+            return e
+
+
+def process_outbox(batch_size=None, workers=None):
+    """
+    Envia um lote de mensagens da fila, em paralelo.
+
+    Apenas as chamadas HTTP rodam nas threads; a atualização dos registros é
+    feita na thread atual, em um único commit por lote.
+
+    :param batch_size: Quantidade máxima de mensagens reservadas por lote.
+    :param workers: Quantidade de envios simultâneos.
+    :return: Tupla (enviadas, com falha).
+    """
+    config = current_app.config
+    batch_size = batch_size or config['MAIL_OUTBOX_BATCH_SIZE']
+    workers = workers or config['MAIL_OUTBOX_WORKERS']
+
+    messages = _claim_batch(batch_size)
+    if not messages:
+        return 0, 0
+
+    app = current_app._get_current_object()
+    payloads = [json.loads(message.payload) for message in messages]
+    with ThreadPoolExecutor(max_workers=min(workers, len(messages))) as executor:
+        errors = list(executor.map(lambda data: _deliver(app, data), payloads))
+
+    sent = failed = 0
+    now = datetime.utcnow()
+    for message, error in zip(messages, errors):
+        message.attempts += 1
+        message.claimed_by = None
+        if error is None:
+            message.status = EmailOutbox.STATUS_SENT
+            message.sent_at = now
+            message.last_error = None
+            sent += 1
+            continue
+        failed += 1
+        message.last_error = str(error) or error.__class__.__name__
+        if isinstance(error, MailgunUnavailable):
+            # O Mailgun não foi contatado: não conta como tentativa
+            message.attempts -= 1
+            message.status = EmailOutbox.STATUS_PENDING
+            message.available_at = now + timedelta(seconds=error.retry_after)
+            continue
+        if message.attempts >= config['MAIL_OUTBOX_MAX_ATTEMPTS']:
+            message.status = EmailOutbox.STATUS_FAILED
+            logger.error("Mensagem %s descartada após %s tentativas: %s", message.id, message.attempts, error)
+        else:
+            # Espera exponencial entre as tentativas: 1x, 2x, 4x... o atraso base
+            delay = config['MAIL_OUTBOX_RETRY_DELAY'] * 2 ** (message.attempts - 1)
+            message.status = EmailOutbox.STATUS_PENDING
+            message.available_at = now + timedelta(seconds=delay)
+    db.session.commit()
+    logger.info("Lote da fila processado: %s enviadas, %s com falha.", sent, failed)
+    return sent, failed
+
+
+def run_worker(batch_size=None, workers=None, interval=None, once=False):
+    """
+    Laço principal do worker de e-mails.
+
+    :param batch_size: Quantidade máxima de mensagens reservadas por lote.
+    :param workers: Quantidade de envios simultâneos.
+    :param interval: Segundos de espera quando a fila está vazia.
+    :param once: Se True, esvazia a fila uma vez e retorna.
+    :return: Tupla (enviadas, com falha) acumulada.
+    """
+    from .notifications import flush_admin_digest
+    interval = interval if interval is not None else current_app.config['MAIL_OUTBOX_POLL_INTERVAL']
+    total_sent = total_failed = 0
+    while True:
+        # Resumos para os administradores cuja janela terminou entram na fila
+        flush_admin_digest()
+        sent, failed = process_outbox(batch_size=batch_size, workers=workers)
+        total_sent += sent
+        total_failed += failed
+        db.session.remove()
+        if sent or failed:
+            continue
+        if once:
+            return total_sent, total_failed
+        time.sleep(interval)
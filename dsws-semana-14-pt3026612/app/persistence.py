@@ -0,0 +1,182 @@
+from collections import namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from sqlalchemy import inspect
+from sqlalchemy.exc import SQLAlchemyError
+from . import db
+
+# Linha que não pôde ser gravada ou removida. Em save_many, index é a posição
+# em items e item é a instância; em bulk_delete, index é None e item é a chave primária.
+RowError = namedtuple('RowError', ['index', 'item', 'error'])
+
+# Resultado de uma operação em lote: linhas gravadas/removidas e erros por linha
+BatchReport = namedtuple('BatchReport', ['done', 'errors'])
+
+
+def in_unit_of_work():
+    return db.session.info.get('unit_of_work', 0) > 0
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Adia para o fim do bloco o commit de save(), delete(), save_many() e bulk_delete().
+
+    Dentro do bloco, cada linha é gravada em um SAVEPOINT: um erro desfaz
+    apenas aquela linha. Uma exceção que saia do bloco desfaz tudo. Blocos
+    aninhados fazem parte do bloco mais externo, que faz o único commit.
+
+    Uso:
+        with unit_of_work():
+            for user in users:
+                user.save()
+    """
+    session = db.session
+    session.info['unit_of_work'] = session.info.get('unit_of_work', 0) + 1
+    try:
+        yield session
+        if session.info['unit_of_work'] == 1:
+            session.commit()
+    except BaseException:
+        if session.info['unit_of_work'] == 1:
+            session.rollback()
+        raise
+    finally:
+        session.info['unit_of_work'] -= 1
+
+
+def _finish():
+    if not in_unit_of_work():
+        db.session.commit()
+
+
+def _error_message(error):
+    return str(getattr(error, 'orig', None) or error)
+
+
+def _batches(items, size):
+    iterator = iter(items)
+    offset = 0
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield offset, batch
+        offset += len(batch)
+
+
+def persist(instance, delete=False):
+    """
+    Grava (ou remove) uma instância: commit imediato, ou um SAVEPOINT dentro de unit_of_work().
+    """
+    session = db.session
+    operation = session.delete if delete else session.add
+    if in_unit_of_work():
+        with session.begin_nested():
+            operation(instance)
+        return
+    try:
+        operation(instance)
+        session.commit()
+    except Exception:
+        session.rollback()  # Reverte alterações no caso de erro
+        raise
+
+
+def save_many(items, batch_size=500):
+    """
+    Grava instâncias em lotes, com um commit por lote (ou nenhum, dentro de unit_of_work()).
+
+    Um lote só de instâncias novas é gravado em um único flush; se ele falhar,
+    é refeito linha a linha, cada uma em seu SAVEPOINT, e só as linhas com
+    erro ficam de fora.
+
+    :param items: Instâncias (novas ou alteradas) de qualquer modelo.
+    :param batch_size: Linhas por lote.
+    :return: BatchReport.
+    """
+    session = db.session
+    saved, errors = 0, []
+    for offset, batch in _batches(items, batch_size):
+        if all(inspect(item).transient for item in batch):
+            try:
+                with session.begin_nested():
+                    session.add_all(batch)
+                saved += len(batch)
+                _finish()
+                continue
+            except SQLAlchemyError:
+                pass  # O SAVEPOINT foi desfeito; o lote é refeito linha a linha
+        for index, item in enumerate(batch, start=offset):
+            try:
+                with session.begin_nested():
+                    session.add(item)
+                saved += 1
+            except SQLAlchemyError as e:
+                errors.append(RowError(index, item, _error_message(e)))
+        _finish()
+    return BatchReport(saved, errors)
+
+
+def bulk_delete(model, criteria, batch_size=1000, on_deleted=None):
+    """
+    Remove as linhas que atendem ao filtro, em lotes de DELETE ... WHERE id IN (...).
+
+    Os DELETEs em lote não disparam os eventos do ORM; on_deleted recebe as
+    chaves removidas de cada lote (ex.: para limpar caches). Se um lote
+    falhar, ele é refeito linha a linha e as linhas com erro são ignoradas
+    nos lotes seguintes.
+
+    :param model: Modelo com chave primária de uma coluna.
+    :param criteria: Condições do filtro (ex.: [User.confirmed == False]).
+    :param batch_size: Linhas por lote.
+    :param on_deleted: Função opcional chamada com a lista de chaves removidas.
+    :return: BatchReport.
+    """
+    session = db.session
+    key = inspect(model).primary_key[0]
+    deleted, errors, failed = 0, [], set()
+    while True:
+        query = db.select(key).where(*criteria)
+        if failed:
+            query = query.where(key.not_in(failed))
+        ids = session.scalars(query.order_by(key).limit(batch_size)).all()
+        if not ids:
+            break
+        try:
+            with session.begin_nested():
+                session.execute(db.delete(model).where(key.in_(ids)))
+            done = ids
+        except SQLAlchemyError:
+            done = []
+            for id in ids:
+                try:
+                    with session.begin_nested():
+                        session.execute(db.delete(model).where(key == id))
+                    done.append(id)
+                except SQLAlchemyError as e:
+                    failed.add(id)
+                    errors.append(RowError(None, id, _error_message(e)))
+        deleted += len(done)
+        _finish()
+        if done and on_deleted is not None:
+            on_deleted(done)
+    return BatchReport(deleted, errors)
+
+
+class BulkMixin:
+    """
+    save_many e bulk_delete como métodos de classe dos modelos.
+    """
+
+    @classmethod
+    def save_many(cls, items, batch_size=500):
+        return save_many(items, batch_size)
+
+    @classmethod
+    def bulk_delete(cls, *criteria, batch_size=1000):
+        return bulk_delete(cls, criteria, batch_size, on_deleted=cls._bulk_deleted)
+
+    @classmethod
+    def _bulk_deleted(cls, ids):
+        pass
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+from sqlalchemy import event, make_url
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Opções que só fazem sentido em pools com tamanho (QueuePool)
+POOL_SIZE_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout')
+
+
+def adjust_engine_options(config):
+    """
+    Remove de SQLALCHEMY_ENGINE_OPTIONS as opções de tamanho do pool quando o
+    banco é SQLite em memória: o Flask-SQLAlchemy usa StaticPool (uma única
+    conexão), que não aceita essas opções.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        config['SQLALCHEMY_ENGINE_OPTIONS'] = {key: value for key, value in config['SQLALCHEMY_ENGINE_OPTIONS'].items()
+                                               if key not in POOL_SIZE_OPTIONS}
+
+
+class PoolMetrics:
+    """
+    Métricas do pool de conexões de um engine.
+
+    Conta retiradas (checkout), devoluções, novas conexões e invalidações
+    pelos eventos do pool, e mede o tempo de espera por uma conexão
+    envolvendo pool.connect. Esperas acima de slow_wait e invalidações são
+    registradas no log; um resumo é registrado a cada log_interval segundos.
+    """
+
+    def __init__(self, engine, slow_wait=0.1, log_interval=300, clock=time.perf_counter):
+        """
+        :param engine: Engine do SQLAlchemy.
+        :param slow_wait: Espera (s) a partir da qual a retirada é registrada no log.
+        :param log_interval: Intervalo (s) entre resumos no log (0 desativa).
+        :param clock: Relógio usado nas medições.
+        """
+        self.engine = engine
+        self.pool = None
+        self.slow_wait = slow_wait
+        self.log_interval = log_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._last_log = clock()
+        self.reset()
+
+        event.listen(engine.pool, 'checkout', self._on_checkout)
+        event.listen(engine.pool, 'checkin', self._on_checkin)
+        event.listen(engine.pool, 'connect', self._on_connect)
+        event.listen(engine.pool, 'invalidate', self._on_invalidate)
+        event.listen(engine.pool, 'soft_invalidate', self._on_invalidate)
+
+        self._wrap_connect(engine.pool)
+        # engine.dispose() troca o pool (os eventos são copiados, o connect medido não)
+        event.listen(engine, 'engine_disposed', lambda engine: self._wrap_connect(engine.pool))
+
+    def _wrap_connect(self, pool):
+        # O pool não tem evento antes da retirada; a espera é medida em volta de connect()
+        self.pool = pool
+        connect = pool.connect
+
+        def timed_connect():
+            start = self.clock()
+            try:
+                return connect()
+            finally:
+                self._record_wait(self.clock() - start)
+        pool.connect = timed_connect
+
+    def reset(self):
+        with self._lock:
+            self.counters = {'checkouts': 0, 'checkins': 0, 'connects': 0, 'invalidations': 0, 'slow_waits': 0}
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.in_use = 0
+            self.in_use_peak = 0
+            self.overflow_peak = 0
+
+    def _record_wait(self, waited):
+        with self._lock:
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waited >= self.slow_wait:
+                self.counters['slow_waits'] += 1
+                slow = True
+            else:
+                slow = False
+        if slow:
+            logger.warning("Espera de %.3fs por uma conexão do pool (%s).", waited, self.pool.status())
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        overflow = self.pool.overflow() if hasattr(self.pool, 'overflow') else 0
+        with self._lock:
+            self.counters['checkouts'] += 1
+            self.in_use += 1
+            self.in_use_peak = max(self.in_use_peak, self.in_use)
+            self.overflow_peak = max(self.overflow_peak, overflow)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.counters['checkins'] += 1
+            self.in_use = max(0, self.in_use - 1)
+        if self.log_interval and self.clock() - self._last_log >= self.log_interval:
+            self._last_log = self.clock()
+            logger.info("Pool de conexões: %s", self.stats())
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.counters['connects'] += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.counters['invalidations'] += 1
+        logger.warning("Conexão do pool invalidada: %s", exception)
+
+    def stats(self):
+        """
+        Resumo das métricas e do estado atual do pool.
+        """
+        with self._lock:
+            checkouts = self.counters['checkouts']
+            return dict(self.counters,
+                        pool=type(self.pool).__name__,
+                        size=self.pool.size() if hasattr(self.pool, 'size') else None,
+                        in_use=self.in_use,
+                        in_use_peak=self.in_use_peak,
+                        overflow_peak=self.overflow_peak,
+                        wait_avg_ms=self.wait_total / checkouts * 1000 if checkouts else 0.0,
+                        wait_max_ms=self.wait_max * 1000)
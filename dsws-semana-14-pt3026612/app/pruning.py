@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from collections import namedtuple
+from datetime import datetime, timedelta
+from flask import current_app
+from . import db
+from .models import ArchivedUser, User
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Valor de PRUNE_UNCONFIRMED_ARCHIVE que arquiva na tabela archived_users
+ARCHIVE_TABLE = 'table'
+
+# Colunas do usuário guardadas no arquivo (o id vira user_id)
+ARCHIVED_COLUMNS = ['id', 'username', 'prontuario', 'email', 'role_id', 'created_at']
+
+# Resultado de uma execução: usuários removidos (ou que seriam, em dry_run) e lotes gravados
+PruneReport = namedtuple('PruneReport', ['users', 'batches', 'dry_run'])
+
+
+def stale_unconfirmed(cutoff):
+    """
+    Condições dos cadastros não confirmados criados antes de cutoff.
+    """
+    return [User.confirmed.is_not(True), User.created_at < cutoff]
+
+
+def _archived(row, archived_at):
+    record = dict(row._mapping, archived_at=archived_at)
+    record['user_id'] = record.pop('id')
+    return record
+
+
+def _write_jsonl(output, rows, archived_at):
+    for row in rows:
+        record = dict(_archived(row, archived_at), created_at=row.created_at.isoformat(),
+                      archived_at=archived_at.isoformat())
+        output.write(json.dumps(record, ensure_ascii=False) + '\n')
+    output.flush()
+    os.fsync(output.fileno())  # O arquivo é gravado em disco antes do commit do DELETE
+
+
+def prune_unconfirmed(age=None, batch_size=None, archive=None, dry_run=False, pause=None):
+    """
+    Arquiva e remove os cadastros que nunca confirmaram o e-mail.
+
+    Os usuários são removidos em lotes, com um commit e uma pausa por lote,
+    para não bloquear as escritas da aplicação. Cada lote é arquivado na
+    tabela archived_users, no mesmo commit do DELETE, ou em um arquivo JSONL,
+    gravado antes do commit. Se um usuário confirmar o e-mail durante o
+    lote, o DELETE é desfeito e o lote é refeito sem ele.
+
+    :param age: Idade mínima (s) do cadastro (padrão: PRUNE_UNCONFIRMED_AGE).
+    :param batch_size: Usuários por lote (padrão: PRUNE_UNCONFIRMED_BATCH_SIZE).
+    :param archive: 'table' ou caminho do arquivo JSONL (padrão: PRUNE_UNCONFIRMED_ARCHIVE).
+    :param dry_run: Se True, apenas conta os cadastros que seriam removidos.
+    :param pause: Pausa (s) entre os lotes (padrão: PRUNE_UNCONFIRMED_PAUSE).
+    :return: PruneReport.
+    """
+    config = current_app.config
+    age = age if age is not None else config['PRUNE_UNCONFIRMED_AGE']
+    batch_size = batch_size or config['PRUNE_UNCONFIRMED_BATCH_SIZE']
+    archive = archive or config['PRUNE_UNCONFIRMED_ARCHIVE']
+    pause = pause if pause is not None else config['PRUNE_UNCONFIRMED_PAUSE']
+    criteria = stale_unconfirmed(datetime.utcnow() - timedelta(seconds=age))
+
+    if dry_run:
+        count = db.session.scalar(db.select(db.func.count(User.id)).where(*criteria))
+        return PruneReport(count, 0, True)
+
+    columns = [getattr(User, name) for name in ARCHIVED_COLUMNS]
+    output = open(archive, 'a', encoding='utf-8') if archive != ARCHIVE_TABLE else None
+    pruned = batches = 0
+    try:
+        while True:
+            # Ordem do índice ix_users_created_at_id: os cadastros mais antigos saem primeiro
+            rows = db.session.execute(
+                db.select(*columns).where(*criteria).order_by(User.created_at, User.id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            ids = [row.id for row in rows]
+            now = datetime.utcnow()
+            if output is None:
+                db.session.execute(db.insert(ArchivedUser), [_archived(row, now) for row in rows])
+            result = db.session.execute(db.delete(User).where(User.id.in_(ids), *criteria))
+            if result.rowcount != len(ids):
+                db.session.rollback()  # Algum usuário confirmou o e-mail depois da leitura
+                continue
+            if output is not None:
+                _write_jsonl(output, rows, now)
+            db.session.commit()
+            User._bulk_deleted(ids)
+            pruned += len(ids)
+            batches += 1
+            logger.info("Lote de %s cadastros não confirmados removido (%s no total).", len(ids), pruned)
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if output is not None:
+            output.close()
+    return PruneReport(pruned, batches, False)
+
+
+class PruneScheduler:
+    """
+    Executa prune_unconfirmed a cada interval segundos, em uma thread do processo.
+
+    Alternativa ao flask prune-unconfirmed agendado no cron para quem não tem
+    cron (ex.: um único processo web). Com vários processos, execuções
+    simultâneas são seguras, mas basta habilitar em um deles.
+    """
+
+    def __init__(self, app, interval):
+        self.interval = interval
+        self._stop = threading.Event()
+        # Referência fraca: a thread não impede o descarte da aplicação
+        self._thread = threading.Thread(target=self._run, args=(weakref.ref(app),),
+                                        name='prune-unconfirmed', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app_ref):
+        while not self._stop.wait(self.interval):
+            app = app_ref()
+            if app is None:
+                return
+            with app.app_context():
+                try:
+                    report = prune_unconfirmed()
+                    if report.users:
+                        logger.info("%s cadastros não confirmados removidos.", report.users)
+                except Exception:
+                    logger.exception("Erro ao remover os cadastros não confirmados.")
+                finally:
+                    db.session.remove()
+            del app
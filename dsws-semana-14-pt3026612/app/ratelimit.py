@@ -0,0 +1,234 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import current_app, request
+from flask_login import current_user
+from werkzeug.exceptions import TooManyRequests
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+def parse_limit(limit):
+    """
+    Converte um limite no formato 'quantidade/segundos' (ex.: '5/60').
+
+    :return: Tupla (quantidade, janela em segundos).
+    """
+    count, seconds = limit.split('/')
+    return int(count), float(seconds)
+
+
+def _sliding_count(previous, current, elapsed, window):
+    """
+    Contagem aproximada da janela deslizante a partir de duas janelas fixas.
+
+    A janela anterior entra com peso proporcional à parte dela que ainda
+    está dentro dos últimos `window` segundos.
+    """
+    return previous * (1 - elapsed / window) + current
+
+
+class MemoryBackend:
+    """
+    Contadores em memória, por processo.
+
+    Cada chave guarda apenas o índice da janela atual, as contagens da janela
+    atual e da anterior e o instante em que a chave deixa de ter efeito.
+    """
+
+    def __init__(self, max_keys=10000):
+        """
+        :param max_keys: Chaves guardadas antes de uma limpeza das expiradas.
+        """
+        self.max_keys = max_keys
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window, now):
+        """
+        Registra uma requisição se ela estiver dentro do limite.
+
+        :return: Tupla (permitida, segundos até a próxima janela).
+        """
+        index = int(now // window)
+        elapsed = now - index * window
+        expires = (index + 2) * window  # Depois disso, as duas janelas guardadas já passaram
+        with self._lock:
+            start, current, previous, _ = self._counters.get(key, (index, 0, 0, expires))
+            if start != index:
+                previous = current if start == index - 1 else 0
+                current = 0
+            if _sliding_count(previous, current, elapsed, window) + 1 > limit:
+                self._counters[key] = (index, current, previous, expires)
+                return False, window - elapsed
+            self._counters[key] = (index, current + 1, previous, expires)
+            if len(self._counters) > self.max_keys:
+                self._evict(now)
+        return True, 0.0
+
+    def _evict(self, now):
+        for key in [key for key, counter in self._counters.items() if counter[3] <= now]:
+            del self._counters[key]
+        if len(self._counters) > self.max_keys:
+            # Ainda cheio: descarta as chaves que expiram primeiro
+            oldest = sorted(self._counters, key=lambda key: self._counters[key][3])
+            for key in oldest[:len(oldest) - self.max_keys // 2]:
+                del self._counters[key]
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class SQLiteBackend:
+    """
+    Contadores em um arquivo SQLite local, compartilhados entre os processos
+    (workers) da mesma máquina.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: Caminho do arquivo SQLite dos contadores.
+        """
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limits ('
+                ' key TEXT NOT NULL, window INTEGER NOT NULL, count INTEGER NOT NULL,'
+                ' PRIMARY KEY (key, window)) WITHOUT ROWID'
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')  # Contadores podem ser perdidos sem prejuízo
+            self._local.conn = conn
+        return conn
+
+    def hit(self, key, limit, window, now):
+        index = int(now // window)
+        elapsed = now - index * window
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')  # Leitura e incremento atômicos entre processos
+        try:
+            counts = dict(conn.execute(
+                'SELECT window, count FROM rate_limits WHERE key = ? AND window IN (?, ?)',
+                (key, index, index - 1)
+            ).fetchall())
+            if _sliding_count(counts.get(index - 1, 0), counts.get(index, 0), elapsed, window) + 1 > limit:
+                conn.execute('COMMIT')
+                return False, window - elapsed
+            conn.execute(
+                'INSERT INTO rate_limits (key, window, count) VALUES (?, ?, 1) '
+                'ON CONFLICT (key, window) DO UPDATE SET count = count + 1',
+                (key, index)
+            )
+            # Janelas antigas desta chave não são mais necessárias
+            conn.execute('DELETE FROM rate_limits WHERE key = ? AND window < ?', (key, index - 1))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return True, 0.0
+
+    def reset(self):
+        self._connect().execute('DELETE FROM rate_limits')
+
+
+class RateLimiter:
+    """
+    Limites de requisições por janela deslizante para os endpoints de autenticação.
+
+    As regras ficam em RATELIMIT_RULES: para cada nome de endpoint, uma lista
+    de pares (chave, limite). A chave diz o que é contado: 'ip', 'email' e
+    'prontuario' (campos do formulário) ou 'user' (usuário logado).
+    """
+
+    def __init__(self, config):
+        """
+        :param config: Configuração da aplicação (app.config).
+        """
+        self.rules = {name: [(key, parse_limit(limit)) for key, limit in rules]
+                      for name, rules in config['RATELIMIT_RULES'].items()}
+        storage = config['RATELIMIT_STORAGE']
+        if storage.startswith('sqlite:///'):
+            path = storage[len('sqlite:///'):]
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.backend = SQLiteBackend(path)
+        elif storage == 'memory':
+            self.backend = MemoryBackend(config['RATELIMIT_MAX_KEYS'])
+        else:
+            raise RuntimeError(f"RATELIMIT_STORAGE inválido: {storage} (use 'memory' ou 'sqlite:///caminho').")
+        self.counters = {'allowed': 0, 'rejected': 0}
+        self._lock = threading.Lock()
+
+    def check(self, name, values, now=None):
+        """
+        Verifica e registra uma requisição em todas as regras do endpoint.
+
+        :param name: Nome do conjunto de regras (ex.: 'login').
+        :param values: Dicionário chave -> valor identificando o cliente
+                       (ex.: {'ip': '10.0.0.1', 'email': 'ana@zohomail.com'}).
+        :return: None se permitida, ou os segundos até poder tentar de novo.
+        """
+        now = time.time() if now is None else now
+        for key, (limit, window) in self.rules.get(name, []):
+            value = values.get(key)
+            if not value:
+                continue
+            allowed, retry_after = self.backend.hit(f'{name}:{key}:{value}', limit, window, now)
+            if not allowed:
+                with self._lock:
+                    self.counters['rejected'] += 1
+                logger.warning("Limite de requisições excedido em %s (%s=%s).", name, key, value)
+                return retry_after
+        with self._lock:
+            self.counters['allowed'] += 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+def _client_values():
+    """
+    Identificadores do cliente usados como chaves das regras.
+    """
+    return {
+        'ip': request.remote_addr,
+        'email': request.form.get('email', '').strip().lower(),
+        'prontuario': request.form.get('prontuario', '').strip().upper(),
+        'user': str(current_user.get_id() or '') if current_user else '',
+    }
+
+
+def rate_limit(name, methods=('POST',)):
+    """
+    Decorador que aplica as regras RATELIMIT_RULES[name] a uma view.
+
+    Requisições acima do limite recebem 429 antes de qualquer trabalho da view
+    (validação do formulário, hash de senha ou envio de e-mail).
+
+    :param name: Nome do conjunto de regras.
+    :param methods: Métodos HTTP limitados (os demais passam direto).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            if current_app.config['RATELIMIT_ENABLED'] and request.method in methods:
+                retry_after = current_app.extensions['rate_limiter'].check(name, _client_values())
+                if retry_after is not None:
+                    raise TooManyRequests(retry_after=math.ceil(retry_after))
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
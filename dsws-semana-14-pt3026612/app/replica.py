@@ -0,0 +1,144 @@
+import functools
+import time
+from contextlib import contextmanager
+from flask import session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+# Nome do bind da réplica em SQLALCHEMY_BINDS
+REPLICA_BIND = 'replica'
+
+# Chave da sessão do Flask com o instante até o qual as leituras ficam no primário
+STICKY_KEY = '_db_primary_until'
+
+
+class RoutingSession(Session):
+    """
+    Sessão que envia leituras para a réplica, quando configurada.
+
+    Apenas SELECTs executados dentro de use_replica() (ou em views marcadas
+    com replica_reads) vão para a réplica. Escritas, flushes e qualquer
+    leitura depois de uma escrita na mesma sessão ficam no primário, para
+    que a requisição sempre leia o que acabou de gravar.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._reads_from_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _reads_from_replica(self, clause):
+        return (self.info.get('replica', 0) > 0
+                and not self.info.get('primary')
+                and not self.info.get('wrote')
+                and not self._flushing
+                and isinstance(clause, Select)
+                and REPLICA_BIND in self._db.engines)
+
+# Qualquer escrita fixa a sessão no primário até o fim da requisição (read-your-writes).
+# before_flush também marca flushes que falham (ex.: IntegrityError no cadastro).
+@event.listens_for(RoutingSession, 'before_flush')
+def _before_flush(session, flush_context, instances):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _on_execute(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['wrote'] = True
+
+
+@contextmanager
+def use_replica():
+    """
+    Envia para a réplica os SELECTs executados no bloco (se não houver escrita anterior).
+    """
+    from . import db
+    info = db.session.info
+    info['replica'] = info.get('replica', 0) + 1
+    try:
+        yield
+    finally:
+        info['replica'] -= 1
+
+
+@contextmanager
+def use_primary():
+    """
+    Mantém no primário os SELECTs executados no bloco, mesmo em views que usam a réplica.
+    """
+    from . import db
+    info = db.session.info
+    previous = info.get('primary')
+    info['primary'] = True
+    try:
+        yield
+    finally:
+        info['primary'] = previous
+
+
+def route_reads_to_replica():
+    """
+    Envia para a réplica as leituras do restante da requisição atual.
+
+    A sessão é descartada no fim da requisição, então a marcação também vale
+    para respostas em streaming (stream_with_context).
+    """
+    from . import db
+    db.session.info['replica'] = db.session.info.get('replica', 0) + 1
+
+
+def replica_reads(f):
+    """
+    Decorator de views somente leitura (listagens, exportações) que usam a réplica.
+    """
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        route_reads_to_replica()
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def init_app(app):
+    """
+    Mantém no primário, por DB_REPLICA_STICKY segundos, as leituras de quem
+    acabou de gravar (ex.: o redirecionamento após um cadastro), cobrindo o
+    atraso da réplica entre requisições.
+    """
+    from . import db
+    # A réplica não tem tabelas próprias: sem isto, db.create_all()/drop_all() também a percorreriam
+    db.metadatas.pop(REPLICA_BIND, None)
+
+    @app.before_request
+    def _stick_to_primary():
+        if REPLICA_BIND in db.engines and session.get(STICKY_KEY, 0) > time.time():
+            db.session.info['primary'] = True
+
+    @app.after_request
+    def _remember_writes(response):
+        if REPLICA_BIND in db.engines and db.session.info.get('wrote'):
+            session[STICKY_KEY] = time.time() + app.config['DB_REPLICA_STICKY']
+        return response
+
+
+def sync_replica(primary, replica):
+    """
+    Copia o banco primário para a réplica com a API de backup do SQLite.
+
+    Serve como réplica local (dois arquivos SQLite); bancos com replicação
+    própria (MySQL, PostgreSQL) não precisam disto.
+
+    :param primary: Engine do primário.
+    :param replica: Engine da réplica.
+    :return: Páginas copiadas.
+    """
+    if primary.dialect.name != 'sqlite' or replica.dialect.name != 'sqlite':
+        raise RuntimeError("A cópia da réplica só é feita entre bancos SQLite.")
+    source = primary.raw_connection()
+    target = replica.raw_connection()
+    try:
+        source.driver_connection.backup(target.driver_connection)
+        return source.driver_connection.execute('PRAGMA page_count').fetchone()[0]
+    finally:
+        target.close()
+        source.close()
@@ -0,0 +1,113 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from flask import current_app
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+# Imagens já montadas neste processo, por (esquema, carga inicial)
+_templates = {}
+_lock = threading.RLock()
+
+
+def schema_key(metadata, engine):
+    """
+    Hash do DDL das tabelas e índices: uma alteração nos modelos gera uma nova imagem.
+    """
+    ddl = []
+    for table in metadata.sorted_tables:
+        ddl.append(str(CreateTable(table).compile(engine)))
+        ddl.extend(str(CreateIndex(index).compile(engine)) for index in sorted(table.indexes, key=lambda index: index.name))
+    return hashlib.sha1('\n'.join(ddl).encode()).hexdigest()[:16]
+
+
+class SchemaSnapshot:
+    """
+    Imagem do banco recém-criado (tabelas e carga inicial), restaurada com a
+    API de backup do SQLite em vez de drop_all() + create_all().
+
+    A imagem é montada uma vez por processo, em memória, ou em um arquivo em
+    directory, compartilhado pelos processos. Bancos que não são SQLite são
+    recriados com drop_all() + create_all() a cada restauração.
+    """
+
+    def __init__(self, db, seed=None, directory=None):
+        """
+        :param db: Instância do Flask-SQLAlchemy.
+        :param seed: Função opcional que grava a carga inicial (o commit é feito aqui).
+        :param directory: Diretório dos arquivos de imagem (padrão: imagem em memória).
+        """
+        self.db = db
+        self.seed = seed
+        self.directory = directory
+
+    def _build(self):
+        self.db.drop_all()
+        self.db.create_all()
+        if self.seed is not None:
+            self.seed()
+        self.db.session.commit()
+
+    def _template(self, engine):
+        name = schema_key(self.db.metadata, engine)
+        if self.seed is not None:
+            name += '-' + self.seed.__name__
+        with _lock:
+            template = _templates.get(name)
+            if template is not None:
+                return template
+            path = os.path.join(self.directory, f'schema-{name}.sqlite') if self.directory else None
+            if path is None or not os.path.exists(path):
+                self._build()
+                target = sqlite3.connect(path + '.tmp' if path else ':memory:', check_same_thread=False)
+                raw = engine.raw_connection()
+                try:
+                    raw.driver_connection.backup(target)
+                finally:
+                    raw.close()
+                if path:
+                    target.close()
+                    os.replace(path + '.tmp', path)  # Outros processos nunca veem uma imagem incompleta
+            if path:
+                target = sqlite3.connect(path, check_same_thread=False)
+            _templates[name] = target
+            return target
+
+    def restore(self):
+        """
+        Substitui todo o conteúdo do banco pela imagem (montada na primeira chamada).
+
+        A versão das migrações (alembic_version), que não faz parte dos
+        modelos, é mantida.
+
+        :return: True se a imagem foi usada; False se o banco foi recriado com DDL.
+        """
+        engine = self.db.engine
+        self.db.session.remove()
+        if engine.dialect.name != 'sqlite':
+            self._build()
+            return False
+        template = self._template(engine)
+        raw = engine.raw_connection()
+        try:
+            connection = raw.driver_connection
+            versions = []
+            if connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'alembic_version'").fetchone():
+                versions = connection.execute('SELECT version_num FROM alembic_version').fetchall()
+            with _lock:
+                template.backup(connection)
+            if versions:
+                connection.execute('CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL, '
+                                   'CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))')
+                connection.executemany('INSERT INTO alembic_version (version_num) VALUES (?)', versions)
+                connection.commit()
+        finally:
+            raw.close()
+        return True
+
+
+def get_schema_snapshot():
+    """
+    Retorna a imagem do banco da aplicação atual.
+    """
+    return current_app.extensions['schema_snapshot']
@@ -0,0 +1,171 @@
+import heapq
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Log dedicado às consultas lentas (parâmetros nunca aparecem, apenas seus tipos)
+slow_logger = logging.getLogger(__name__ + '.slow')
+slow_logger.setLevel(logging.INFO)
+
+# Listas de placeholders de IN (...) viram um só, para que o formato não dependa da quantidade
+_IN_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)|\(\s*%s(?:\s*,\s*%s)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+class NPlusOneError(AssertionError):
+    """
+    Uma requisição executou o mesmo formato de consulta mais vezes que o permitido
+    (modo estrito de SQL_N_PLUS_ONE_LIMIT, usado nos testes).
+    """
+
+
+def statement_shape(statement):
+    """
+    Formato da consulta: o SQL com espaços normalizados e listas de IN colapsadas.
+    """
+    return _IN_LIST.sub('(?)', _SPACES.sub(' ', statement).strip())
+
+
+def redact(parameters):
+    """
+    Substitui os valores dos parâmetros pelos seus tipos (e-mails, hashes e
+    tokens nunca chegam ao log).
+    """
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            return f'<{len(parameters)} linhas>'  # executemany
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class QueryStats:
+    """
+    Consultas executadas durante uma requisição (ou um bloco record_queries()).
+    """
+
+    def __init__(self, keep=5):
+        """
+        :param keep: Quantidade de consultas mais lentas guardadas.
+        """
+        self.keep = keep
+        self.count = 0
+        self.total = 0.0
+        self.shapes = Counter()
+        self._slowest = []
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.total += duration
+        shape = statement_shape(statement)
+        self.shapes[shape] += 1
+        item = (duration, self.count, shape)
+        if len(self._slowest) < self.keep:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+    @property
+    def slowest(self):
+        """
+        Lista (duração em segundos, formato) das consultas mais lentas, da mais lenta para a mais rápida.
+        """
+        return [(duration, shape) for duration, _, shape in sorted(self._slowest, reverse=True)]
+
+    def repeated(self, limit):
+        """
+        Formatos executados mais de limit vezes, com a quantidade.
+        """
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > limit]
+
+
+@contextmanager
+def record_queries(keep=5):
+    """
+    Registra as consultas executadas no bloco (fora de requisições, ex.: comandos e testes).
+    """
+    previous = g.get('_sql_stats')
+    g._sql_stats = stats = QueryStats(keep)
+    try:
+        yield stats
+    finally:
+        g._sql_stats = previous
+
+
+def install_query_recorder(engine, slow_threshold):
+    """
+    Mede cada consulta do engine e a soma às estatísticas da requisição atual.
+
+    Consultas acima de slow_threshold segundos são registradas no log de
+    consultas lentas, com os parâmetros substituídos pelos seus tipos.
+    """
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._sql_stats_start = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_sql_stats_start', None)
+        if start is None:
+            return
+        duration = time.perf_counter() - start
+        stats = g.get('_sql_stats') if has_app_context() else None
+        if stats is not None:
+            stats.add(statement, duration)
+        if duration >= slow_threshold:
+            slow_logger.warning("%.1f ms | %s | %s | parâmetros: %s", duration * 1000,
+                                request.path if has_request_context() else '-',
+                                _SPACES.sub(' ', statement).strip(), redact(parameters))
+
+
+def init_app(app, engines):
+    """
+    Instala a medição nos engines e os hooks que resumem cada requisição.
+
+    Cada resposta recebe o cabeçalho Server-Timing (quantidade e tempo das
+    consultas); requisições com tempo de banco acima de SQL_SLOW_REQUEST são
+    registradas com as consultas mais lentas. Com SQL_N_PLUS_ONE_LIMIT, a
+    requisição que repetir um formato de consulta mais vezes que o limite
+    levanta NPlusOneError.
+    """
+    for engine in engines:
+        install_query_recorder(engine, app.config['SQL_SLOW_QUERY'])
+    if app.config['SQL_SLOW_LOG'] and not any(getattr(handler, 'baseFilename', None) == os.path.abspath(app.config['SQL_SLOW_LOG'])
+                                              for handler in slow_logger.handlers):
+        handler = RotatingFileHandler(app.config['SQL_SLOW_LOG'], maxBytes=100000, backupCount=5)
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        slow_logger.addHandler(handler)
+
+    @app.before_request
+    def _start_recording():
+        g._sql_stats = QueryStats(app.config['SQL_SLOWEST_KEPT'])
+
+    @app.after_request
+    def _summarize(response):
+        stats = g.pop('_sql_stats', None)
+        if stats is None:
+            return response
+        if app.config['SQL_STATS_HEADER']:
+            response.headers.add('Server-Timing', f'db;dur={stats.total * 1000:.1f};desc="{stats.count} consultas"')
+        if stats.total >= app.config['SQL_SLOW_REQUEST']:
+            logger.warning("%s %s: %s consultas em %.1f ms; mais lentas: %s", request.method, request.path,
+                           stats.count, stats.total * 1000,
+                           [f'{duration * 1000:.1f} ms {shape}' for duration, shape in stats.slowest])
+        limit = app.config['SQL_N_PLUS_ONE_LIMIT']
+        repeated = stats.repeated(limit) if limit else []
+        if repeated:
+            shape, count = repeated[0]
+            raise NPlusOneError(f"{request.method} {request.path} executou {count} vezes (limite {limit}): {shape}")
+        return response
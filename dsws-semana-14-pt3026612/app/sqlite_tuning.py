@@ -0,0 +1,109 @@
+import logging
+import re
+from sqlalchemy import event
+
+# Configuração do logger
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# PRAGMAs informados pelo relatório do flask db-tune, além dos configurados
+REPORT_PRAGMAS = ['journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size', 'temp_store',
+                  'page_size', 'page_count', 'freelist_count', 'wal_autocheckpoint']
+
+# Valores numéricos devolvidos pelo SQLite e seus nomes
+_NAMED_VALUES = {
+    'synchronous': {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'},
+    'temp_store': {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'},
+}
+
+_NAME = re.compile(r'^[a-z_]+$')
+_VALUE = re.compile(r'^-?[A-Za-z0-9_]+$')
+
+
+def _pragma_statements(pragmas):
+    """
+    Gera os comandos PRAGMA, recusando nomes ou valores que não sejam simples.
+    """
+    statements = []
+    for name, value in pragmas.items():
+        if not _NAME.match(name) or not _VALUE.match(str(value)):
+            raise RuntimeError(f"PRAGMA inválido em SQLITE_PRAGMAS: {name}={value!r}")
+        statements.append(f'PRAGMA {name}={value}')
+    return statements
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """
+    Aplica os PRAGMAs a cada nova conexão do engine (evento 'connect').
+
+    Não faz nada se o banco não for SQLite ou se não houver PRAGMAs.
+
+    :param engine: Engine do SQLAlchemy.
+    :param pragmas: Dicionário nome -> valor (ex.: {'journal_mode': 'WAL'}).
+    :return: True se os PRAGMAs foram instalados.
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return False
+    statements = _pragma_statements(pragmas)
+
+    @event.listens_for(engine, 'connect')
+    def _apply(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return True
+
+
+def install_sqlite_transactions(engine):
+    """
+    Faz os SAVEPOINTs (begin_nested, unit_of_work) funcionarem no SQLite.
+
+    O driver sqlite3 só abre a transação antes de uma escrita, e o RELEASE
+    do SAVEPOINT que abriu a transação faz o commit dela. Antes de um
+    SAVEPOINT sem transação aberta no driver, é emitido BEGIN IMMEDIATE: a
+    transação já começa com o bloqueio de escrita (esperando busy_timeout),
+    em vez de falhar com "database is locked" quando outro processo grava
+    entre uma leitura e uma escrita dela. Fora dos SAVEPOINTs, o driver
+    continua controlando as transações.
+
+    :return: True se o engine for SQLite.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+
+    @event.listens_for(engine, 'savepoint')
+    def _begin_before_savepoint(conn, name):
+        dbapi_connection = conn.connection.dbapi_connection
+        if not dbapi_connection.in_transaction:
+            # Direto no driver: o BEGIN não entra nas estatísticas de consultas
+            dbapi_connection.execute('BEGIN IMMEDIATE')
+
+    return True
+
+
+def pragma_report(engine, names=None):
+    """
+    Valores atuais dos PRAGMAs em uma conexão do engine.
+
+    :return: Dicionário nome -> valor.
+    """
+    names = names or REPORT_PRAGMAS
+    report = {}
+    with engine.connect() as conn:
+        for name in names:
+            value = conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+            report[name] = _NAMED_VALUES.get(name, {}).get(value, value)
+    return report
+
+
+def optimize(engine):
+    """
+    Executa PRAGMA optimize, que atualiza as estatísticas usadas pelo planejador de consultas.
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql('PRAGMA optimize')
+        conn.commit()
@@ -0,0 +1,71 @@
+// Rolagem infinita da lista de usuários da página inicial (usa /api/users)
+document.addEventListener('DOMContentLoaded', function () {
+    const table = document.getElementById('user-roster');
+    const sentinel = document.getElementById('user-roster-sentinel');
+    if (!table || !sentinel) {
+        return;
+    }
+    const body = table.querySelector('tbody');
+    let next = table.dataset.url;
+    let loading = false;
+
+    // Extrai a URL com rel="next" do cabeçalho Link
+    function nextLink(header) {
+        const match = /<([^>]+)>;\s*rel="next"/.exec(header || '');
+        return match ? match[1] : null;
+    }
+
+    function addRow(user) {
+        const row = document.createElement('tr');
+        [user.username, user.role || '-', new Date(user.created_at + 'Z').toLocaleDateString('pt-BR')]
+            .forEach(function (value) {
+                const cell = document.createElement('td');
+                cell.textContent = value;
+                row.appendChild(cell);
+            });
+        body.appendChild(row);
+    }
+
+    function finish(message) {
+        observer.disconnect();
+        sentinel.textContent = message;
+    }
+
+    function load() {
+        if (!next || loading) {
+            return;
+        }
+        loading = true;
+        fetch(next, {credentials: 'same-origin', headers: {'Accept': 'application/json'}})
+            .then(function (response) {
+                if (!response.ok) {
+                    throw new Error(response.status);
+                }
+                next = nextLink(response.headers.get('Link'));
+                return response.json();
+            })
+            .then(function (data) {
+                data.users.forEach(addRow);
+                if (!next) {
+                    finish(body.children.length ? '' : 'Nenhum usuário cadastrado.');
+                } else {
+                    // Observa de novo: se o fim da lista continuar visível, carrega a próxima página
+                    observer.unobserve(sentinel);
+                    observer.observe(sentinel);
+                }
+            })
+            .catch(function () {
+                finish('Não foi possível carregar os usuários.');
+            })
+            .finally(function () {
+                loading = false;
+            });
+    }
+
+    const observer = new IntersectionObserver(function (entries) {
+        if (entries.some(function (entry) { return entry.isIntersecting; })) {
+            load();
+        }
+    }, {rootMargin: '200px'});
+    observer.observe(sentinel);
+});
@@ -0,0 +1,36 @@
+import threading
+from jinja2 import BytecodeCache
+
+
+class MemoryBytecodeCache(BytecodeCache):
+    """
+    Cache, por processo, do bytecode dos modelos Jinja compilados.
+
+    Compartilhado por todas as aplicações criadas no processo (ex.: uma por
+    teste), evita refazer a análise e a compilação de cada modelo. O Jinja
+    confere a soma de verificação do código-fonte, então um modelo alterado
+    é recompilado.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def load_bytecode(self, bucket):
+        with self._lock:
+            data = self._entries.get(bucket.key)
+        if data is not None:
+            bucket.bytecode_from_string(data)
+
+    def dump_bytecode(self, bucket):
+        data = bucket.bytecode_to_string()
+        with self._lock:
+            self._entries[bucket.key] = data
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Instância única do processo
+bytecode_cache = MemoryBytecodeCache()
@@ -0,0 +1,84 @@
+import time
+from flask import current_app
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+
+
+class TokenService:
+    """
+    Geração e verificação de tokens assinados (confirmação, senha, e-mail).
+
+    Criado uma vez por aplicação em create_app. Os serializers são guardados
+    por salt, e as chaves são derivadas uma única vez. SECRET_KEY assina os
+    novos tokens. As chaves antigas em SECRET_KEY_FALLBACKS continuam válidas
+    na verificação, o que permite trocar a chave sem invalidar os links já
+    enviados por e-mail.
+    """
+
+    def __init__(self, config):
+        """
+        :param config: Configuração da aplicação (app.config).
+        """
+        keys = list(config['SECRET_KEY_FALLBACKS']) + [config['SECRET_KEY']]
+        # O itsdangerous assina com a última chave e verifica com todas
+        self.secret_keys = [key.encode('utf-8') if isinstance(key, str) else key for key in keys]
+        self.default_expiration = config['TOKEN_DEFAULT_EXPIRATION']
+        self.max_age = config['TOKEN_MAX_AGE']
+        self._serializers = {}
+
+    def serializer(self, salt):
+        """
+        Retorna o serializer do salt informado, criando-o na primeira chamada.
+        """
+        serializer = self._serializers.get(salt)
+        if serializer is None:
+            serializer = self._serializers.setdefault(salt, URLSafeTimedSerializer(self.secret_keys, salt=salt))
+        return serializer
+
+    def generate(self, payload, salt, expiration=None):
+        """
+        Gera um token assinado.
+
+        :param payload: Dicionário a ser incluído no token.
+        :param salt: Finalidade do token (tokens de um salt não valem para outro).
+        :param expiration: Validade em segundos (padrão: TOKEN_DEFAULT_EXPIRATION).
+        :return: Token em formato seguro para URLs.
+        """
+        data = dict(payload, exp=expiration or self.default_expiration)
+        return self.serializer(salt).dumps(data)
+
+    def verify(self, token, salt):
+        """
+        Verifica um token e retorna seus dados.
+
+        :param token: Token gerado por generate.
+        :param salt: Finalidade esperada do token.
+        :return: Dicionário com os dados ou None se o token for inválido ou expirado.
+        """
+        return self._verify(self.serializer(salt), token, time.time())
+
+    def verify_many(self, tokens, salt):
+        """
+        Verifica vários tokens do mesmo salt de uma vez.
+
+        :return: Lista com os dados de cada token (None para os inválidos), na mesma ordem.
+        """
+        serializer = self.serializer(salt)
+        now = time.time()
+        return [self._verify(serializer, token, now) for token in tokens]
+
+    def _verify(self, serializer, token, now):
+        try:
+            data, timestamp = serializer.loads(token, max_age=self.max_age, return_timestamp=True)
+        except (SignatureExpired, BadSignature):
+            return None
+        # Cada token respeita a validade definida na sua geração
+        if not isinstance(data, dict) or now - timestamp.timestamp() > data.get('exp', self.default_expiration):
+            return None
+        return data
+
+
+def get_token_service():
+    """
+    Retorna o serviço de tokens da aplicação atual.
+    """
+    return current_app.extensions['tokens']
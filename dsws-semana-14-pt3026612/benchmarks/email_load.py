@@ -0,0 +1,202 @@
+"""Benchmark do caminho de e-mails (cadastro -> confirmação -> Mailgun).
+
+Executa fluxos completos de cadastro e confirmação contra a aplicação, com
+um banco SQLite temporário e o Mailgun local (benchmarks.mailgun_stub),
+enquanto o worker da fila envia as mensagens. Funciona sem internet.
+
+Uso:
+  flask bench-email --users 200 --concurrency 8 --workers 4 --latency 0.2
+"""
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import config, TestingConfig
+from .mailgun_stub import MailgunStub
+
+
+def percentile(values, p):
+    """
+    Percentil pelo método do posto mais próximo.
+
+    :param values: Lista de valores.
+    :param p: Percentil desejado (0 a 100).
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class _Recorder:
+    """
+    Coleta durações de forma segura entre threads.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def add(self, name, value):
+        with self.lock:
+            self.values.setdefault(name, []).append(value)
+
+    def get(self, name):
+        return self.values.get(name, [])
+
+
+def _benchmark_config(database_uri, stub_url, workers):
+    """
+    Cria a configuração usada pelo benchmark (derivada de TestingConfig).
+    """
+    return type('BenchmarkConfig', (TestingConfig,), {
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'MAILGUN_API_URL': stub_url,
+        'MAILGUN_API_KEY': 'stub',
+        'MAILGUN_DOMAIN': 'stub.local',
+        'FLASKY_ADMIN': 'admin@zohomail.com',
+        'MAIL_OUTBOX_WORKERS': workers,
+        'MAIL_OUTBOX_RETRY_DELAY': 0.5,
+        'MAILGUN_RETRY_BACKOFF': 0.5,
+        'RATELIMIT_ENABLED': False,  # Todos os fluxos vêm do mesmo IP
+    })
+
+
+def _run_flow(app, index, recorder):
+    """
+    Cadastro, login e confirmação de um usuário, como faria um navegador.
+    """
+    from app.models import User
+    client = app.test_client()
+    email = f'bench{index}@zohomail.com'
+    password = 'senha-do-benchmark'
+
+    start = time.perf_counter()
+    client.post('/auth/register', data={
+        'email': email, 'username': f'bench{index}', 'prontuario': f'BEN{index:07d}',
+        'password': password, 'password2': password
+    })
+    recorder.add('register', time.perf_counter() - start)
+
+    client.post('/auth/login', data={'email': email, 'password': password})
+    with app.app_context():
+        token = User.query.filter_by(email=email).one().generate_confirmation_token()
+    start = time.perf_counter()
+    client.get(f'/auth/confirm/{token}')
+    recorder.add('confirm', time.perf_counter() - start)
+
+
+def _pending_messages():
+    from app.models import EmailOutbox
+    return EmailOutbox.query.filter(
+        EmailOutbox.status.in_([EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING])
+    ).count()
+
+
+def run_benchmark(users=100, concurrency=8, workers=4, latency=0.1, jitter=0.0,
+                  error_rate=0.0, throttle_rps=None):
+    """
+    Executa o benchmark e retorna um dicionário com as métricas.
+
+    :param users: Quantidade de fluxos cadastro -> confirmação.
+    :param concurrency: Fluxos executados ao mesmo tempo.
+    :param workers: Envios simultâneos do worker da fila (MAIL_OUTBOX_WORKERS).
+    :param latency: Latência média do Mailgun local, em segundos.
+    :param jitter: Variação da latência do Mailgun local, em segundos.
+    :param error_rate: Fração de respostas 500 do Mailgun local.
+    :param throttle_rps: Requisições por segundo aceitas pelo Mailgun local.
+    """
+    from app import create_app, db
+    from app.outbox import process_outbox
+
+    tmpdir = tempfile.mkdtemp(prefix='bench-email-')
+    stub = MailgunStub(latency=latency, jitter=jitter, error_rate=error_rate, throttle_rps=throttle_rps).start()
+    recorder = _Recorder()
+    try:
+        database_uri = 'sqlite:///' + os.path.join(tmpdir, 'bench.sqlite')
+        config['benchmark'] = _benchmark_config(database_uri, stub.url, workers)
+        app = create_app('benchmark')
+        with app.app_context():
+            db.create_all()
+
+        # Mede cada chamada ao Mailgun (incluindo as novas tentativas)
+        client = app.extensions['mailgun']
+        post = client.post
+
+        def timed_post(data):
+            start = time.perf_counter()
+            try:
+                return post(data)
+            finally:
+                recorder.add('send', time.perf_counter() - start)
+        client.post = timed_post
+
+        flows_done = threading.Event()
+
+        def worker():
+            with app.app_context():
+                while True:
+                    sent, failed = process_outbox()
+                    db.session.remove()
+                    if not (sent or failed):
+                        if flows_done.is_set() and not _pending_messages():
+                            return
+                        time.sleep(0.05)
+
+        start = time.perf_counter()
+        worker_thread = threading.Thread(target=worker, daemon=True)
+        worker_thread.start()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda i: _run_flow(app, i, recorder), range(users)))
+        flows_elapsed = time.perf_counter() - start
+        flows_done.set()
+        worker_thread.join()
+        elapsed = time.perf_counter() - start
+
+        sends = recorder.get('send')
+        return {
+            'users': users,
+            'flows_elapsed': flows_elapsed,
+            'elapsed': elapsed,
+            'emails_sent': stub.stats['recipients'],
+            'emails_per_second': stub.stats['recipients'] / elapsed if elapsed else 0.0,
+            'mailgun_requests': stub.stats['requests'],
+            'mailgun_status': dict(stub.stats['status']),
+            'send_latency': {p: percentile(sends, p) for p in (50, 95, 99)},
+            'register_latency': {p: percentile(recorder.get('register'), p) for p in (50, 95, 99)},
+            'confirm_latency': {p: percentile(recorder.get('confirm'), p) for p in (50, 95, 99)},
+            'worker_occupancy': sum(sends) / (elapsed * workers) if elapsed else 0.0,
+            'breaker': client.stats(),
+            'password_hasher': app.extensions['password_hasher'].stats(),
+            'db_pool': app.extensions['pool_metrics'][None].stats(),
+        }
+    finally:
+        config.pop('benchmark', None)
+        stub.stop()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def format_report(report):
+    """
+    Formata o resultado de run_benchmark para exibição no terminal.
+    """
+    def ms(latencies):
+        return ' '.join(f'p{p}={value * 1000:.1f}ms' for p, value in latencies.items())
+
+    return '\n'.join([
+        f"Fluxos cadastro -> confirmação: {report['users']} em {report['flows_elapsed']:.2f}s",
+        f"Fila esvaziada em: {report['elapsed']:.2f}s",
+        f"E-mails entregues: {report['emails_sent']} ({report['emails_per_second']:.1f}/s)",
+        f"Requisições ao Mailgun: {report['mailgun_requests']} {report['mailgun_status']}",
+        f"Latência de envio: {ms(report['send_latency'])}",
+        f"Latência do cadastro: {ms(report['register_latency'])}",
+        f"Latência da confirmação: {ms(report['confirm_latency'])}",
+        f"Ocupação dos workers: {report['worker_occupancy'] * 100:.1f}%",
+        f"Circuit breaker: {report['breaker']}",
+        f"Hashes de senha: {report['password_hasher']}",
+        f"Pool de conexões: {report['db_pool']}",
+    ])
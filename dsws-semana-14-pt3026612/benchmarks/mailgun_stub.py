@@ -0,0 +1,168 @@
+"""Servidor local que imita o endpoint de mensagens do Mailgun.
+
+Permite medir o caminho de envio de e-mails sem acesso à internet, com
+latência, taxa de erro e limitação (429) configuráveis.
+
+Uso:
+  python -m benchmarks.mailgun_stub [--port=<port>] [--latency=<s>] [--jitter=<s>]
+                                    [--error-rate=<taxa>] [--throttle-rps=<rps>]
+
+Em seguida, aponte a aplicação para ele:
+  MAILGUN_API_URL=http://127.0.0.1:<port>/v3/<dominio>/messages
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class _TokenBucket:
+    """
+    Limita a taxa de requisições aceitas por segundo.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class MailgunStub:
+    """
+    Servidor HTTP local compatível com POST /v3/<dominio>/messages.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, jitter=0.0, error_rate=0.0, throttle_rps=None):
+        """
+        :param host: Endereço de escuta.
+        :param port: Porta de escuta (0 escolhe uma porta livre).
+        :param latency: Latência média, em segundos, de cada resposta.
+        :param jitter: Variação máxima, em segundos, somada ou subtraída da latência.
+        :param error_rate: Fração (0 a 1) das requisições que recebem erro 500.
+        :param throttle_rps: Requisições por segundo aceitas; o excedente recebe 429.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = _TokenBucket(throttle_rps) if throttle_rps else None
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'recipients': 0, 'status': {}}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        URL do endpoint de mensagens, no formato usado por MAILGUN_API_URL.
+        """
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v3/stub.local/messages'
+
+    def start(self):
+        """
+        Inicia o servidor em uma thread em segundo plano.
+        """
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Encerra o servidor.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _respond(self, fields):
+        """
+        Decide a resposta de uma requisição: (status, corpo, cabeçalhos).
+        """
+        delay = max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if self.bucket is not None and not self.bucket.take():
+            return 429, {'message': 'Too many requests'}, {'Retry-After': '1'}
+        if random.random() < self.error_rate:
+            return 500, {'message': 'Internal error'}, {}
+        if 'to' not in fields or 'from' not in fields:
+            return 400, {'message': "'to' and 'from' parameters are missing"}, {}
+        recipients = sum(len(value.split(',')) for value in fields['to'])
+        with self.lock:
+            self.stats['recipients'] += recipients
+        return 200, {'id': f'<{uuid.uuid4().hex}@stub.local>', 'message': 'Queued. Thank you.'}, {}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Mantém a conexão aberta (keep-alive)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                fields = parse_qs(self.rfile.read(length).decode('utf-8'))
+                if not self.path.endswith('/messages'):
+                    status, body, headers = 404, {'message': 'Not found'}, {}
+                else:
+                    status, body, headers = stub._respond(fields)
+                with stub.lock:
+                    stub.stats['requests'] += 1
+                    stub.stats['status'][status] = stub.stats['status'].get(status, 0) + 1
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Silencia o log de cada requisição
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita o Mailgun.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0.1, help='Latência média (s).')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Variação da latência (s).')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fração de respostas 500.')
+    parser.add_argument('--throttle-rps', type=float, default=None, help='Requisições/s antes de responder 429.')
+    args = parser.parse_args()
+
+    stub = MailgunStub(args.host, args.port, args.latency, args.jitter, args.error_rate, args.throttle_rps)
+    print(f'Mailgun local em {stub.url}')
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+        print(f'Estatísticas: {stub.stats}')
+
+
+if __name__ == '__main__':
+    main()
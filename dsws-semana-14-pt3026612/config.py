@@ -5,19 +5,114 @@ from logging.handlers import RotatingFileHandler
 # Diretório base do projeto
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+def engine_options(pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800, pool_pre_ping=True):
+    """
+    Opções do engine do SQLAlchemy (SQLALCHEMY_ENGINE_OPTIONS).
+    Os argumentos são os padrões do ambiente; variáveis DB_POOL_* têm prioridade.
+    """
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', pool_size)), # Conexões mantidas abertas
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', max_overflow)), # Conexões extras em picos
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', pool_timeout)), # Espera (s) máxima por uma conexão livre
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', pool_recycle)), # Idade (s) máxima de uma conexão
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', str(pool_pre_ping)).lower() == 'true', # Testa a conexão antes de usar
+    }
+
 class Config:
     """
     Configurações gerais para a aplicação Flask.
     Variáveis de ambiente são usadas para dados sensíveis e valores padrão são definidos.
     """
     SECRET_KEY = os.getenv('SECRET_KEY') or 'uma-chave-secreta' # chave secreta
+    # Chaves antigas, separadas por vírgula, ainda aceitas na verificação de tokens
+    SECRET_KEY_FALLBACKS = [key for key in os.getenv('SECRET_KEY_FALLBACKS', '').split(',') if key]
+    TOKEN_DEFAULT_EXPIRATION = int(os.getenv('TOKEN_DEFAULT_EXPIRATION', 3600)) # Validade padrão (s) dos tokens
+    TOKEN_MAX_AGE = int(os.getenv('TOKEN_MAX_AGE', 7 * 24 * 3600)) # Idade máxima (s) aceita para qualquer token
+    # Hash de senhas: método e custo no formato do Werkzeug (hashes antigos são refeitos no login)
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2)) # Hashes calculados ao mesmo tempo
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv('PASSWORD_HASH_MAX_QUEUE', 16)) # Hashes aguardando antes de recusar (503)
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10)) # Espera máxima (s) por um hash
+    API_USERS_PER_PAGE = int(os.getenv('API_USERS_PER_PAGE', 50)) # Usuários por página em /api/users
+    API_USERS_MAX_PER_PAGE = int(os.getenv('API_USERS_MAX_PER_PAGE', 200)) # Limite máximo aceito em ?limit=
+    IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 1024)) # Usuários guardados pelo cache do load_user
+    IDENTITY_CACHE_TTL = float(os.getenv('IDENTITY_CACHE_TTL', 60)) # Validade (s) de cada usuário no cache (0 desativa)
+    # Limite de requisições nos endpoints de autenticação (janela deslizante)
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE = os.getenv('RATELIMIT_STORAGE', 'memory') # 'memory' ou 'sqlite:///caminho' (compartilhado entre workers)
+    RATELIMIT_MAX_KEYS = int(os.getenv('RATELIMIT_MAX_KEYS', 10000)) # Chaves mantidas em memória
+    # Proxies reversos confiáveis à frente da aplicação: o IP do cliente vem do X-Forwarded-For (0: sem proxy)
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))
+    # Para cada endpoint: pares (chave, 'quantidade/segundos')
+    RATELIMIT_RULES = {
+        'login': [('ip', '20/60'), ('email', '5/60')],
+        'register': [('ip', '5/300'), ('email', '3/3600'), ('prontuario', '3/3600')],
+        'password_reset_request': [('ip', '5/300'), ('email', '3/3600')],
+        'resend_confirmation': [('ip', '5/300'), ('user', '3/3600')],
+    }
     SQLALCHEMY_TRACK_MODIFICATIONS = False # Desativa as notificações do SQLAlchemy para economizar recursos
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options()
+    # Réplica de leitura opcional (validações de unicidade, listagens e exportações)
+    SQLALCHEMY_BINDS = {'replica': os.environ['DATABASE_REPLICA_URL']} if os.getenv('DATABASE_REPLICA_URL') else {}
+    DB_REPLICA_STICKY = float(os.getenv('DB_REPLICA_STICKY', 5)) # Tempo (s) no primário após uma escrita do usuário
+    DB_POOL_SLOW_WAIT = float(os.getenv('DB_POOL_SLOW_WAIT', 0.1)) # Espera (s) por conexão registrada no log
+    DB_POOL_LOG_INTERVAL = float(os.getenv('DB_POOL_LOG_INTERVAL', 300)) # Intervalo (s) entre resumos do pool no log
+    DB_SNAPSHOT_DIR = os.getenv('DB_SNAPSHOT_DIR') # Imagens do banco vazio compartilhadas entre processos (padrão: em memória)
+    # Preenchimentos em lotes das migrações (migrations/backfill.py)
+    BACKFILL_BATCH_SIZE = int(os.getenv('BACKFILL_BATCH_SIZE', 1000)) # Linhas por lote (um commit por lote)
+    BACKFILL_PAUSE = float(os.getenv('BACKFILL_PAUSE', 0.05)) # Pausa (s) entre lotes, para as escritas da aplicação
+    # Medição das consultas por requisição (cabeçalho Server-Timing e log de consultas lentas)
+    SQL_SLOW_QUERY = float(os.getenv('SQL_SLOW_QUERY', 0.25)) # Consulta (s) registrada no log de consultas lentas
+    SQL_SLOW_REQUEST = float(os.getenv('SQL_SLOW_REQUEST', 0.5)) # Tempo (s) de banco que registra a requisição no log
+    SQL_SLOWEST_KEPT = int(os.getenv('SQL_SLOWEST_KEPT', 5)) # Consultas mais lentas mostradas por requisição
+    SQL_STATS_HEADER = os.getenv('SQL_STATS_HEADER', 'true').lower() == 'true' # Envia o cabeçalho Server-Timing
+    SQL_SLOW_LOG = os.getenv('SQL_SLOW_LOG') # Arquivo do log de consultas lentas (padrão: apenas o logging)
+    SQL_N_PLUS_ONE_LIMIT = None # Repetições permitidas do mesmo formato de consulta por requisição (None desativa)
+    # PRAGMAs aplicados a cada conexão SQLite (flask db-tune mostra os valores em uso)
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'), # Leitores não são bloqueados pelo escritor
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'), # Seguro com WAL e bem mais rápido que FULL
+        'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)), # Espera (ms) por um lock antes de "database is locked"
+        'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', -16000)), # Cache de páginas (negativo = KiB)
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)), # Leitura via memória mapeada (bytes)
+        'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'), # Tabelas temporárias e ordenações em memória
+    }
     MAILGUN_API_KEY = os.getenv('MAILGUN_API_KEY') # API key para integração com Mailgun
     MAILGUN_API_URL = os.getenv('MAILGUN_API_URL') # URL da API do Mailgun
     MAILGUN_DOMAIN = os.getenv('MAILGUN_DOMAIN') # Domínio associado à conta Mailgun
+    MAILGUN_CONNECT_TIMEOUT = float(os.getenv('MAILGUN_CONNECT_TIMEOUT', 3.05)) # Tempo (s) para conectar ao Mailgun
+    MAILGUN_READ_TIMEOUT = float(os.getenv('MAILGUN_READ_TIMEOUT', 10)) # Tempo (s) de espera pela resposta
+    MAILGUN_POOL_CONNECTIONS = int(os.getenv('MAILGUN_POOL_CONNECTIONS', 2)) # Hosts com pool de conexões próprio
+    MAILGUN_POOL_MAXSIZE = int(os.getenv('MAILGUN_POOL_MAXSIZE', 10)) # Conexões keep-alive por host
+    MAILGUN_POOL_BLOCK = os.getenv('MAILGUN_POOL_BLOCK', 'false').lower() == 'true' # Aguarda conexão livre no pool
+    MAILGUN_RETRY_ATTEMPTS = int(os.getenv('MAILGUN_RETRY_ATTEMPTS', 3)) # Tentativas por envio em 429/5xx
+    MAILGUN_RETRY_BACKOFF = float(os.getenv('MAILGUN_RETRY_BACKOFF', 0.5)) # Espera base (s) entre tentativas
+    MAILGUN_RETRY_MAX_BACKOFF = float(os.getenv('MAILGUN_RETRY_MAX_BACKOFF', 4)) # Espera máxima (s) entre tentativas
+    MAILGUN_BREAKER_FAILURE_RATE = float(os.getenv('MAILGUN_BREAKER_FAILURE_RATE', 0.5)) # Taxa de erro que abre o circuito
+    MAILGUN_BREAKER_MIN_REQUESTS = int(os.getenv('MAILGUN_BREAKER_MIN_REQUESTS', 5)) # Chamadas mínimas para avaliar a taxa
+    MAILGUN_BREAKER_WINDOW = float(os.getenv('MAILGUN_BREAKER_WINDOW', 60)) # Janela (s) de observação dos erros
+    MAILGUN_BREAKER_COOLDOWN = float(os.getenv('MAILGUN_BREAKER_COOLDOWN', 30)) # Tempo (s) com o circuito aberto
     FLASKY_MAIL_SUBJECT_PREFIX = '[Flasky]' # Prefixo de e-mails enviados
+    EMAIL_SERVER_NAME = os.getenv('EMAIL_SERVER_NAME', 'nicolassf.pythonanywhere.com') # Host dos links gerados fora de requisições
     FLASKY_ADMIN = os.getenv('FLASKY_ADMIN') # Endereço de e-mail do administrador
+    FLASKY_SCHOOL_EMAIL = os.getenv('FLASKY_SCHOOL_EMAIL', 'flaskaulasweb@zohomail.com') # E-mail da escola (notificações)
     ENV = os.getenv('FLASK_CONFIG', 'development') # Ambiente (development, production, testing)
+    # Resumo (digest) das notificações enviadas aos administradores
+    ADMIN_DIGEST_WINDOW = float(os.getenv('ADMIN_DIGEST_WINDOW', 3600)) # Intervalo (s) máximo entre resumos
+    ADMIN_DIGEST_MAX_BATCH = int(os.getenv('ADMIN_DIGEST_MAX_BATCH', 200)) # Eventos que disparam um resumo antecipado
+    # Fila persistente de e-mails (flask mail-worker)
+    MAIL_OUTBOX_BATCH_SIZE = int(os.getenv('MAIL_OUTBOX_BATCH_SIZE', 50)) # Mensagens reservadas por lote
+    MAIL_OUTBOX_WORKERS = int(os.getenv('MAIL_OUTBOX_WORKERS', 4)) # Envios simultâneos por worker
+    MAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('MAIL_OUTBOX_MAX_ATTEMPTS', 5)) # Tentativas antes de descartar
+    MAIL_OUTBOX_RETRY_DELAY = float(os.getenv('MAIL_OUTBOX_RETRY_DELAY', 30)) # Atraso base (s) entre tentativas
+    MAIL_OUTBOX_LEASE = float(os.getenv('MAIL_OUTBOX_LEASE', 300)) # Tempo (s) de reserva de uma mensagem
+    MAIL_OUTBOX_POLL_INTERVAL = float(os.getenv('MAIL_OUTBOX_POLL_INTERVAL', 2)) # Espera (s) com a fila vazia
+    # Remoção dos cadastros nunca confirmados (flask prune-unconfirmed)
+    PRUNE_UNCONFIRMED_AGE = float(os.getenv('PRUNE_UNCONFIRMED_AGE', 30 * 24 * 3600)) # Idade (s) a partir da qual o cadastro é removido
+    PRUNE_UNCONFIRMED_BATCH_SIZE = int(os.getenv('PRUNE_UNCONFIRMED_BATCH_SIZE', 500)) # Usuários removidos por commit
+    PRUNE_UNCONFIRMED_PAUSE = float(os.getenv('PRUNE_UNCONFIRMED_PAUSE', 0.05)) # Pausa (s) entre lotes, para as escritas da aplicação
+    PRUNE_UNCONFIRMED_ARCHIVE = os.getenv('PRUNE_UNCONFIRMED_ARCHIVE', 'table') # 'table' (archived_users) ou caminho de um arquivo JSONL
+    PRUNE_UNCONFIRMED_INTERVAL = float(os.getenv('PRUNE_UNCONFIRMED_INTERVAL', 0)) # Execução periódica (s) no próprio processo (0: desligada)
     print(MAILGUN_API_KEY)
     print(MAILGUN_API_URL)
     print(MAILGUN_DOMAIN)
@@ -70,6 +165,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = os.environ.get('TEST_DATABASE_URL') or 'sqlite://'  # Banco de memória
     WTF_CSRF_ENABLED = False  # Desabilita CSRF para testes
+    MAILGUN_RETRY_BACKOFF = 0  # Novas tentativas imediatas nos testes
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # Hash barato: os testes criam muitos usuários
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=2, max_overflow=2, pool_pre_ping=False)
+    SQL_N_PLUS_ONE_LIMIT = int(os.getenv('SQL_N_PLUS_ONE_LIMIT', 10))  # Modo estrito: N+1 faz o teste falhar
 
 # Configuração para produção
 class ProductionConfig(Config):
@@ -79,6 +178,11 @@ class ProductionConfig(Config):
     """
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'data.sqlite')
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000000')  # Custo alto em produção
+    # O MySQL do PythonAnywhere encerra conexões ociosas após 300s
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(pool_size=10, max_overflow=20, pool_timeout=10, pool_recycle=280)
+    SQL_SLOW_LOG = os.getenv('SQL_SLOW_LOG', 'slow_queries.log')
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 1))  # O PythonAnywhere atende atrás de um proxy reverso
 
     @staticmethod
     def init_app(app):
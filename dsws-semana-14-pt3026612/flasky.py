@@ -1,7 +1,7 @@
 import os
 import click
 from app import create_app, db
-from app.models import User, Role
+from app.models import User, Role, EmailOutbox, AdminNotification, ArchivedUser
 from flask_migrate import Migrate
 from flask_login import login_required
 
@@ -17,28 +17,244 @@ def make_shell_context():
     Adiciona objetos ao contexto shell.
     Nota: Sempre atualize essa função ao adicionar novos modelos
     """
-    return dict(db=db, User=User, Role=Role)
+    return dict(db=db, User=User, Role=Role, EmailOutbox=EmailOutbox, AdminNotification=AdminNotification,
+                ArchivedUser=ArchivedUser)
 
 @app.cli.command()
 @click.argument('test_names', nargs=-1)
-def test(test_names):
+@click.option('--workers', type=int, default=1, help='Processos de teste (módulos divididos entre eles).')
+@click.option('--slowest', type=int, default=None, help='Mostra apenas os N testes mais lentos (padrão: todos).')
+def test(test_names, workers, slowest):
     """
     Executa testes unitários.
     Uso:
         flask test                  -> Executa todos os testes
         flask test nome_do_teste    -> Executa um teste específico
+        flask test --workers 4      -> Divide os módulos de teste entre 4 processos
     """
-    import unittest
+    import sys
+    import time
+    from tests.runner import discover_modules, run_sharded, run_tests
+    start = time.perf_counter()
     try:
-        if test_names:
-            tests = unittest.TestLoader().loadTestsFromNames(test_names)
+        if workers > 1:
+            modules = list(test_names) or discover_modules('tests')
+
+            def progress(result):
+                status = 'ok' if not (result.failures or result.errors) else 'FALHOU'
+                click.echo(f"{result.name}: {result.run} testes, {status}")
+                if result.output:
+                    click.echo(result.output)
+            results = run_sharded(modules, workers, progress)
+            timings = [timing for result in results for timing in result.timings]
+            run = sum(result.run for result in results)
+            failures = sum(result.failures for result in results)
+            errors = sum(result.errors for result in results)
+            skipped = sum(result.skipped for result in results)
         else:
-            tests = unittest.TestLoader().discover('tests')
-        unittest.TextTestRunner(verbosity=2).run(tests)
+            result = run_tests(list(test_names), verbosity=2)
+            timings = result.timings
+            run, failures, errors, skipped = result.testsRun, len(result.failures), len(result.errors), len(result.skipped)
     except ModuleNotFoundError as e:
         click.echo(f"Erro: O módulo especificado não foi encontrado: {e}")
+        sys.exit(1)
     except Exception as e:
         click.echo(f"Erro ao executar os testes: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+    click.echo("\nTempo por teste:")
+    for name, duration in sorted(timings, key=lambda item: item[1], reverse=True)[:slowest]:
+        click.echo(f"  {duration:8.3f}s  {name}")
+    click.echo(f"\n{run} testes, {failures} falhas, {errors} erros, {skipped} ignorados em {elapsed:.2f}s "
+               f"(soma dos testes: {sum(duration for _, duration in timings):.2f}s, {workers} processo(s))")
+    if failures or errors:
+        sys.exit(1)
+
+@app.cli.command('mail-worker')
+@click.option('--workers', type=int, default=None, help='Envios simultâneos (padrão: MAIL_OUTBOX_WORKERS).')
+@click.option('--batch-size', type=int, default=None, help='Mensagens por lote (padrão: MAIL_OUTBOX_BATCH_SIZE).')
+@click.option('--interval', type=float, default=None, help='Espera em segundos com a fila vazia.')
+@click.option('--once', is_flag=True, help='Esvazia a fila uma vez e encerra.')
+def mail_worker(workers, batch_size, interval, once):
+    """
+    Envia os e-mails da fila persistente (tabela email_outbox).
+    Uso:
+        flask mail-worker           -> Executa continuamente
+        flask mail-worker --once    -> Esvazia a fila e encerra
+    """
+    from app.outbox import run_worker
+    click.echo("Worker de e-mails iniciado.")
+    try:
+        sent, failed = run_worker(batch_size=batch_size, workers=workers, interval=interval, once=once)
+        click.echo(f"Fila processada: {sent} enviadas, {failed} com falha.")
+    except KeyboardInterrupt:
+        click.echo("Worker de e-mails encerrado.")
+    click.echo(f"Circuit breaker do Mailgun: {app.extensions['mailgun'].stats()}")
+
+@app.cli.command('import-users')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default=None, help='Formato (padrão: pela extensão).')
+@click.option('--batch-size', type=int, default=500, help='Usuários gravados por commit.')
+@click.option('--processes', type=int, default=None, help='Processos para os hashes (padrão: CPUs).')
+@click.option('--hash-method', default=None, help='Método de hash inicial (padrão: PASSWORD_HASH_METHOD).')
+@click.option('--rejected', 'rejected_path', type=click.Path(dir_okay=False), default=None,
+              help='Arquivo CSV para as linhas recusadas.')
+def import_users(path, fmt, batch_size, processes, hash_method, rejected_path):
+    """
+    Importa alunos de um arquivo CSV ou JSONL (username, prontuario, email, role, password opcional).
+    Uso:
+        flask import-users alunos.csv --rejected recusados.csv
+    """
+    from app.importer import import_users as run_import, write_rejected
+    report = run_import(path, fmt=fmt, batch_size=batch_size, processes=processes, hash_method=hash_method,
+                        progress=lambda imported, rejected: click.echo(f"... {imported} importados, {rejected} recusados"))
+    click.echo(f"Importação concluída: {report.imported} usuários criados, {len(report.rejected)} linhas recusadas.")
+    for item in report.rejected[:20]:
+        click.echo(f"  linha {item.line}: {item.errors}")
+    if rejected_path:
+        write_rejected(report.rejected, rejected_path)
+        click.echo(f"Linhas recusadas gravadas em {rejected_path}.")
+
+@app.cli.command('prune-unconfirmed')
+@click.option('--days', type=float, default=None, help='Idade mínima do cadastro em dias (padrão: PRUNE_UNCONFIRMED_AGE).')
+@click.option('--batch-size', type=int, default=None, help='Usuários removidos por commit (padrão: PRUNE_UNCONFIRMED_BATCH_SIZE).')
+@click.option('--archive', default=None, help="'table' (tabela archived_users) ou arquivo JSONL (padrão: PRUNE_UNCONFIRMED_ARCHIVE).")
+@click.option('--dry-run', is_flag=True, help='Apenas conta os cadastros que seriam removidos.')
+def prune_unconfirmed(days, batch_size, archive, dry_run):
+    """
+    Arquiva e remove os cadastros que nunca confirmaram o e-mail.
+    Uso:
+        flask prune-unconfirmed --dry-run
+        flask prune-unconfirmed --days 30 --archive arquivados.jsonl   -> Ex.: uma vez por dia no cron
+    """
+    from app.pruning import prune_unconfirmed as run_prune
+    report = run_prune(age=days * 24 * 3600 if days is not None else None, batch_size=batch_size,
+                       archive=archive, dry_run=dry_run)
+    if report.dry_run:
+        click.echo(f"{report.users} cadastros não confirmados seriam removidos.")
+    else:
+        click.echo(f"{report.users} cadastros não confirmados arquivados e removidos em {report.batches} lote(s).")
+
+@app.cli.command('db-tune')
+@click.option('--optimize/--no-optimize', default=True, help='Executa PRAGMA optimize (padrão: sim).')
+def db_tune(optimize):
+    """
+    Mostra os PRAGMAs em uso no SQLite e executa PRAGMA optimize.
+    Uso:
+        flask db-tune
+    """
+    from app.sqlite_tuning import pragma_report, optimize as run_optimize
+    for name, engine in db.engines.items():
+        label = name or 'padrão'
+        if engine.dialect.name != 'sqlite':
+            click.echo(f"Banco {label}: {engine.dialect.name}, nada a ajustar.")
+            continue
+        click.echo(f"Banco {label} ({engine.url.database or 'memória'}):")
+        configured = app.config['SQLITE_PRAGMAS']
+        for pragma, value in pragma_report(engine).items():
+            expected = configured.get(pragma)
+            note = '' if expected is None or str(expected).lower() == str(value).lower() else f' (configurado: {expected})'
+            click.echo(f"  {pragma} = {value}{note}")
+        if optimize:
+            run_optimize(engine)
+            click.echo("  PRAGMA optimize executado.")
+
+@app.cli.command('db-pool')
+@click.option('--threads', type=int, default=None, help='Threads simultâneas (padrão: pool_size + max_overflow).')
+@click.option('--queries', type=int, default=50, help='Consultas por thread.')
+@click.option('--hold', type=float, default=0.01, help='Tempo (s) com a conexão retirada em cada consulta.')
+def db_pool(threads, queries, hold):
+    """
+    Mostra as opções do pool de conexões e mede retiradas com threads simultâneas.
+    Uso:
+        flask db-pool --threads 16 --queries 100
+    """
+    import threading
+    import time
+    from sqlalchemy import text
+    options = app.config['SQLALCHEMY_ENGINE_OPTIONS']
+    click.echo(f"Opções do engine: {options}")
+    threads = threads or options.get('pool_size', 5) + options.get('max_overflow', 10)
+    for name, engine in db.engines.items():
+        metrics = app.extensions['pool_metrics'][name]
+        metrics.reset()
+        errors = []
+
+        def work():
+            for _ in range(queries):
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text('SELECT 1'))
+                        time.sleep(hold)
+                except Exception as e:
+                    errors.append(e)
+
+        start = time.perf_counter()
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        click.echo(f"Banco {name or 'padrão'}: {threads} threads x {queries} consultas em {elapsed:.2f}s, {len(errors)} erros")
+        for key, value in metrics.stats().items():
+            click.echo(f"  {key} = {value:.2f}" if isinstance(value, float) else f"  {key} = {value}")
+        click.echo(f"  status = {engine.pool.status()}")
+
+@app.cli.command('export')
+@click.argument('table', type=click.Choice(['users', 'roles']))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), default='csv', help='Formato do arquivo.')
+@click.option('--output', type=click.File('w', encoding='utf-8'), default='-', help='Arquivo de saída (padrão: terminal).')
+@click.option('--chunk-size', type=int, default=1000, help='Linhas lidas do banco por vez.')
+def export(table, fmt, output, chunk_size):
+    """
+    Exporta usuários ou papéis em CSV ou JSONL.
+    Uso:
+        flask export users --format jsonl --output usuarios.jsonl
+    """
+    from app.exporter import export_rows
+    from app.replica import use_replica
+    with use_replica():
+        for chunk in export_rows(table, fmt, chunk_size=chunk_size):
+            output.write(chunk)
+
+@app.cli.command('db-replica-sync')
+@click.option('--interval', type=float, default=0, help='Repete a cópia a cada N segundos (0 copia uma vez).')
+def db_replica_sync(interval):
+    """
+    Copia o banco primário para a réplica SQLite local (DATABASE_REPLICA_URL).
+    Uso:
+        flask db-replica-sync --interval 30
+    """
+    import time
+    from app.replica import REPLICA_BIND, sync_replica
+    if REPLICA_BIND not in db.engines:
+        raise click.ClickException('Defina DATABASE_REPLICA_URL para usar uma réplica.')
+    while True:
+        pages = sync_replica(db.engines[None], db.engines[REPLICA_BIND])
+        click.echo(f"Réplica atualizada: {pages} páginas copiadas.")
+        if not interval:
+            break
+        time.sleep(interval)
+
+@app.cli.command('bench-email')
+@click.option('--users', type=int, default=100, help='Fluxos cadastro -> confirmação.')
+@click.option('--concurrency', type=int, default=8, help='Fluxos simultâneos.')
+@click.option('--workers', type=int, default=4, help='Envios simultâneos do worker da fila.')
+@click.option('--latency', type=float, default=0.1, help='Latência média do Mailgun local (s).')
+@click.option('--jitter', type=float, default=0.0, help='Variação da latência do Mailgun local (s).')
+@click.option('--error-rate', type=float, default=0.0, help='Fração de respostas 500 do Mailgun local.')
+@click.option('--throttle-rps', type=float, default=None, help='Requisições/s antes de o Mailgun local responder 429.')
+def bench_email(users, concurrency, workers, latency, jitter, error_rate, throttle_rps):
+    """
+    Mede o caminho de e-mails contra um Mailgun local, sem internet.
+    Uso:
+        flask bench-email --users 200 --latency 0.2 --error-rate 0.05
+    """
+    from benchmarks.email_load import run_benchmark, format_report
+    report = run_benchmark(users=users, concurrency=concurrency, workers=workers, latency=latency,
+                           jitter=jitter, error_rate=error_rate, throttle_rps=throttle_rps)
+    click.echo(format_report(report))
 
 @app.route('/secret')
 @login_required
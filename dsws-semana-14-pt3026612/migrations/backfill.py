@@ -0,0 +1,148 @@
+import logging
+import time
+from datetime import datetime
+import sqlalchemy as sa
+from alembic import op
+from flask import current_app, has_app_context
+
+# No namespace do Alembic, para aparecer no console do flask db upgrade (alembic.ini)
+logger = logging.getLogger('alembic.backfill')
+
+# Tabela com o progresso de cada preenchimento (fora dos modelos e do autogenerate)
+CHECKPOINT_TABLE = 'backfill_checkpoints'
+
+# Valores usados fora da aplicação (BACKFILL_BATCH_SIZE e BACKFILL_PAUSE na configuração)
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_PAUSE = 0.05
+
+# Intervalo mínimo (s) entre as mensagens de progresso
+LOG_INTERVAL = 5
+
+checkpoints = sa.Table(
+    CHECKPOINT_TABLE, sa.MetaData(),
+    sa.Column('name', sa.String(64), primary_key=True),  # Nome do preenchimento
+    sa.Column('last_key', sa.Integer),  # Última chave primária processada
+    sa.Column('rows_done', sa.Integer, nullable=False),
+    sa.Column('updated_at', sa.DateTime, nullable=False),
+    sa.Column('finished_at', sa.DateTime),
+)
+
+
+def include_name(name, type_, parent_names):
+    """
+    Filtro do autogenerate (include_name): ignora a tabela de progresso.
+    """
+    return not (type_ == 'table' and name == CHECKPOINT_TABLE)
+
+
+def _setting(name, value, default):
+    if value is not None:
+        return value
+    if has_app_context():
+        return current_app.config.get(name, default)
+    return default
+
+
+def _load(connection, name):
+    checkpoints.create(connection, checkfirst=True)
+    return connection.execute(sa.select(checkpoints).where(checkpoints.c.name == name)).first()
+
+
+def _save(connection, name, last_key, rows_done, finished=False):
+    now = datetime.utcnow()
+    values = dict(last_key=last_key, rows_done=rows_done, updated_at=now, finished_at=now if finished else None)
+    if connection.execute(sa.update(checkpoints).where(checkpoints.c.name == name).values(**values)).rowcount == 0:
+        connection.execute(sa.insert(checkpoints).values(name=name, **values))
+
+
+def _in_memory(connection):
+    return connection.dialect.name == 'sqlite' and connection.engine.url.database in (None, '', ':memory:')
+
+
+def backfill(name, table, values, where=None, key='id', batch_size=None, pause=None):
+    """
+    Preenche colunas em lotes pela chave primária, com um commit por lote.
+
+    Cada lote é um UPDATE curto, seguido de uma pausa, para que a aplicação
+    consiga gravar entre os lotes (no SQLite, cada escrita bloqueia o banco
+    inteiro). O progresso fica em backfill_checkpoints: se a migração for
+    interrompida, a próxima execução continua do último lote gravado.
+
+    O trabalho anterior da migração (ex.: o ADD COLUMN) é confirmado antes do
+    primeiro lote. No modo --sql e em bancos SQLite em memória (que só o
+    processo da migração acessa), é feito um único UPDATE.
+
+    Uso (em upgrade()):
+        users = sa.table('users', sa.column('id'), sa.column('email'))
+        backfill('users_email', users, {'email': ...}, where=users.c.email.is_(None))
+
+    :param name: Nome único do preenchimento (chave do progresso).
+    :param table: Tabela (sa.table) com a chave e as colunas usadas.
+    :param values: Colunas -> valores ou expressões SQL, como em update().values().
+    :param where: Condição opcional das linhas que ainda precisam ser preenchidas.
+    :param key: Coluna inteira e crescente usada para dividir os lotes.
+    :param batch_size: Linhas por lote (padrão: BACKFILL_BATCH_SIZE).
+    :param pause: Pausa (s) entre os lotes (padrão: BACKFILL_PAUSE).
+    :return: Linhas atualizadas, somando as execuções anteriores (None com um único UPDATE).
+    """
+    batch_size = _setting('BACKFILL_BATCH_SIZE', batch_size, DEFAULT_BATCH_SIZE)
+    pause = _setting('BACKFILL_PAUSE', pause, DEFAULT_PAUSE)
+    column = table.c[key]
+    conditions = [where] if where is not None else []
+    context = op.get_context()
+    if context.as_sql or _in_memory(op.get_bind()):
+        op.execute(sa.update(table).where(*conditions).values(values))
+        return None
+
+    with context.autocommit_block():
+        # Conexão própria: cada lote é uma transação, independente da transação da migração
+        with op.get_bind().engine.connect() as connection:
+            with connection.begin():
+                checkpoint = _load(connection, name)
+            if checkpoint is not None and checkpoint.finished_at is not None:
+                logger.info("%s: já concluído (%s linhas).", name, checkpoint.rows_done)
+                return checkpoint.rows_done
+            last_key = checkpoint.last_key if checkpoint is not None else None
+            rows_done = checkpoint.rows_done if checkpoint is not None else 0
+            if last_key is not None:
+                logger.info("%s: retomando após %s = %s (%s linhas).", name, key, last_key, rows_done)
+
+            started = last_log = time.monotonic()
+            updated = 0
+            while True:
+                with connection.begin():
+                    query = sa.select(column).where(*conditions).order_by(column).limit(batch_size)
+                    if last_key is not None:
+                        query = query.where(column > last_key)
+                    keys = connection.execute(query).scalars().all()
+                    if not keys:
+                        _save(connection, name, last_key, rows_done, finished=True)
+                        break
+                    result = connection.execute(sa.update(table)
+                                                .where(column >= keys[0], column <= keys[-1], *conditions)
+                                                .values(values))
+                    last_key = keys[-1]
+                    rows_done += result.rowcount
+                    updated += result.rowcount
+                    _save(connection, name, last_key, rows_done)
+                if time.monotonic() - last_log >= LOG_INTERVAL:
+                    last_log = time.monotonic()
+                    logger.info("%s: %s linhas (%.0f linhas/s), %s = %s.", name, rows_done,
+                                updated / (last_log - started), key, last_key)
+                if pause:
+                    time.sleep(pause)
+
+            elapsed = time.monotonic() - started
+            logger.info("%s: concluído, %s linhas em %.1f s (%.0f linhas/s).", name, rows_done, elapsed,
+                        updated / elapsed if elapsed else 0)
+            return rows_done
+
+
+def reset_backfill(name):
+    """
+    Remove o progresso de um preenchimento (usado em downgrade()).
+    """
+    connection = op.get_bind()
+    if op.get_context().as_sql or not sa.inspect(connection).has_table(CHECKPOINT_TABLE):
+        return
+    connection.execute(sa.delete(checkpoints).where(checkpoints.c.name == name))
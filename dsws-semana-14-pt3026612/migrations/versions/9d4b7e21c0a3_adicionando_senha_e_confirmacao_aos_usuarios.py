@@ -0,0 +1,40 @@
+"""Adicionando senha e confirmação aos usuários
+
+Revision ID: 9d4b7e21c0a3
+Revises: 3f1c2b7d9a10
+Create Date: 2026-10-18 11:01:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from migrations.backfill import backfill, reset_backfill
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b7e21c0a3'
+down_revision = '3f1c2b7d9a10'
+branch_labels = None
+depends_on = None
+
+users = sa.table('users', sa.column('id', sa.Integer), sa.column('confirmed', sa.Boolean))
+
+
+def upgrade():
+    # password_hash e confirmed só existiam nos modelos: são adicionadas aos bancos
+    # criados pelas migrações (os criados com create_all() já as têm)
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}
+
+    # Colunas anuláveis e sem valor padrão: no SQLite, o ADD COLUMN não reescreve a tabela
+    if 'password_hash' not in columns:
+        op.add_column('users', sa.Column('password_hash', sa.String(length=128), nullable=True))
+    if 'confirmed' not in columns:
+        op.add_column('users', sa.Column('confirmed', sa.Boolean(), nullable=True))
+
+    # Usuários anteriores à coluna ficam não confirmados, em lotes com commits curtos (retomável).
+    # Nenhuma restrição NOT NULL/UNIQUE é criada: no SQLite, isso copiaria a tabela inteira
+    backfill('users_confirmed', users, {'confirmed': sa.false()}, where=users.c.confirmed.is_(None))
+
+
+def downgrade():
+    # As colunas são mantidas: podem ser anteriores a esta migração (bancos criados com create_all())
+    reset_backfill('users_confirmed')
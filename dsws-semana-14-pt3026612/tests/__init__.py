@@ -1,28 +1,121 @@
 import unittest
 from app import create_app, db
+from app.email import MailgunClient
+from app.hashing import PasswordHasher
+from app.identity import IdentityCache
 from app.models import User
+from app.ratelimit import RateLimiter
+from app.replica import RoutingSession
+
+
+class _TestSession(RoutingSession):
+    """
+    Sessão dos testes transacionais, ligada à conexão do teste (o get_bind do
+    Flask-SQLAlchemy sempre escolhe o engine e ignora o bind da sessão).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.bind is not None:
+            return self.bind
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+_worker = {}
+
+
+def _configure(app):
+    """
+    Configuração e hooks comuns às aplicações dos testes.
+    """
+    app.config['SERVER_NAME'] = 'nicolassf.pythonanywhere.com'
+    app.config['PREFERRED_URL_SCHEME'] = 'http'
+    app.config['APPLICATION_ROOT'] = '/'
+
+    @app.before_request
+    def before_request():
+        db.session.rollback()  # Garante isolamento dos testes
+
+    @app.teardown_request
+    def teardown_request(exception=None):
+        db.session.remove()  # Remove a sessão após cada requisição/teste
+
+
+def _worker_app():
+    """
+    Aplicação dos testes transacionais, criada uma vez por processo, com o
+    esquema no banco de memória do seu engine.
+    """
+    if 'app' not in _worker:
+        app = create_app('testing')
+        _configure(app)
+        with app.app_context():
+            app.extensions['schema_snapshot'].restore()
+        _worker['app'] = app
+    return _worker['app']
+
+
+def _stateful_services(app):
+    """
+    Serviços com caches e contadores (cache de identidades, limite de
+    requisições, circuit breaker do Mailgun, estatísticas dos hashes),
+    recriados a cada teste para que um teste não veja o estado do anterior.
+    """
+    return {
+        'identity_cache': IdentityCache(app.config['IDENTITY_CACHE_SIZE'], app.config['IDENTITY_CACHE_TTL']),
+        'rate_limiter': RateLimiter(app.config),
+        'mailgun': MailgunClient(app.config),
+        'password_hasher': PasswordHasher(app.config),
+    }
+
 
 class TestCase(unittest.TestCase):
+    # Testes que precisam de commits reais ou do engine (PRAGMAs, réplica, backup)
+    # usam transactional = False e recebem uma aplicação e um banco próprios,
+    # restaurado da imagem do esquema
+    transactional = True
+
     def setUp(self):
-        self.app = create_app('testing')
-        self.app.config['SERVER_NAME'] = 'nicolassf.pythonanywhere.com'
-        self.app.config['PREFERRED_URL_SCHEME'] = 'http'
-        self.app.config['APPLICATION_ROOT'] = '/'
+        if not self.transactional:
+            self.app = create_app('testing')
+            _configure(self.app)
+            self.app_context = self.app.app_context()
+            self.app_context.push()
+            self.app.extensions['schema_snapshot'].restore()  # Banco vazio, copiado da imagem do esquema
+            self.client = self.app.test_client()
+            return
+
+        self.app = _worker_app()
+        # Configuração e serviços alterados pelo teste voltam ao original no tearDown
+        self.config = dict(self.app.config)
+        self.extensions = dict(self.app.extensions)
+        self.services = _stateful_services(self.app)
+        self.app.extensions.update(self.services)
         self.app_context = self.app.app_context()
         self.app_context.push()
-        db.create_all()  # Cria tabelas para o teste
+        # Cada teste roda em um SAVEPOINT dentro desta transação: os commits
+        # das views liberam apenas o SAVEPOINT e o tearDown desfaz tudo
+        self.connection = db.engine.connect()
+        self.transaction = self.connection.begin()
+        self.session = db.session
+        db.session = db._make_scoped_session({'class_': _TestSession, 'bind': self.connection,
+                                              'join_transaction_mode': 'create_savepoint'})
         self.client = self.app.test_client()
 
-        @self.app.before_request
-        def before_request():
-            db.session.rollback()  # Garante isolamento dos testes
-
-        @self.app.teardown_request
-        def teardown_request(exception=None):
-            db.session.remove()  # Remove a sessão após cada requisição/teste
-
     def tearDown(self):
         db.session.remove()
-        db.drop_all()  # Remove tabelas após o teste
-        self.app_context.pop()
+        if not self.transactional:
+            for engine in db.engines.values():
+                engine.dispose()  # Descarta o banco de memória do teste
+            self.app_context.pop()
+            return
 
+        self.transaction.rollback()
+        self.connection.close()
+        db.session = self.session
+        self.app_context.pop()
+        for service in (self.services['mailgun'], self.services['password_hasher']):
+            service.close()
+        self.app.config.clear()
+        self.app.config.update(self.config)
+        self.app.extensions.clear()
+        self.app.extensions.update(self.extensions)
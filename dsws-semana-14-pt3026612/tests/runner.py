@@ -0,0 +1,88 @@
+import io
+import multiprocessing
+import time
+import unittest
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Resultado de um módulo de testes executado em um processo
+ModuleResult = namedtuple('ModuleResult', ['name', 'output', 'timings', 'run', 'failures', 'errors', 'skipped'])
+
+
+class TimingResult(unittest.TextTestResult):
+    """
+    Resultado do unittest que guarda a duração de cada teste.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = []
+
+    def startTest(self, test):
+        self._started = time.perf_counter()
+        super().startTest(test)
+
+    def stopTest(self, test):
+        self.timings.append((test.id(), time.perf_counter() - self._started))
+        super().stopTest(test)
+
+
+def discover_modules(start_dir='tests'):
+    """
+    Nomes dos módulos de teste encontrados pela descoberta do unittest.
+    """
+    modules = set()
+
+    def walk(suite):
+        for item in suite:
+            if isinstance(item, unittest.TestSuite):
+                walk(item)
+            else:
+                modules.add(type(item).__module__)
+    walk(unittest.TestLoader().discover(start_dir, top_level_dir='.'))
+    return sorted(modules)
+
+
+def run_tests(names, verbosity=2, stream=None):
+    """
+    Executa os testes no processo atual.
+
+    :param names: Nomes dos testes ou módulos (vazio: todos os testes de tests/).
+    :return: TimingResult.
+    """
+    loader = unittest.TestLoader()
+    suite = loader.loadTestsFromNames(names) if names else loader.discover('tests', top_level_dir='.')
+    runner = unittest.TextTestRunner(stream=stream, verbosity=verbosity, resultclass=TimingResult)
+    return runner.run(suite)
+
+
+def _run_module(name):
+    stream = io.StringIO()
+    result = run_tests([name], verbosity=1, stream=stream)
+    return ModuleResult(name, stream.getvalue() if not result.wasSuccessful() else '', result.timings,
+                        result.testsRun, len(result.failures), len(result.errors), len(result.skipped))
+
+
+def run_sharded(modules, workers, progress=None):
+    """
+    Distribui os módulos de teste entre processos.
+
+    Cada processo tem o próprio banco de memória e recebe um módulo por vez,
+    de modo que os mais lentos não atrasam os demais processos.
+
+    :param modules: Nomes dos módulos (ex.: 'tests.test_models').
+    :param workers: Quantidade de processos.
+    :param progress: Função opcional chamada com cada ModuleResult.
+    :return: Lista de ModuleResult.
+    """
+    results = []
+    # spawn: os processos não herdam as threads (pools, clientes HTTP) da aplicação do comando.
+    # Os processos do executor não são daemon, então os testes também podem criar processos.
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        for future in as_completed([executor.submit(_run_module, name) for name in modules]):
+            result = future.result()
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    return results
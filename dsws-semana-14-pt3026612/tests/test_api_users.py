@@ -0,0 +1,96 @@
+import re
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from app import db
+from app.models import User, Role
+from . import TestCase
+
+class UsersApiTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        aluno, professor = Role(name='Aluno'), Role(name='Professor')
+        db.session.add_all([aluno, professor])
+        start = datetime(2024, 1, 1)
+        # created_at em ordem inversa ao id, com empates, para exercitar a chave composta
+        db.session.add_all([User(username=f'user{i}', prontuario=f'USR{i:07d}', email=f'user{i}@zohomail.com',
+                                 role=aluno if i % 2 else professor, confirmed=i % 3 != 0, password_hash='x',
+                                 created_at=start - timedelta(days=i // 2)) for i in range(1, 10)])
+        db.session.add(User(username='admin', prontuario='ADM1234567', email='admin@zohomail.com',
+                            password='gato', confirmed=True, created_at=start))
+        db.session.commit()
+        self.app.config['FLASKY_ADMIN'] = 'admin@zohomail.com'
+        self.client.post('/auth/login', data={'email': 'admin@zohomail.com', 'password': 'gato'})
+
+    def fetch_all(self, url):
+        pages, names = 0, []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            names += [user['username'] for user in data['users']]
+            match = re.match(r'<([^>]+)>; rel="next"', response.headers.get('Link', ''))
+            url = match.group(1) if match else None
+            self.assertEqual(bool(url), bool(data['next_cursor']))
+            pages += 1
+        return pages, names
+
+    def test_paginate_by_id(self):
+        pages, names = self.fetch_all('/api/users?limit=3')
+        self.assertEqual(pages, 4)
+        self.assertEqual(names, [f'user{i}' for i in range(1, 10)] + ['admin'])
+
+    def test_paginate_by_created_at(self):
+        pages, names = self.fetch_all('/api/users?limit=4&order=created_at')
+        expected = [user.username for user in
+                    db.session.scalars(db.select(User).order_by(User.created_at, User.id))]
+        self.assertEqual(names, expected)
+        self.assertEqual(pages, 3)
+
+    def test_filters_and_fields(self):
+        response = self.client.get('/api/users?role=Aluno&confirmed=true&fields=username,email')
+        users = response.get_json()['users']
+        self.assertEqual([user['username'] for user in users], ['user1', 'user5', 'user7'])
+        self.assertEqual(set(users[0]), {'username', 'email'})
+        self.assertNotIn('Link', response.headers)
+
+    def test_personal_fields_require_admin(self):
+        db.session.add(User(username='aluno', prontuario='ALU1234567', email='aluno@zohomail.com',
+                            password='gato', confirmed=True))
+        db.session.commit()
+        self.client.get('/auth/logout')
+        self.client.post('/auth/login', data={'email': 'aluno@zohomail.com', 'password': 'gato'})
+        for fields in ('email', 'username,prontuario'):
+            response = self.client.get(f'/api/users?fields={fields}')
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(response.get_json()['error'], 'forbidden')
+        response = self.client.get('/api/users?fields=username')
+        self.assertEqual(response.status_code, 200)
+
+    def test_bounded_query(self):
+        statements = []
+        record = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.client.get('/api/users?limit=2')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        listing = [(statement, params) for statement, params in statements if 'LIMIT' in statement]
+        self.assertEqual(len(listing), 1)
+        self.assertIn(3, listing[0][1])  # limit + 1
+
+    def test_invalid_parameters(self):
+        for query in ('order=username', 'fields=password_hash', 'limit=abc', 'cursor=!!', 'confirmed=talvez'):
+            self.assertEqual(self.client.get(f'/api/users?{query}').status_code, 400, query)
+
+    def test_index_uses_api(self):
+        html = self.client.get('/').get_data(as_text=True)
+        self.assertIn('data-url="/api/users?fields=username', html)
+        self.assertIn('js/users.js', html)
+
+    def test_requires_login(self):
+        self.client.get('/auth/logout')
+        self.assertEqual(self.client.get('/api/users').status_code, 302)
+
+if __name__ == '__main__':
+    unittest.main()
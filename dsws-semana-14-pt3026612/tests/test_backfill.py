@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import sqlalchemy as sa
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from flask_migrate import Migrate, upgrade
+from config import TestingConfig
+from app import create_app, db
+from migrations.backfill import CHECKPOINT_TABLE, backfill, checkpoints, include_name
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+users = sa.table('users', sa.column('id', sa.Integer), sa.column('role_id', sa.Integer))
+
+
+class BackfillTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        uri = 'sqlite:///' + os.path.join(self.tmpdir, 'app.sqlite')
+        with mock.patch.object(TestingConfig, 'SQLALCHEMY_DATABASE_URI', uri):
+            self.app = create_app('testing')
+        Migrate(self.app, db, directory=MIGRATIONS)
+        self.app.config.update(BACKFILL_BATCH_SIZE=10, BACKFILL_PAUSE=0)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        self.addCleanup(db.engine.dispose)
+        self.addCleanup(db.session.remove)
+
+        self.updates = []
+
+        @sa.event.listens_for(db.engine, 'before_cursor_execute')
+        def _record(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith('UPDATE users'):
+                self.updates.append(statement)
+
+    def add_users(self, count):
+        # Usuários gravados antes de 9d4b7e21c0a3, sem as colunas password_hash e confirmed
+        with db.engine.begin() as connection:
+            connection.execute(sa.text('INSERT INTO users (username, prontuario, email, created_at, updated_at) '
+                                       'VALUES (:username, :prontuario, :email, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)'),
+                               [{'username': f'user{i}', 'prontuario': f'P{i:07d}', 'email': f'user{i}@zohomail.com'}
+                                for i in range(count)])
+
+    def run_backfill(self, name, values):
+        with db.engine.connect() as connection:
+            with Operations.context(MigrationContext.configure(connection)):
+                return backfill(name, users, values)
+
+    def test_upgrade_fills_existing_rows_in_batches(self):
+        upgrade(revision='3f1c2b7d9a10')
+        self.add_users(25)
+        upgrade()
+        self.assertEqual(len([statement for statement in self.updates if 'SET confirmed' in statement]), 3)
+        confirmed = db.session.scalars(sa.text('SELECT confirmed FROM users ORDER BY id')).all()
+        self.assertEqual(confirmed, [False] * 25)
+        done = dict(db.session.execute(sa.select(checkpoints.c.name, checkpoints.c.rows_done)
+                                       .where(checkpoints.c.finished_at.is_not(None))).all())
+        self.assertEqual(done, {'users_confirmed': 25})
+        self.assertFalse(include_name(CHECKPOINT_TABLE, 'table', {}))
+
+    def test_backfill_resumes_from_checkpoint(self):
+        upgrade(revision='3f1c2b7d9a10')
+        self.add_users(25)
+        with db.engine.begin() as connection:
+            checkpoints.create(connection)  # Como após uma migração interrompida no 11º registro
+            connection.execute(sa.insert(checkpoints).values(name='roles', last_key=10, rows_done=10,
+                                                             updated_at=sa.func.current_timestamp()))
+        self.assertEqual(self.run_backfill('roles', {'role_id': 1}), 25)
+        filled = db.session.scalars(sa.text('SELECT id FROM users WHERE role_id = 1')).all()
+        self.assertEqual(filled, list(range(11, 26)))
+        self.assertEqual(len(self.updates), 2)
+
+        # Concluído: uma nova execução não atualiza nada
+        self.assertEqual(self.run_backfill('roles', {'role_id': 2}), 25)
+        self.assertEqual(len(self.updates), 2)
@@ -0,0 +1,111 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import requests
+from app.delivery import CircuitBreaker, MailgunUnavailable, RetryPolicy
+from app.models import EmailOutbox
+from app.outbox import queue_email, process_outbox
+from app import db
+from . import TestCase
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class CircuitBreakerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_rate=0.5, min_requests=4, window=60, cooldown=30, clock=self.clock)
+
+    def _call(self, success):
+        self.breaker.before_call()
+        self.breaker.record(success)
+
+    def test_opens_when_failure_rate_is_reached(self):
+        for success in (True, False, True):
+            self._call(success)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+        self._call(False)  # 2 falhas em 4 chamadas
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(MailgunUnavailable) as ctx:
+            self.breaker.before_call()
+        self.assertAlmostEqual(ctx.exception.retry_after, 30)
+        self.assertEqual(self.breaker.stats()['rejected'], 1)
+
+    def test_old_results_leave_the_window(self):
+        for _ in range(3):
+            self._call(False)
+        self.clock.now = 61
+        self._call(False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_trial_closes_or_reopens(self):
+        for _ in range(4):
+            self._call(False)
+        self.clock.now = 31
+        self.breaker.before_call()  # Chamada de teste
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        with self.assertRaises(MailgunUnavailable):
+            self.breaker.before_call()  # Apenas uma chamada de teste por vez
+        self.breaker.record(False)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+        self.clock.now = 62
+        self._call(True)
+        stats = self.breaker.stats()
+        self.assertEqual(stats['state'], CircuitBreaker.CLOSED)
+        self.assertEqual((stats['opened'], stats['half_opened'], stats['closed']), (2, 2, 1))
+
+class RetryPolicyTestCase(unittest.TestCase):
+    def test_delay_is_bounded(self):
+        policy = RetryPolicy(attempts=5, backoff=1, max_backoff=3)
+        for attempt in range(1, 6):
+            self.assertLessEqual(policy.delay(attempt), min(3, 2 ** (attempt - 1)))
+
+    def test_delay_honors_retry_after(self):
+        policy = RetryPolicy(backoff=1, max_backoff=10)
+        response = MagicMock(headers={'Retry-After': '7'})
+        self.assertEqual(policy.delay(1, response), 7)
+
+class MailgunClientRetryTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config['MAILGUN_API_URL'] = 'https://api.mailgun.net/v3/example.com/messages'
+        self.app.config['MAILGUN_DOMAIN'] = 'example.com'
+        self.client_mailgun = self.app.extensions['mailgun']
+
+    @patch('app.email.requests.Session.post')
+    def test_retries_temporary_failures(self, mock_post):
+        mock_post.side_effect = [MagicMock(status_code=503, headers={}),
+                                 requests.exceptions.ConnectionError(),
+                                 MagicMock(status_code=200)]
+        response = self.client_mailgun.post({'to': 'a@zohomail.com'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_post.call_count, 3)
+
+    @patch('app.email.requests.Session.post')
+    def test_does_not_retry_client_errors(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=400, headers={})
+        self.assertEqual(self.client_mailgun.post({'to': 'a@zohomail.com'}).status_code, 400)
+        mock_post.assert_called_once()
+        self.assertEqual(self.client_mailgun.stats()['failures'], 0)
+
+    @patch('app.email.requests.Session.post')
+    def test_open_breaker_keeps_outbox_message_pending(self, mock_post):
+        mock_post.return_value = MagicMock(status_code=503, headers={})
+        queue_email(to='a@zohomail.com', subject='Assunto', text='Olá')
+        queue_email(to='b@zohomail.com', subject='Assunto', text='Olá')
+        db.session.commit()
+
+        # O circuito abre durante a segunda mensagem, que então não conta como tentativa
+        self.assertEqual(process_outbox(workers=1), (0, 2))
+        self.assertEqual(mock_post.call_count, self.app.config['MAILGUN_BREAKER_MIN_REQUESTS'])
+        first, second = EmailOutbox.query.order_by(EmailOutbox.id).all()
+        self.assertEqual(first.attempts, 1)
+        self.assertEqual(second.attempts, 0)
+        self.assertEqual(second.status, EmailOutbox.STATUS_PENDING)
+
+if __name__ == '__main__':
+    unittest.main()
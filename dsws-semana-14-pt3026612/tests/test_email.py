@@ -1,12 +1,15 @@
+import json
 import unittest
 from bs4 import BeautifulSoup # Utilizado para fazer parsing de HTML e extrair dados de páginas web
 from unittest.mock import patch, MagicMock
 from app import email
+from app.email_render import render_email
 from . import TestCase
 
 class TestEmailModule(TestCase):
 
     def setUp(self):
+        super().setUp()
         # Configura o aplicativo Flask para os testes
         self.app.config['MAILGUN_API_URL'] = 'https://api.mailgun.net/v3/example.com/messages'
         self.app.config['MAILGUN_API_KEY'] = 'test-key'
@@ -17,15 +20,15 @@ class TestEmailModule(TestCase):
         self.body = 'This is a test email body.'
         self.gif_url = 'https://example.com/welcome.gif'
 
-    @patch('app.email.requests.post')
-    def test_send_verification_email_success(self, mock_post):
+    @patch('app.email.requests.Session.post')
+    def test_send_message_success(self, mock_post):
         with self.app.app_context():
             # Configura o mock para simular uma resposta de sucesso
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_post.return_value = mock_response
 
-            email.send_verification_email(self.to, self.subject, self.body)
+            email.send_message(email.build_message(self.to, self.subject, html=self.body))
 
             # Verifica se a função post foi chamada corretamente
             mock_post.assert_called_once_with(
@@ -36,11 +39,12 @@ class TestEmailModule(TestCase):
                     'to': self.to,
                     'subject': f"{self.app.config['FLASKY_MAIL_SUBJECT_PREFIX']} {self.subject}",
                     'html': self.body
-                }
+                },
+                timeout=(self.app.config['MAILGUN_CONNECT_TIMEOUT'], self.app.config['MAILGUN_READ_TIMEOUT'])
             )
 
-    @patch('app.email.requests.post')
-    def test_send_verification_email_failure(self, mock_post):
+    @patch('app.email.requests.Session.post')
+    def test_send_message_failure(self, mock_post):
         with self.app.app_context():
             # Configura o mock para simular uma resposta de erro
             mock_response = MagicMock()
@@ -49,20 +53,21 @@ class TestEmailModule(TestCase):
             mock_post.return_value = mock_response
 
             with self.assertRaises(Exception):
-                email.send_verification_email(self.to, self.subject, self.body)
+                email.send_message(email.build_message(self.to, self.subject, html=self.body))
 
-            # Verifica se a resposta de erro foi manipulada
-            mock_post.assert_called_once()
+            # O erro 500 é temporário: o envio é repetido até o limite de tentativas
+            self.assertEqual(mock_post.call_count, self.app.config['MAILGUN_RETRY_ATTEMPTS'])
 
-    @patch('app.email.requests.post')
-    def test_send_email_with_gif(self, mock_post):
+    @patch('app.email.requests.Session.post')
+    def test_send_welcome_message_with_gif(self, mock_post):
         with self.app.app_context():
             # Configura o mock para simular uma resposta de sucesso
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_post.return_value = mock_response
 
-            email.send_email_with_gif(self.to, self.subject, self.body, self.gif_url)
+            html, text = render_email('auth/email/welcome', message=self.body, gif_url=self.gif_url)
+            email.send_message(email.build_message(self.to, self.subject, html=html, text=text))
 
              # Verifica se o post foi chamado corretamente
             mock_post.assert_called_once()
@@ -71,34 +76,24 @@ class TestEmailModule(TestCase):
             actual_call = mock_post.call_args
             actual_html = actual_call[1]['data']['html']
 
-            # Normaliza o HTML real e o esperado
-            normalized_html = f"""
-            <!DOCTYPE html>
-            <html>
-                <head>
-                    <title>Bem-vindo!</title>
-                </head>
-                <body>
-                    <p>{self.body}</p>
-                    <p>
-                        <img src="{self.gif_url}" alt="Welcome GIF" />
-                    </p>
-                </body>
-            </html>
-            """
-
-            # Usando BeautifulSoup para comparar HTML, ignorando diferenças de formatação
-            assert str(BeautifulSoup(actual_html, 'html.parser')) == str(BeautifulSoup(normalized_html, 'html.parser'))
-
-    @patch('app.email.requests.post')
-    def test_send_simple_message(self, mock_post):
+            # Usando BeautifulSoup para comparar o HTML, ignorando diferenças de formatação
+            soup = BeautifulSoup(actual_html, 'html.parser')
+            self.assertEqual(soup.title.string, 'Bem-vindo!')
+            self.assertEqual(soup.p.get_text(strip=True), self.body)
+            self.assertEqual(soup.img['src'], self.gif_url)
+            self.assertEqual(soup.img['alt'], 'Welcome GIF')
+            # A versão em texto simples acompanha o HTML
+            self.assertEqual(actual_call[1]['data']['text'], self.body)
+
+    @patch('app.email.requests.Session.post')
+    def test_send_text_message(self, mock_post):
         with self.app.app_context():
             # Configura o mock para simular uma resposta de sucesso
             mock_response = MagicMock()
             mock_response.status_code = 200
             mock_post.return_value = mock_response
 
-            email.send_simple_message(self.to, self.subject, "New User")
+            email.send_message(email.build_message(self.to, self.subject, text="Novo usuário cadastrado: New User"))
 
             # Verifica se a função post foi chamada corretamente
             mock_post.assert_called_once_with(
@@ -109,8 +104,45 @@ class TestEmailModule(TestCase):
                     'to': self.to,
                     'subject': f"{self.app.config['FLASKY_MAIL_SUBJECT_PREFIX']} {self.subject}",
                     'text': "Novo usuário cadastrado: New User"
-                }
+                },
+                timeout=(self.app.config['MAILGUN_CONNECT_TIMEOUT'], self.app.config['MAILGUN_READ_TIMEOUT'])
             )
 
+    def test_client_reuses_pooled_session(self):
+        """Todos os envios da aplicação usam a mesma sessão HTTP."""
+        client = self.app.extensions['mailgun']
+        adapter = client.session.get_adapter(self.app.config['MAILGUN_API_URL'])
+        self.assertEqual(adapter._pool_maxsize, self.app.config['MAILGUN_POOL_MAXSIZE'])
+        with patch.object(client.session, 'post') as mock_post:
+            mock_post.return_value = MagicMock(status_code=200)
+            email.send_message(email.build_message(self.to, self.subject, text=self.body))
+            email.send_message(email.build_message(self.to, self.subject, html=self.body))
+            self.assertEqual(mock_post.call_count, 2)
+        self.assertIs(email.get_client(), client)
+
+    def test_build_batches_groups_by_template(self):
+        """Mensagens do mesmo modelo viram uma única requisição com recipient-variables."""
+        aviso = email.BatchTemplate(subject='Aviso', html=None, text='Olá, %recipient.nome%!')
+        boas_vindas = email.BatchTemplate(subject='%recipient.assunto%', html='<p>%recipient.mensagem%</p>',
+                                          text='%recipient.mensagem%')
+        batches = email.build_batches([
+            ('a@zohomail.com', boas_vindas, {'assunto': 'A', 'mensagem': 'x'}),
+            ('b@zohomail.com', aviso, {'nome': 'B'}),
+            ('c@zohomail.com', boas_vindas, {'assunto': 'C', 'mensagem': 'y'}),
+            (None, aviso, {'nome': 'sem destinatário'}),
+        ])
+        self.assertEqual(len(batches), 2)
+        self.assertEqual(batches[0]['to'], 'a@zohomail.com, c@zohomail.com')
+        self.assertEqual(json.loads(batches[0]['recipient-variables'])['c@zohomail.com']['assunto'], 'C')
+        self.assertEqual(batches[1]['text'], 'Olá, %recipient.nome%!')
+        self.assertNotIn('html', batches[1])
+
+    def test_build_batches_respects_batch_size(self):
+        aviso = email.BatchTemplate(subject='Aviso', html=None, text='Olá!')
+        messages = [(f'aluno{i}@zohomail.com', aviso, {}) for i in range(5)]
+        messages.append(('aluno4@zohomail.com', aviso, {}))  # Repetido: vai para outra requisição
+        batches = email.build_batches(messages, batch_size=2)
+        self.assertEqual([len(json.loads(b['recipient-variables'])) for b in batches], [2, 2, 1, 1])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+from app.email_render import render_email
+from app.models import User
+from . import TestCase
+
+class EmailRenderTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.renderer = self.app.extensions['email_renderer']
+
+    def test_templates_are_preloaded(self):
+        """Os modelos de e-mail são compilados na criação da aplicação."""
+        for name in ('auth/email/layout.html', 'auth/email/verify_email.html', 'auth/email/verify_email.txt'):
+            self.assertIn(name, self.renderer._templates)
+        template = self.renderer.get_template('auth/email/verify_email.html')
+        self.assertIs(self.renderer.get_template('auth/email/verify_email.html'), template)
+
+    def test_render_outside_request(self):
+        """Os links são absolutos mesmo sem contexto de requisição."""
+        html, text = render_email('auth/email/verify_email', username='ana', token='abc')
+        link = 'http://nicolassf.pythonanywhere.com/auth/confirm/abc'
+        self.assertIn(f'href="{link}"', html)
+        self.assertIn('Olá, ana!', html)
+        self.assertIn(link, text)
+        self.assertNotIn('<p>', text)
+
+    def test_layout_is_shared(self):
+        html, text = render_email('auth/email/reset_password', username='ana', token='abc')
+        self.assertIn('Grupo Flask', html)
+        self.assertIn('Grupo Flask', text)
+        html, _ = render_email('auth/email/verify_email', username='ana', token='abc')
+        self.assertNotIn('Grupo Flask', html)
+
+    def test_html_is_escaped(self):
+        html, _ = render_email('auth/email/verify_email', username='<b>ana</b>', token='abc')
+        self.assertIn('&lt;b&gt;ana&lt;/b&gt;', html)
+
+    def test_render_many(self):
+        users = [User(id=i, username=f'aluno{i}') for i in range(3)]
+        rendered = list(self.renderer.render_many('auth/email/verify_email', users,
+                                                  context=lambda user: {'token': f'token{user.id}'}))
+        self.assertEqual(len(rendered), 3)
+        for user, html, text in rendered:
+            self.assertIn(f'Olá, {user.username}!', html)
+            self.assertIn(f'/auth/confirm/token{user.id}', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+import unittest
+from app import db
+from app.exporter import export_rows
+from app.models import User, Role
+from . import TestCase
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config['FLASKY_ADMIN'] = 'admin@zohomail.com'
+        role = Role(name='Aluno')
+        db.session.add(role)
+        db.session.add_all([User(username=f'aluno{i}', prontuario=f'ALU{i:07d}', email=f'aluno{i}@zohomail.com',
+                                 role=role if i % 2 else None, password_hash='x') for i in range(5)])
+        db.session.add(User(username='admin', prontuario='ADM1234567', email='admin@zohomail.com',
+                            password='gato', confirmed=True))
+        db.session.commit()
+
+    def test_csv_in_chunks(self):
+        chunks = list(export_rows('users', 'csv', chunk_size=2))
+        self.assertEqual(len(chunks), 3)  # 6 usuários em lotes de 2
+        rows = list(csv.DictReader(io.StringIO(''.join(chunks))))
+        self.assertEqual([row['username'] for row in rows], ['aluno0', 'aluno1', 'aluno2', 'aluno3', 'aluno4', 'admin'])
+        self.assertEqual((rows[0]['role'], rows[1]['role']), ('', 'Aluno'))
+        self.assertNotIn('password_hash', rows[0])
+
+    def test_jsonl(self):
+        lines = ''.join(export_rows('roles', 'jsonl')).splitlines()
+        self.assertEqual([json.loads(line) for line in lines], [{'id': 1, 'name': 'Aluno'}])
+        user = json.loads(''.join(export_rows('users', 'jsonl')).splitlines()[0])
+        self.assertEqual(user['prontuario'], 'ALU0000000')
+        self.assertIn('T', user['created_at'])
+
+    def test_endpoint_requires_admin(self):
+        self.assertEqual(self.client.get('/export/users.csv').status_code, 302)  # Login necessário
+        self.app.config['FLASKY_ADMIN'] = 'outro@zohomail.com'
+        self.client.post('/auth/login', data={'email': 'admin@zohomail.com', 'password': 'gato'})
+        self.assertEqual(self.client.get('/export/users.csv').status_code, 403)
+        self.app.config['FLASKY_ADMIN'] = 'admin@zohomail.com'
+        response = self.client.get('/export/users.jsonl')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 6)
+        self.assertEqual(self.client.get('/export/senhas.csv').status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 import unittest
+from unittest.mock import patch
+from sqlalchemy import event
+from app import db
 from app.auth.forms import (
-    LoginForm, RegistrationForm
+    LoginForm, RegistrationForm, UniqueFields
 )
 from app.models import User
 from . import TestCase
@@ -73,5 +76,46 @@ class AuthFormsTestCase(TestCase):
             form.email.errors
         )
 
+    def test_uniqueness_checked_in_one_query(self):
+        """Teste para verificar que e-mail, nome e prontuário são consultados juntos."""
+        User(email="test@zohomail.com", username="testuser", prontuario="ABC1234567").save()
+        form = RegistrationForm(
+            email="test@zohomail.com",
+            username="testuser",
+            prontuario="DEF1234567",
+            password="password123",
+            password2="password123"
+        )
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.assertFalse(form.validate())
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len([statement for statement in statements if statement.startswith('SELECT')]), 1)
+        self.assertIn('Este e-mail já está registrado.', form.email.errors)
+        self.assertIn('Este nome já está em uso.', form.username.errors)
+        self.assertEqual(form.prontuario.errors, [])
+
+    def test_concurrent_duplicate_registration(self):
+        """Teste para um cadastro duplicado gravado entre a validação e o commit."""
+        User(email="test@zohomail.com", username="testuser", prontuario="ABC1234567").save()
+        real_conflicts = UniqueFields.conflicts
+        calls = []
+
+        def conflicts(unique, values):
+            calls.append(values)
+            return {} if len(calls) == 1 else real_conflicts(unique, values)  # A primeira verificação "perde" a corrida
+
+        with patch.object(UniqueFields, 'conflicts', conflicts):
+            response = self.client.post('/auth/register', data={
+                'email': 'outro@zohomail.com', 'username': 'outro', 'prontuario': 'ABC1234567',
+                'password': 'password123', 'password2': 'password123'
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Este prontuário já está registrado.', response.get_data(as_text=True))
+        self.assertEqual(User.query.count(), 1)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,77 @@
+import threading
+import unittest
+from werkzeug.security import generate_password_hash
+from app import db
+from app.hashing import PasswordHasher, HashingBusy
+from app.models import User
+from . import TestCase
+
+def _config(**overrides):
+    config = {'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000', 'PASSWORD_HASH_WORKERS': 1,
+              'PASSWORD_HASH_MAX_QUEUE': 0, 'PASSWORD_HASH_TIMEOUT': 5}
+    config.update(overrides)
+    return config
+
+class PasswordHasherTestCase(TestCase):
+    def test_uses_configured_method(self):
+        password_hash = User(password='gato').password_hash
+        self.assertTrue(password_hash.startswith(self.app.config['PASSWORD_HASH_METHOD'] + '$'))
+
+    def test_needs_rehash(self):
+        hasher = PasswordHasher(_config())
+        self.assertFalse(hasher.needs_rehash(hasher.hash('gato')))
+        self.assertTrue(hasher.needs_rehash(generate_password_hash('gato', 'pbkdf2:sha256:500')))
+
+    def test_needs_rehash_with_default_parameters(self):
+        # O Werkzeug grava os parâmetros omitidos na configuração (ex.: 'scrypt:32768:8:1')
+        for method in ('scrypt', 'pbkdf2:sha256', 'pbkdf2'):
+            hasher = PasswordHasher(_config(PASSWORD_HASH_METHOD=method))
+            self.assertFalse(hasher.needs_rehash(generate_password_hash('gato', method)), method)
+        hasher = PasswordHasher(_config(PASSWORD_HASH_METHOD='scrypt'))
+        self.assertTrue(hasher.needs_rehash(generate_password_hash('gato', 'scrypt:16384:8:1')))
+        self.assertTrue(hasher.needs_rehash(generate_password_hash('gato', 'pbkdf2:sha256:1000')))
+
+    def test_rejects_when_queue_is_full(self):
+        hasher = PasswordHasher(_config())
+        started, release = threading.Event(), threading.Event()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return 'ok'
+
+        thread = threading.Thread(target=hasher._submit, args=(slow,))
+        thread.start()
+        started.wait(5)
+        self.assertEqual(hasher.stats()['pending'], 1)
+        with self.assertRaises(HashingBusy):
+            hasher.hash('gato')
+        release.set()
+        thread.join()
+        stats = hasher.stats()
+        self.assertEqual((stats['pending'], stats['max_pending'], stats['rejected']), (0, 1, 1))
+        hasher.close()
+
+    def test_rehash_on_login(self):
+        user = User(username='ana', prontuario='ABC1234567', email='ana@zohomail.com', password='gato')
+        user.password_hash = generate_password_hash('gato', 'pbkdf2:sha256:500')
+        user.save()
+        response = self.client.post('/auth/login', data={'email': 'ana@zohomail.com', 'password': 'gato'})
+        self.assertEqual(response.status_code, 302)
+        password_hash = db.session.get(User, user.id).password_hash
+        self.assertTrue(password_hash.startswith(self.app.config['PASSWORD_HASH_METHOD'] + '$'))
+        self.assertEqual(self.app.extensions['password_hasher'].stats()['rehashed'], 1)
+
+    def test_login_returns_503_when_busy(self):
+        user = User(username='ana', prontuario='ABC1234567', email='ana@zohomail.com', password='gato')
+        user.save()
+
+        def busy(*args):
+            raise HashingBusy(retry_after=2)
+        self.app.extensions['password_hasher'].verify = busy
+        response = self.client.post('/auth/login', data={'email': 'ana@zohomail.com', 'password': 'gato'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '2')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+from sqlalchemy import event
+from app import db
+from app.identity import IdentityCache
+from app.models import User, load_user
+from . import TestCase
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class IdentityCacheTestCase(unittest.TestCase):
+    def test_lru_and_ttl(self):
+        clock = FakeClock()
+        cache = IdentityCache(maxsize=2, ttl=10, clock=clock)
+        cache.set(1, {'id': 1})
+        cache.set(2, {'id': 2})
+        self.assertEqual(cache.get(1), {'id': 1})  # 1 passa a ser o mais recente
+        cache.set(3, {'id': 3})
+        self.assertIsNone(cache.get(2))
+        clock.now = 11
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 2, 'evictions': 1, 'invalidations': 0, 'size': 1})
+
+class LoadUserTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User(username='ana', prontuario='ABC1234567', email='ana@zohomail.com', password='gato')
+        self.user.save()
+        self.cache = self.app.extensions['identity_cache']
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        self.addCleanup(event.remove, db.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, *args):
+        self.statements.append(statement)
+
+    def test_second_load_skips_database(self):
+        user_id = str(self.user.id)
+        db.session.remove()
+        self.assertEqual(load_user(user_id).username, 'ana')
+        db.session.remove()
+        self.statements.clear()
+        user = load_user(user_id)
+        self.assertEqual((user.username, user.confirmed), ('ana', False))
+        self.assertEqual(self.statements, [])
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+        # A instância em cache continua gravável
+        user.username = 'ana2'
+        db.session.commit()
+        self.assertEqual(db.session.scalar(db.select(User.username)), 'ana2')
+
+    def test_invalidation(self):
+        load_user(str(self.user.id))
+        self.user.confirm(self.user.generate_confirmation_token())
+        db.session.commit()
+        self.assertIsNone(self.cache.get(self.user.id))
+
+        load_user(str(self.user.id))
+        self.user.email = 'nova@zohomail.com'
+        db.session.commit()  # after_update
+        self.assertIsNone(self.cache.get(self.user.id))
+
+        load_user(str(self.user.id))
+        self.user.delete()
+        self.assertIsNone(self.cache.get(self.user.id))
+        db.session.remove()
+        self.assertIsNone(load_user(str(self.user.id)))
+
+    def test_invalidation_waits_for_commit(self):
+        load_user(str(self.user.id))
+        self.user.password = 'rato'
+        db.session.flush()
+        # Até o commit, quem carregar o usuário ainda lê a senha antiga do banco
+        self.assertIsNotNone(self.cache.get(self.user.id))
+        db.session.commit()
+        self.assertIsNone(self.cache.get(self.user.id))
+
+        load_user(str(self.user.id))
+        self.user.email = 'nova@zohomail.com'
+        db.session.flush()
+        db.session.rollback()
+        self.assertIsNotNone(self.cache.get(self.user.id))
+        db.session.commit()
+        self.assertIsNotNone(self.cache.get(self.user.id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from app import db
+from app.importer import import_users, write_rejected
+from app.models import User, Role
+from . import TestCase
+
+class ImportUsersTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        Role(name='Aluno').save()
+        User(username='existente', prontuario='EXI1234567', email='existente@zohomail.com', password='gato').save()
+
+    def write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_import_csv(self):
+        path = self.write('alunos.csv', '\n'.join([
+            'username,prontuario,email,role,password',
+            'ana,ABC1234567,ana@zohomail.com,Aluno,senha1',
+            'bia,ABC7654321,bia@gmail.com,Aluno,',          # domínio inválido
+            'carla,123,carla@zohomail.com,,',               # prontuário inválido
+            'duda,DUD1234567,ana@zohomail.com,,',           # e-mail repetido no arquivo
+            'existente,EXX1234567,outro@zohomail.com,,',    # nome já cadastrado
+            'eva,EVA1234567,eva@zohomail.com,Professor,',   # papel desconhecido
+            'fabi,FAB1234567,fabi@zohomail.com,,',
+        ]))
+        progress = []
+        report = import_users(path, batch_size=3, processes=1, progress=lambda *args: progress.append(args))
+        self.assertEqual(report.imported, 2)
+        self.assertEqual([item.line for item in report.rejected], [3, 4, 5, 6, 7])
+        self.assertIn('email', report.rejected[0].errors)
+        self.assertIn('prontuario', report.rejected[1].errors)
+        self.assertEqual(report.rejected[2].errors, {'email': ['Valor repetido no arquivo.']})
+        self.assertEqual(report.rejected[3].errors, {'username': ['Este nome já está em uso.']})
+        self.assertIn('role', report.rejected[4].errors)
+        self.assertEqual(progress, [(1, 2), (1, 5), (2, 5)])
+
+        ana = User.query.filter_by(username='ana').one()
+        self.assertEqual(ana.role.name, 'Aluno')
+        self.assertTrue(ana.verify_password('senha1'))
+        self.assertFalse(ana.confirmed)
+        self.assertIsNotNone(User.query.filter_by(username='fabi').one().password_hash)
+
+        rejected_path = os.path.join(self.tmpdir, 'recusados.csv')
+        write_rejected(report.rejected, rejected_path)
+        with open(rejected_path, encoding='utf-8') as f:
+            self.assertEqual(len(f.read().strip().splitlines()), 6)
+
+    def test_import_jsonl_with_process_pool(self):
+        lines = [json.dumps({'username': f'aluno{i}', 'prontuario': f'ALU{i:07d}',
+                             'email': f'aluno{i}@zohomail.com', 'password': 'senha'}) for i in range(10)]
+        lines.insert(3, '{quebrado')
+        path = self.write('alunos.jsonl', '\n'.join(lines))
+        report = import_users(path, batch_size=4, processes=2, hash_method='pbkdf2:sha256:1000')
+        self.assertEqual(report.imported, 10)
+        self.assertEqual([item.line for item in report.rejected], [4])
+        self.assertEqual(User.query.count(), 11)
+        self.assertTrue(db.session.scalar(db.select(User).filter_by(username='aluno9')).verify_password('senha'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from app.email import build_message, send_message
+from benchmarks.email_load import percentile
+from benchmarks.mailgun_stub import MailgunStub
+from . import TestCase
+
+class MailgunStubTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config['MAILGUN_API_KEY'] = 'stub'
+        self.app.config['MAILGUN_DOMAIN'] = 'stub.local'
+
+    def _send(self, stub, to='a@zohomail.com'):
+        self.app.config['MAILGUN_API_URL'] = stub.url
+        send_message(build_message(to, 'Assunto', text='Olá'))
+
+    def test_accepts_messages_and_counts_recipients(self):
+        with MailgunStub() as stub:
+            self._send(stub, to=['a@zohomail.com', 'b@zohomail.com'])
+        self.assertEqual(stub.stats['requests'], 1)
+        self.assertEqual(stub.stats['recipients'], 2)
+        self.assertEqual(stub.stats['status'], {200: 1})
+
+    def test_errors_are_retried_by_the_client(self):
+        with MailgunStub(error_rate=1.0) as stub:
+            with self.assertRaises(Exception):
+                self._send(stub)
+        self.assertEqual(stub.stats['status'], {500: self.app.config['MAILGUN_RETRY_ATTEMPTS']})
+
+    def test_throttling_answers_429(self):
+        self.app.config['MAILGUN_RETRY_ATTEMPTS'] = 1
+        self.app.extensions['mailgun'].retry.attempts = 1
+        with MailgunStub(throttle_rps=1) as stub:
+            self._send(stub)
+            with self.assertRaises(Exception):
+                self._send(stub)
+        self.assertEqual(stub.stats['status'], {200: 1, 429: 1})
+
+class PercentileTestCase(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from app import db
+from app.models import AdminNotification, EmailOutbox
+from app.notifications import notify_admins, flush_admin_digest
+from . import TestCase
+
+class AdminDigestTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config['MAILGUN_DOMAIN'] = 'example.com'
+        self.app.config['FLASKY_ADMIN'] = 'admin@zohomail.com'
+        self.app.config['ADMIN_DIGEST_WINDOW'] = 3600
+        self.app.config['ADMIN_DIGEST_MAX_BATCH'] = 3
+
+    def test_events_wait_for_the_window(self):
+        notify_admins('Novo Cadastro', 'ana')
+        db.session.commit()
+        self.assertEqual(flush_admin_digest(), 0)
+        self.assertEqual(EmailOutbox.query.count(), 0)
+
+        # Depois da janela, um único resumo é enviado a todos os administradores
+        AdminNotification.query.one().created_at = datetime.utcnow() - timedelta(hours=2)
+        db.session.commit()
+        self.assertEqual(flush_admin_digest(), 1)
+        message = EmailOutbox.query.one()
+        payload = json.loads(message.payload)
+        self.assertEqual(payload['to'], 'flaskaulasweb@zohomail.com, admin@zohomail.com')
+        self.assertIn('recipient-variables', payload)
+        self.assertIn('- ana', payload['text'])
+        self.assertIsNotNone(AdminNotification.query.one().digested_at)
+        self.assertEqual(flush_admin_digest(force=True), 0)
+
+    def test_max_batch_triggers_early_digests(self):
+        for i in range(7):
+            notify_admins('Novo Cadastro', f'aluno{i}')
+        db.session.commit()
+        # Dois resumos completos; o evento restante aguarda a janela
+        self.assertEqual(flush_admin_digest(), 2)
+        self.assertEqual(EmailOutbox.query.count(), 2)
+        self.assertEqual(AdminNotification.query.filter_by(digested_at=None).count(), 1)
+        self.assertEqual(flush_admin_digest(force=True), 1)
+
+    def test_events_are_grouped_by_type(self):
+        notify_admins('Novo Cadastro', 'ana')
+        notify_admins('Conta removida', 'bia')
+        notify_admins('Novo Cadastro', 'caio')
+        db.session.commit()
+        flush_admin_digest(force=True)
+        payload = json.loads(EmailOutbox.query.one().payload)
+        self.assertIn('Novo Cadastro (2)', payload['text'])
+        self.assertIn('Conta removida (1)', payload['text'])
+        self.assertTrue(payload['subject'].endswith('Resumo de notificações (3)'))
+
+    def test_digest_html_is_escaped(self):
+        notify_admins('Novo Cadastro', '<b>ana</b>')
+        db.session.commit()
+        flush_admin_digest(force=True)
+        payload = json.loads(EmailOutbox.query.one().payload)
+        self.assertIn('&lt;b&gt;ana&lt;/b&gt;', payload['html'])
+        self.assertNotIn('<b>ana</b>', payload['html'])
+
+if __name__ == '__main__':
+    unittest.main()
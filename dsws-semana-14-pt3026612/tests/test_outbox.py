@@ -0,0 +1,72 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from app import db
+from app.models import EmailOutbox
+from app.outbox import queue_email, process_outbox, run_worker
+from . import TestCase
+
+class OutboxTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.config['MAILGUN_DOMAIN'] = 'example.com'
+        self.app.config['MAIL_OUTBOX_MAX_ATTEMPTS'] = 2
+
+    def test_queue_email_is_part_of_session_transaction(self):
+        """A mensagem só é gravada no commit de quem a colocou na fila."""
+        queue_email(to='test@zohomail.com', subject='Assunto', html='<p>Olá</p>')
+        db.session.rollback()
+        self.assertEqual(EmailOutbox.query.count(), 0)
+
+        queue_email(to='test@zohomail.com', subject='Assunto', html='<p>Olá</p>')
+        db.session.commit()
+        message = EmailOutbox.query.one()
+        self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(json.loads(message.payload)['html'], '<p>Olá</p>')
+
+    @patch('app.outbox.send_message')
+    def test_process_outbox_marks_sent(self, mock_send):
+        for i in range(3):
+            queue_email(to=f'user{i}@zohomail.com', subject='Assunto', text='Olá')
+        db.session.commit()
+
+        self.assertEqual(process_outbox(), (3, 0))
+        self.assertEqual(mock_send.call_count, 3)
+        statuses = {m.status for m in EmailOutbox.query.all()}
+        self.assertEqual(statuses, {EmailOutbox.STATUS_SENT})
+        # Nada mais a enviar
+        self.assertEqual(process_outbox(), (0, 0))
+
+    @patch('app.outbox.send_message', side_effect=Exception('Mailgun fora do ar'))
+    def test_failed_message_is_rescheduled_then_discarded(self, mock_send):
+        queue_email(to='test@zohomail.com', subject='Assunto', text='Olá')
+        db.session.commit()
+
+        self.assertEqual(process_outbox(), (0, 1))
+        message = EmailOutbox.query.one()
+        self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(message.last_error, 'Mailgun fora do ar')
+        self.assertGreater(message.available_at, datetime.utcnow())
+
+        # Antecipa a próxima tentativa, que esgota o limite de tentativas
+        message.available_at = datetime.utcnow()
+        db.session.commit()
+        self.assertEqual(process_outbox(), (0, 1))
+        self.assertEqual(EmailOutbox.query.one().status, EmailOutbox.STATUS_FAILED)
+
+    @patch('app.outbox.send_message')
+    def test_expired_claim_is_retried(self, mock_send):
+        """Mensagens reservadas por um worker interrompido voltam a ser enviadas."""
+        message = queue_email(to='test@zohomail.com', subject='Assunto', text='Olá')
+        message.status = EmailOutbox.STATUS_SENDING
+        message.claimed_by = 'worker-morto'
+        message.available_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+
+        self.assertEqual(run_worker(once=True), (1, 0))
+        self.assertEqual(EmailOutbox.query.one().status, EmailOutbox.STATUS_SENT)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from sqlalchemy import event, text
+from app import db
+from app.identity import get_identity_cache
+from app.models import User, Role
+from app.persistence import unit_of_work
+from . import TestCase
+
+class PersistenceTestCase(TestCase):
+    transactional = False  # Conta os commits reais
+
+    def setUp(self):
+        super().setUp()
+        self.commits = 0
+        def count(conn):
+            self.commits += 1
+        # Commits reais na conexão (o RELEASE de um SAVEPOINT não conta)
+        event.listen(db.engine, 'commit', count)
+        self.addCleanup(event.remove, db.engine, 'commit', count)
+
+    def user(self, name, **kwargs):
+        return User(username=name, prontuario=f'{name[:3].upper()}1234567', email=f'{name}@zohomail.com',
+                    password_hash='x', **kwargs)
+
+    def test_save_many_reports_row_errors(self):
+        Role(name='Aluno').save()
+        self.commits = 0
+        roles = [Role(name=name) for name in ['Professor', 'Aluno', 'Monitor', 'Professor', 'Diretor']]
+        report = Role.save_many(roles, batch_size=3)
+        self.assertEqual(report.done, 3)
+        self.assertEqual([(error.index, error.item.name) for error in report.errors], [(1, 'Aluno'), (3, 'Professor')])
+        self.assertIn('UNIQUE', report.errors[0].error)
+        self.assertEqual(self.commits, 2)  # Um commit por lote
+        db.session.remove()
+        self.assertEqual(sorted(db.session.scalars(db.select(Role.name))),
+                         ['Aluno', 'Diretor', 'Monitor', 'Professor'])
+
+    def test_unit_of_work_defers_commit(self):
+        errors = []
+        with unit_of_work():
+            for name in ['ana', 'bia', 'ana', 'caio']:
+                try:
+                    self.user(name).save()
+                except RuntimeError as e:
+                    errors.append(str(e))
+        self.assertEqual(self.commits, 1)
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(db.session.scalar(db.select(db.func.count(User.id))), 3)
+
+    def test_unit_of_work_rolls_back_on_exception(self):
+        with self.assertRaises(ValueError), unit_of_work():
+            User.save_many([self.user('ana'), self.user('bia')])
+            Role(name='Aluno').save()
+            raise ValueError()
+        self.assertEqual(self.commits, 0)
+        db.session.remove()
+        self.assertEqual(db.session.scalar(db.select(db.func.count(User.id))), 0)
+        self.assertEqual(db.session.scalar(db.select(db.func.count(Role.id))), 0)
+
+    def test_bulk_delete(self):
+        User.save_many([self.user(name, confirmed=name.startswith('c')) for name in ['ana', 'bia', 'caio', 'dan', 'eva']])
+        ana = db.session.scalar(db.select(User).filter_by(username='ana'))
+        cache = get_identity_cache()
+        cache.set(ana.id, {'id': ana.id})
+        self.commits = 0
+        report = User.bulk_delete(User.confirmed == False, batch_size=3)
+        self.assertEqual((report.done, report.errors), (4, []))
+        self.assertEqual(self.commits, 2)
+        self.assertIsNone(cache.get(ana.id))
+        self.assertEqual(db.session.scalars(db.select(User.username)).all(), ['caio'])
+
+    def test_bulk_delete_skips_failing_rows(self):
+        User.save_many([self.user(name) for name in ['ana', 'bia', 'caio']])
+        db.session.execute(text("CREATE TRIGGER protege_bia BEFORE DELETE ON users WHEN old.username = 'bia' "
+                                "BEGIN SELECT RAISE(ABORT, 'protegido'); END"))
+        db.session.commit()
+        report = User.bulk_delete(User.id > 0)
+        self.assertEqual(report.done, 2)
+        self.assertEqual([error.error for error in report.errors], ['protegido'])
+        self.assertEqual(db.session.scalars(db.select(User.username)).all(), ['bia'])
+
+if __name__ == '__main__':
+    unittest.main()
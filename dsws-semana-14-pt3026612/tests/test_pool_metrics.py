@@ -0,0 +1,55 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from sqlalchemy import create_engine, text
+from app.pool_metrics import PoolMetrics, adjust_engine_options
+from . import TestCase
+
+class PoolMetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmpdir, 'pool.sqlite'),
+                                    pool_size=1, max_overflow=1, pool_timeout=5)
+        self.addCleanup(self.engine.dispose)
+        self.metrics = PoolMetrics(self.engine, slow_wait=0.05, log_interval=0)
+
+    def test_checkouts_overflow_and_waits(self):
+        first, second = self.engine.connect(), self.engine.connect()  # Pool + overflow
+        release = threading.Timer(0.2, first.close)
+        release.start()
+        with self.assertLogs('app.pool_metrics', 'WARNING'):
+            # A terceira retirada espera a primeira conexão voltar
+            third = self.engine.connect()
+        release.join()
+        third.close()
+        second.close()
+        stats = self.metrics.stats()
+        self.assertEqual((stats['checkouts'], stats['checkins'], stats['connects']), (3, 3, 2))
+        self.assertEqual((stats['in_use'], stats['in_use_peak'], stats['overflow_peak']), (0, 2, 1))
+        self.assertEqual(stats['slow_waits'], 1)
+        self.assertGreaterEqual(stats['wait_max_ms'], 100)
+
+    def test_invalidation_and_dispose(self):
+        with self.engine.connect() as conn:
+            conn.invalidate()
+        self.engine.dispose()
+        with self.engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+        stats = self.metrics.stats()
+        self.assertEqual(stats['invalidations'], 1)
+        self.assertEqual(stats['checkouts'], 2)
+        self.assertIs(self.metrics.pool, self.engine.pool)
+
+class EngineOptionsTestCase(TestCase):
+    def test_memory_sqlite_drops_pool_size(self):
+        config = {'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+                  'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 5, 'max_overflow': 1, 'pool_recycle': 60}}
+        adjust_engine_options(config)
+        self.assertEqual(config['SQLALCHEMY_ENGINE_OPTIONS'], {'pool_recycle': 60})
+        self.assertIn('pool_metrics', self.app.extensions)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+from app import db
+from app.models import ArchivedUser, User
+from app.pruning import PruneScheduler, prune_unconfirmed
+from . import TestCase
+
+class PruneUnconfirmedTestCase(TestCase):
+    def add_user(self, name, days, confirmed=False):
+        user = User(username=name, prontuario=f'P{name[:9]}', email=f'{name}@zohomail.com', password_hash='x',
+                    confirmed=confirmed, created_at=datetime.utcnow() - timedelta(days=days))
+        db.session.add(user)
+        return user
+
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            self.add_user(f'antigo{i}', days=40)
+        self.add_user('novo', days=1)
+        self.add_user('confirmado', days=40, confirmed=True)
+        db.session.commit()
+
+    def usernames(self):
+        return sorted(db.session.scalars(db.select(User.username)))
+
+    def test_dry_run_only_counts(self):
+        report = prune_unconfirmed(age=30 * 24 * 3600, dry_run=True)
+        self.assertEqual((report.users, report.batches, report.dry_run), (5, 0, True))
+        self.assertEqual(len(self.usernames()), 7)
+
+    def test_prune_archives_to_table_in_batches(self):
+        report = prune_unconfirmed(age=30 * 24 * 3600, batch_size=2, archive='table', pause=0)
+        self.assertEqual((report.users, report.batches), (5, 3))
+        self.assertEqual(self.usernames(), ['confirmado', 'novo'])
+        archived = db.session.scalars(db.select(ArchivedUser).order_by(ArchivedUser.username)).all()
+        self.assertEqual([user.username for user in archived], [f'antigo{i}' for i in range(5)])
+        self.assertEqual((archived[0].user_id, archived[0].email), (1, 'antigo0@zohomail.com'))
+
+    def test_prune_again_after_user_id_is_reused(self):
+        prune_unconfirmed(age=30 * 24 * 3600, pause=0)
+        # O SQLite reutiliza o id do último usuário removido em um novo cadastro
+        user = self.add_user('recadastro', days=40)
+        user.id = 1
+        db.session.commit()
+        report = prune_unconfirmed(age=30 * 24 * 3600, pause=0)
+        self.assertEqual(report.users, 1)
+        archived = db.session.scalars(db.select(ArchivedUser.username).where(ArchivedUser.user_id == 1)).all()
+        self.assertEqual(sorted(archived), ['antigo0', 'recadastro'])
+
+    def test_prune_archives_to_jsonl(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        path = os.path.join(tmpdir, 'arquivados.jsonl')
+        report = prune_unconfirmed(age=30 * 24 * 3600, archive=path, pause=0)
+        self.assertEqual(report.users, 5)
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(sorted(record['username'] for record in records), [f'antigo{i}' for i in range(5)])
+        self.assertNotIn('password_hash', records[0])
+        self.assertEqual(sorted(record['user_id'] for record in records), [1, 2, 3, 4, 5])
+        self.assertEqual(db.session.scalar(db.select(db.func.count(ArchivedUser.id))), 0)
+
+    def test_scheduler_runs_periodically(self):
+        with mock.patch('app.pruning.prune_unconfirmed') as prune:
+            scheduler = PruneScheduler(self.app, 0.01)
+            scheduler.start()
+            deadline = time.monotonic() + 2
+            while prune.call_count < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            scheduler.stop()
+        self.assertGreaterEqual(prune.call_count, 2)
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from config import TestingConfig
+from app.ratelimit import MemoryBackend, SQLiteBackend, RateLimiter
+from . import TestCase
+
+class BackendTestCase(unittest.TestCase):
+    def check_sliding_window(self, backend):
+        # 3 requisições a cada 10 segundos
+        for _ in range(3):
+            self.assertTrue(backend.hit('k', 3, 10, 100.0)[0])
+        allowed, retry_after = backend.hit('k', 3, 10, 101.0)
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 9.0)
+        # Início da janela seguinte: a anterior ainda pesa quase inteira
+        self.assertFalse(backend.hit('k', 3, 10, 110.5)[0])
+        # Metade da janela seguinte: 3 * 0.5 = 1.5 -> cabe mais uma
+        self.assertTrue(backend.hit('k', 3, 10, 115.0)[0])
+        self.assertFalse(backend.hit('k', 3, 10, 115.0)[0])
+        # Duas janelas depois, o contador recomeça
+        self.assertTrue(backend.hit('k', 3, 10, 131.0)[0])
+        # Chaves diferentes têm contadores próprios
+        self.assertTrue(backend.hit('outra', 3, 10, 101.0)[0])
+
+    def test_memory_backend(self):
+        self.check_sliding_window(MemoryBackend())
+
+    def test_memory_backend_evicts_expired_keys(self):
+        backend = MemoryBackend(max_keys=2)
+        backend.hit('a', 1, 10, 100.0)
+        backend.hit('b', 1, 10, 100.0)
+        backend.hit('c', 1, 10, 200.0)
+        self.assertEqual(list(backend._counters), ['c'])
+
+    def test_sqlite_backend(self):
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        path = os.path.join(tmpdir, 'limits.sqlite')
+        self.check_sliding_window(SQLiteBackend(path))
+        # Outra instância (outro worker) enxerga os mesmos contadores
+        self.assertFalse(SQLiteBackend(path).hit('k', 1, 10, 131.5)[0])
+
+class RateLimitedViewsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app.extensions['rate_limiter'] = RateLimiter(dict(
+            self.app.config, RATELIMIT_RULES={'login': [('ip', '10/60'), ('email', '2/60')]}))
+
+    def login(self, email):
+        return self.client.post('/auth/login', data={'email': email, 'password': 'errada'})
+
+    def test_login_limited_per_email(self):
+        self.assertEqual(self.login('ana@zohomail.com').status_code, 200)
+        self.assertEqual(self.login('ana@zohomail.com').status_code, 200)
+        response = self.login('ANA@zohomail.com')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        # Outro e-mail do mesmo IP ainda pode tentar
+        self.assertEqual(self.login('bia@zohomail.com').status_code, 200)
+        self.assertEqual(self.app.extensions['rate_limiter'].stats(), {'allowed': 3, 'rejected': 1})
+
+    def test_rejected_before_password_check(self):
+        from app.models import User
+        User(username='ana', prontuario='ABC1234567', email='ana@zohomail.com', password='gato').save()
+        hasher = self.app.extensions['password_hasher']
+        completed = hasher.stats()['completed']
+        for _ in range(3):
+            self.login('ana@zohomail.com')
+        self.assertEqual(hasher.stats()['completed'], completed + 2)  # A terceira tentativa não calcula hash
+        self.assertEqual(self.client.get('/auth/login').status_code, 200)  # GET não é limitado
+
+    def test_disabled(self):
+        self.app.config['RATELIMIT_ENABLED'] = False
+        for _ in range(5):
+            self.assertEqual(self.login('ana@zohomail.com').status_code, 200)
+
+class ForwardedAddressTestCase(TestCase):
+    transactional = False  # Aplicação própria, criada com o ProxyFix
+
+    def setUp(self):
+        with mock.patch.object(TestingConfig, 'PROXY_FIX_X_FOR', 1):
+            super().setUp()
+        self.app.extensions['rate_limiter'] = RateLimiter(dict(
+            self.app.config, RATELIMIT_RULES={'login': [('ip', '2/60')]}))
+
+    def login(self, email, client_ip):
+        # Todas as requisições chegam do mesmo proxy
+        return self.client.post('/auth/login', data={'email': email, 'password': 'errada'},
+                                environ_base={'REMOTE_ADDR': '10.0.0.1'},
+                                headers={'X-Forwarded-For': client_ip})
+
+    def test_limit_per_forwarded_address(self):
+        self.assertEqual(self.login('ana@zohomail.com', '203.0.113.1').status_code, 200)
+        self.assertEqual(self.login('bia@zohomail.com', '203.0.113.1').status_code, 200)
+        self.assertEqual(self.login('caio@zohomail.com', '203.0.113.1').status_code, 429)
+        # Outro cliente atrás do mesmo proxy não é afetado
+        self.assertEqual(self.login('dani@zohomail.com', '198.51.100.7').status_code, 200)
+
+if __name__ == '__main__':
+    unittest.main()
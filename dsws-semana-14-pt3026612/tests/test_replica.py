@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from config import TestingConfig
+from app import db
+from app.models import User, Role
+from app.models import load_user
+from app.replica import REPLICA_BIND, route_reads_to_replica, use_replica, sync_replica
+from . import TestCase
+
+class ReplicaTestCase(TestCase):
+    transactional = False  # Copia o primário com a API de backup
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        binds = {REPLICA_BIND: 'sqlite:///' + os.path.join(self.tmpdir, 'replica.sqlite')}
+        with mock.patch.object(TestingConfig, 'SQLALCHEMY_BINDS', binds):
+            super().setUp()
+        for engine in db.engines.values():
+            self.addCleanup(engine.dispose)
+        db.session.add(User(username='ana', prontuario='ANA1234567', email='ana@zohomail.com',
+                            password='gato', confirmed=True))
+        db.session.commit()
+        sync_replica(db.engines[None], db.engines[REPLICA_BIND])
+        # Gravado depois da cópia: existe só no primário
+        db.session.add(User(username='bia', prontuario='BIA1234567', email='bia@zohomail.com', password_hash='x'))
+        db.session.commit()
+        db.session.remove()
+
+    def usernames(self):
+        return db.session.scalars(db.select(User.username).order_by(User.id)).all()
+
+    def test_reads_inside_use_replica(self):
+        with use_replica():
+            self.assertEqual(self.usernames(), ['ana'])
+        self.assertEqual(self.usernames(), ['ana', 'bia'])
+
+    def test_reads_after_write_stay_on_primary(self):
+        db.session.add(Role(name='Aluno'))
+        db.session.commit()
+        with use_replica():
+            self.assertEqual(self.usernames(), ['ana', 'bia'])
+            self.assertIsNotNone(db.session.scalar(db.select(Role).filter_by(name='Aluno')))
+
+    def test_api_reads_replica_until_user_writes(self):
+        @self.app.route('/_grava')
+        def grava():
+            db.session.add(Role(name='Aluno'))
+            db.session.commit()
+            return ''
+
+        self.client.post('/auth/login', data={'email': 'ana@zohomail.com', 'password': 'gato'})
+        names = lambda: [user['username'] for user in self.client.get('/api/users').get_json()['users']]
+        self.assertEqual(names(), ['ana'])
+        self.client.get('/_grava')
+        # Após uma escrita, as leituras do mesmo usuário ficam no primário por DB_REPLICA_STICKY segundos
+        self.assertEqual(names(), ['ana', 'bia'])
+
+    def test_load_user_reads_primary(self):
+        ana = db.session.scalar(db.select(User).filter_by(username='ana'))
+        ana.confirmed = False  # Alteração que a réplica ainda não recebeu
+        db.session.commit()
+        ids = db.session.scalars(db.select(User.id).order_by(User.id)).all()
+        db.session.remove()
+        with self.app.test_request_context():
+            route_reads_to_replica()
+            self.assertFalse(load_user(str(ids[0])).confirmed)
+            self.assertEqual(load_user(str(ids[1])).username, 'bia')
+            self.assertEqual(self.usernames(), ['ana'])  # As demais leituras continuam na réplica
+        self.assertFalse(self.app.extensions['identity_cache'].get(ids[0])['confirmed'])
+
+    def test_unique_fields_use_replica(self):
+        from app.auth.forms import RegistrationForm
+        with self.app.test_request_context():
+            self.assertEqual(RegistrationForm.unique.conflicts({'username': 'bia'}), {})
+            self.assertIn('username', RegistrationForm.unique.conflicts({'username': 'ana'}))
+
+    def test_sync_requires_sqlite(self):
+        engine = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'))
+        with self.assertRaises(RuntimeError):
+            sync_replica(engine, db.engines[REPLICA_BIND])
+
+class NoReplicaTestCase(TestCase):
+    def test_use_replica_without_bind_reads_primary(self):
+        db.session.add(Role(name='Aluno'))
+        db.session.commit()
+        db.session.remove()
+        with use_replica():
+            self.assertEqual(db.session.scalars(db.select(Role.name)).all(), ['Aluno'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from config import TestingConfig
+from app import create_app, db, snapshot
+from app.models import User, Role
+from app.snapshot import SchemaSnapshot
+from app.sqlite_tuning import pragma_report
+from . import TestCase
+
+def seed_roles():
+    db.session.add_all([Role(name='Aluno'), Role(name='Professor')])
+
+class SnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        uri = 'sqlite:///' + os.path.join(self.tmpdir, 'app.sqlite')
+        with mock.patch.object(TestingConfig, 'SQLALCHEMY_DATABASE_URI', uri):
+            self.app = create_app('testing')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.addCleanup(self.app_context.pop)
+        self.addCleanup(db.engine.dispose)
+        self.addCleanup(db.session.remove)
+        self.addCleanup(snapshot._templates.clear)
+
+    def role_names(self):
+        return sorted(db.session.scalars(db.select(Role.name)))
+
+    def test_restore_file_database(self):
+        snap = SchemaSnapshot(db, seed=seed_roles)
+        self.assertTrue(snap.restore())
+        db.session.add(User(username='ana', prontuario='ANA1234567', email='ana@zohomail.com', password_hash='x'))
+        db.session.execute(db.text('CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL PRIMARY KEY)'))
+        db.session.execute(db.text("INSERT INTO alembic_version VALUES ('3f1c2b7d9a10')"))
+        db.session.commit()
+        snap.restore()
+        self.assertEqual(db.session.scalar(db.select(db.func.count(User.id))), 0)
+        self.assertEqual(self.role_names(), ['Aluno', 'Professor'])
+        self.assertEqual(db.session.scalar(db.text('SELECT version_num FROM alembic_version')), '3f1c2b7d9a10')
+        self.assertEqual(pragma_report(db.engine, ['journal_mode']), {'journal_mode': 'wal'})
+
+    def test_template_file_is_shared(self):
+        seed = mock.Mock(side_effect=seed_roles, __name__='seed_roles')
+        SchemaSnapshot(db, seed=seed, directory=self.tmpdir).restore()
+        snapshot._templates.clear()  # Como em outro processo: a imagem vem do arquivo
+        db.session.execute(db.delete(Role))
+        db.session.commit()
+        SchemaSnapshot(db, seed=seed, directory=self.tmpdir).restore()
+        self.assertEqual(seed.call_count, 1)
+        self.assertEqual(self.role_names(), ['Aluno', 'Professor'])
+        self.assertEqual(len([name for name in os.listdir(self.tmpdir) if name.startswith('schema-') and name.endswith('.sqlite')]), 1)
+
+class ResetDbTestCase(TestCase):
+    transactional = False  # Restaura a imagem sobre o banco inteiro
+
+    def test_reset_db_restores_empty_database(self):
+        db.session.add(Role(name='Aluno'))
+        db.session.commit()
+        response = self.client.get('/reset-db')
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(db.session.scalar(db.select(db.func.count(Role.id))), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from sqlalchemy import create_engine, text
+from app import db
+from app.models import User, Role
+from app.sql_stats import (NPlusOneError, QueryStats, install_query_recorder, record_queries,
+                           redact, statement_shape)
+from . import TestCase
+
+class SQLStatsTestCase(unittest.TestCase):
+    def test_statement_shape_collapses_in_lists(self):
+        self.assertEqual(statement_shape('SELECT *\n  FROM users WHERE id IN (?, ?, ?)'),
+                         'SELECT * FROM users WHERE id IN (?)')
+        self.assertEqual(statement_shape('SELECT * FROM users WHERE id IN (?, ?)'),
+                         'SELECT * FROM users WHERE id IN (?)')
+
+    def test_redact_keeps_only_types(self):
+        self.assertEqual(redact(('ana@zohomail.com', 3)), ['str', 'int'])
+        self.assertEqual(redact({'email': 'ana@zohomail.com'}), {'email': 'str'})
+        self.assertEqual(redact([('a',), ('b',)]), '<2 linhas>')
+
+    def test_slowest_are_kept_in_order(self):
+        stats = QueryStats(keep=2)
+        for duration, statement in [(0.1, 'A'), (0.3, 'B'), (0.2, 'C'), (0.05, 'A')]:
+            stats.add(statement, duration)
+        self.assertEqual(stats.slowest, [(0.3, 'B'), (0.2, 'C')])
+        self.assertEqual(stats.count, 4)
+        self.assertEqual(stats.repeated(1), [('A', 2)])
+
+    def test_slow_log_redacts_parameters(self):
+        engine = create_engine('sqlite://')
+        install_query_recorder(engine, slow_threshold=0)
+        with self.assertLogs('app.sql_stats.slow', 'WARNING') as logs, engine.connect() as conn:
+            conn.execute(text('SELECT :email'), {'email': 'ana@zohomail.com'})
+        self.assertIn("'str'", logs.output[0])
+        self.assertNotIn('ana@zohomail.com', logs.output[0])
+        engine.dispose()
+
+class RequestStatsTestCase(TestCase):
+    transactional = False  # Conta as consultas exatas (sem os SAVEPOINTs do isolamento)
+
+    def setUp(self):
+        super().setUp()
+        @self.app.route('/_papeis/<int:vezes>')
+        def papeis(vezes):
+            for _ in range(vezes):
+                db.session.scalars(db.select(Role)).all()
+            return ''
+
+    def test_server_timing_header(self):
+        response = self.client.get('/_papeis/3')
+        self.assertRegex(response.headers['Server-Timing'], r'^db;dur=[\d.]+;desc="3 consultas"$')
+
+    def test_strict_mode_fails_on_repeated_statement(self):
+        limit = self.app.config['SQL_N_PLUS_ONE_LIMIT']
+        self.client.get(f'/_papeis/{limit}')
+        with self.assertRaises(NPlusOneError):
+            self.client.get(f'/_papeis/{limit + 1}')
+
+    def test_record_queries_outside_requests(self):
+        with record_queries() as stats:
+            db.session.get(User, 1)
+            db.session.scalars(db.select(Role)).all()
+        self.assertEqual(stats.count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from sqlalchemy import create_engine, text
+from app.sqlite_tuning import install_sqlite_pragmas, install_sqlite_transactions, pragma_report, optimize
+from . import TestCase
+
+PRAGMAS = {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 2500,
+           'cache_size': -4000, 'temp_store': 'MEMORY'}
+
+class SQLiteTuningTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.engine = create_engine('sqlite:///' + os.path.join(self.tmpdir, 'tune.sqlite'))
+        self.addCleanup(self.engine.dispose)
+
+    def test_pragmas_applied_on_connect(self):
+        self.assertTrue(install_sqlite_pragmas(self.engine, PRAGMAS))
+        report = pragma_report(self.engine)
+        self.assertEqual(report['journal_mode'], 'wal')
+        self.assertEqual(report['synchronous'], 'NORMAL')
+        self.assertEqual(report['busy_timeout'], 2500)
+        self.assertEqual(report['cache_size'], -4000)
+        self.assertEqual(report['temp_store'], 'MEMORY')
+        optimize(self.engine)
+
+    def test_rejects_unsafe_values(self):
+        with self.assertRaises(RuntimeError):
+            install_sqlite_pragmas(self.engine, {'journal_mode': 'WAL; DROP TABLE users'})
+
+    def test_other_databases_are_ignored(self):
+        engine = SimpleNamespace(dialect=SimpleNamespace(name='postgresql'))
+        self.assertFalse(install_sqlite_pragmas(engine, PRAGMAS))
+        self.assertFalse(install_sqlite_transactions(engine))
+
+    def create_items(self):
+        install_sqlite_pragmas(self.engine, PRAGMAS)
+        install_sqlite_transactions(self.engine)
+        with self.engine.begin() as conn:
+            conn.execute(text('CREATE TABLE items (name TEXT UNIQUE)'))
+
+    def count_items(self):
+        with self.engine.connect() as conn:
+            return conn.execute(text('SELECT count(*) FROM items')).scalar()
+
+    def test_read_then_write_with_concurrent_writer(self):
+        # Como no cadastro: verificação de unicidade, outro cadastro gravado, INSERT
+        self.create_items()
+        with self.engine.connect() as first:
+            first.execute(text("SELECT 1 FROM items WHERE name = 'ana'")).all()
+            with self.engine.begin() as second:
+                second.execute(text("INSERT INTO items VALUES ('bia')"))
+            first.execute(text("INSERT INTO items VALUES ('ana')"))
+            first.commit()
+        self.assertEqual(self.count_items(), 2)
+
+    def test_release_of_savepoint_does_not_commit(self):
+        self.create_items()
+        with self.engine.connect() as conn:
+            conn.execute(text('SELECT count(*) FROM items')).scalar()
+            with conn.begin_nested():
+                conn.execute(text("INSERT INTO items VALUES ('ana')"))
+            conn.rollback()
+        self.assertEqual(self.count_items(), 0)
+
+class AppPragmasTestCase(TestCase):
+    transactional = False  # Abre conexões próprias no engine
+
+    def test_app_engine_uses_configured_pragmas(self):
+        from app import db
+        report = pragma_report(db.engine, ['busy_timeout', 'temp_store'])
+        self.assertEqual(report, {'busy_timeout': self.app.config['SQLITE_PRAGMAS']['busy_timeout'],
+                                  'temp_store': 'MEMORY'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import time
+import unittest
+from app import db
+from app.models import User
+from app.tokens import TokenService, get_token_service
+from . import TestCase
+
+def _config(secret_key, fallbacks=()):
+    return {'SECRET_KEY': secret_key, 'SECRET_KEY_FALLBACKS': list(fallbacks),
+            'TOKEN_DEFAULT_EXPIRATION': 3600, 'TOKEN_MAX_AGE': 86400}
+
+class TokenServiceTestCase(TestCase):
+    def test_serializers_are_cached_per_salt(self):
+        service = get_token_service()
+        self.assertIs(service.serializer('reset'), service.serializer('reset'))
+        self.assertIsNot(service.serializer('reset'), service.serializer('confirmation'))
+
+    def test_salts_are_not_interchangeable(self):
+        service = get_token_service()
+        token = service.generate({'reset': 1}, salt='reset')
+        self.assertEqual(service.verify(token, salt='reset')['reset'], 1)
+        self.assertIsNone(service.verify(token, salt='confirmation'))
+
+    def test_key_rotation(self):
+        old = TokenService(_config('chave-antiga'))
+        token = old.generate({'confirm': 1}, salt='confirmation')
+        rotated = TokenService(_config('chave-nova', fallbacks=['chave-antiga']))
+        self.assertEqual(rotated.verify(token, salt='confirmation')['confirm'], 1)
+        # Sem a chave antiga nas fallbacks, o token deixa de valer
+        self.assertIsNone(TokenService(_config('chave-nova')).verify(token, salt='confirmation'))
+        # Novos tokens são assinados com a chave atual
+        new_token = rotated.generate({'confirm': 2}, salt='confirmation')
+        self.assertIsNone(old.verify(new_token, salt='confirmation'))
+
+    def test_expiration_is_enforced(self):
+        service = get_token_service()
+        token = service.generate({'confirm': 1}, salt='confirmation', expiration=60)
+        serializer = service.serializer('confirmation')
+        self.assertIsNotNone(service._verify(serializer, token, time.time()))
+        self.assertIsNone(service._verify(serializer, token, time.time() + 61))
+
+    def test_verify_many(self):
+        service = get_token_service()
+        tokens = [service.generate({'confirm': i}, salt='confirmation') for i in range(3)]
+        results = service.verify_many(tokens + ['token-invalido'], salt='confirmation')
+        self.assertEqual([r['confirm'] if r else None for r in results], [0, 1, 2, None])
+
+class UserTokenFlowsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User(username='ana', prontuario='ABC1234567', email='ana@zohomail.com', password='gato')
+        self.user.save()
+
+    def test_reset_password(self):
+        token = self.user.generate_reset_token()
+        self.assertFalse(User.reset_password('token-invalido', 'cachorro'))
+        self.assertTrue(User.reset_password(token, 'cachorro'))
+        db.session.commit()
+        self.assertTrue(db.session.get(User, self.user.id).verify_password('cachorro'))
+
+    def test_change_email(self):
+        other = User(username='bia', prontuario='DEF1234567', email='bia@zohomail.com', password='gato')
+        other.save()
+        token = self.user.generate_email_change_token('nova@zohomail.com')
+        self.assertFalse(other.change_email(token))  # Token de outro usuário
+        self.assertTrue(self.user.change_email(token))
+        db.session.commit()
+        self.assertEqual(db.session.get(User, self.user.id).email, 'nova@zohomail.com')
+
+        taken = self.user.generate_email_change_token('bia@zohomail.com')
+        self.assertFalse(self.user.change_email(taken))  # E-mail já em uso
+
+if __name__ == '__main__':
+    unittest.main()